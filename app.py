@@ -1,13 +1,17 @@
-from flask import Flask, request, jsonify, render_template
-import asyncio
-from src.agents.master_agent import MasterAgent
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from src.agents.master_agent import MasterAgent, PARTIAL_CACHE_DURATION
+from src.agents.prewarm import PrewarmScheduler
 from main import QueryParser
 from src.utils.mistral_analyzer import MistralAnalyzer
 from src.utils.visual_representation import prepare_visual_data
+from src.utils.event_loop import run_async, iterate_async
+from src.utils.cache import get_cache, cache_stats
+from src.utils.query_matcher import normalize_query
+from src.utils.resilience import upstream_stats
+from src.utils.series_store import get_series_store
 from typing import Dict, Any
 import hashlib
 import json
-from datetime import datetime, timedelta
 from flask_mail import Mail, Message
 from dotenv import load_dotenv
 import os
@@ -20,11 +24,13 @@ app = Flask(__name__)
 # Initialize global instances to avoid recreating them for each request
 parser = None
 master = None
+prewarmer = None
 analyzer = None
 
 # Cache for API responses
-api_cache = {}
 CACHE_DURATION = 3600  # 1 hour cache duration
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB per worker
+api_cache = get_cache("api:responses", ttl=CACHE_DURATION, max_entries=1024, max_bytes=CACHE_MAX_BYTES)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -46,19 +52,13 @@ def get_cache_key(endpoint: str, data: Dict[str, Any]) -> str:
     data_str = json.dumps(simplified_data, sort_keys=True)
     return f"{endpoint}:{hashlib.md5(data_str.encode()).hexdigest()}"
 
-def is_cache_valid(cache_key: str) -> bool:
-    """Check if the cached data is still valid"""
-    if cache_key not in api_cache:
-        return False
-    cached_time = api_cache[cache_key]["timestamp"]
-    return (datetime.now() - cached_time).seconds < CACHE_DURATION
-
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/mcp/fetch', methods=['POST'])
 def mcp_fetch():
+    global parser, master, prewarmer
     try:
         data = request.json
         query = data.get('query')
@@ -66,36 +66,41 @@ def mcp_fetch():
         app.logger.info(f'Received query: {query}, fetch_only: {fetch_only}')
         
         # Check cache first
-        cache_key = get_cache_key('fetch', {'query': query, 'fetch_only': fetch_only})
-        if is_cache_valid(cache_key):
+        cache_key = get_cache_key('fetch', {'query': normalize_query(query or ''), 'fetch_only': fetch_only})
+        cached_response = api_cache.get(cache_key)
+        if cached_response is not None:
             app.logger.info('Returning cached response')
-            return jsonify(api_cache[cache_key]["response"])
+            # Still counts towards the query's popularity, which decides what is prewarmed
+            if master is not None:
+                master.record_request(cached_response["query_params"], analysis=not fetch_only)
+            return jsonify(cached_response)
         
         # Initialize the parser and master agent if not already initialized
-        global parser, master
         if parser is None:
             parser = QueryParser()
         if master is None:
             master = MasterAgent()
+            prewarmer = PrewarmScheduler(master)
+            prewarmer.start()
 
-        # Parse the query and fetch data
-        params = asyncio.run(parser.parse_query(query))
+        # Parse the query and fetch data on the shared background event loop
+        params = run_async(parser.parse_query(query))
         app.logger.info(f'Parsed parameters: {params}')
         
         # If fetch_only is True, we only need the raw data without analysis
         if fetch_only:
-            result = asyncio.run(master.fetch_data_only(params))
+            result = run_async(master.fetch_data_only(params))
         else:
-            result = asyncio.run(master.fetch_with_retry(params))
+            result = run_async(master.fetch_with_retry(params))
 
-        # Serialize the result to a JSON-serializable format
-        result_dict = result.model_dump()
+        # Serialize the result to a JSON-serializable format, straight from the datasets' frames
+        result_dict = result.to_dict()
         
-        # Cache the response
-        api_cache[cache_key] = {
-            "response": result_dict,
-            "timestamp": datetime.now()
-        }
+        # Cache the response; one missing sources or built from stale data only briefly
+        if result.status == "completed" and not any(dataset.warning_log for dataset in result.datasets):
+            api_cache.set(cache_key, result_dict)
+        else:
+            api_cache.set(cache_key, result_dict, ttl=PARTIAL_CACHE_DURATION)
 
         app.logger.info('Data fetched successfully')
         return jsonify(result_dict)
@@ -117,9 +122,10 @@ def mcp_analyze():
             'indicator': indicator,
             'dataset': dataset
         })
-        if is_cache_valid(cache_key):
+        cached_response = api_cache.get(cache_key)
+        if cached_response is not None:
             app.logger.info('Returning cached analysis')
-            return jsonify(api_cache[cache_key]["response"])
+            return jsonify(cached_response)
         
         app.logger.info(f'Received analysis request for {country}, {indicator}')
 
@@ -129,14 +135,11 @@ def mcp_analyze():
             analyzer = MistralAnalyzer()
 
         # Perform analysis
-        analysis_result = asyncio.run(analyzer.analyze_data(country, indicator, dataset))
+        analysis_result = run_async(analyzer.analyze_data(country, indicator, dataset))
         
         # Cache the response
         response = {"analysis": analysis_result}
-        api_cache[cache_key] = {
-            "response": response,
-            "timestamp": datetime.now()
-        }
+        api_cache.set(cache_key, response)
 
         app.logger.info('Analysis completed successfully')
         return jsonify(response)
@@ -144,6 +147,43 @@ def mcp_analyze():
         app.logger.error(f'Error in mcp_analyze: {str(e)}')
         return jsonify({"error": str(e)}), 500
 
+def sse_event(payload: Dict[str, Any], event: str = None) -> str:
+    """Format a payload as a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+@app.route('/mcp/analyze/stream', methods=['POST'])
+def mcp_analyze_stream():
+    data = request.json
+    country = data.get('country')
+    indicator = data.get('indicator')
+    dataset = data.get('dataset')
+    app.logger.info(f'Received streaming analysis request for {country}, {indicator}')
+
+    # The UI sends the parsed query along, so its analysis is prewarmed with its data
+    if master is not None and data.get('query_params'):
+        master.record_analysis(data['query_params'])
+
+    # Initialize the analyzer if not already initialized
+    global analyzer
+    if analyzer is None:
+        analyzer = MistralAnalyzer()
+
+    def generate():
+        try:
+            for token in iterate_async(analyzer.analyze_data_stream(country, indicator, dataset)):
+                yield sse_event({"token": token})
+            yield sse_event({}, event="done")
+        except Exception as e:
+            app.logger.error(f'Error in mcp_analyze_stream: {str(e)}')
+            yield sse_event({"error": str(e) or "Analysis timed out"}, event="error")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/mcp/visualize', methods=['POST'])
 def mcp_visualize():
     try:
@@ -152,9 +192,10 @@ def mcp_visualize():
         
         # Check cache first
         cache_key = get_cache_key('visualize', {'merged_data': merged_data})
-        if is_cache_valid(cache_key):
+        cached_response = api_cache.get(cache_key)
+        if cached_response is not None:
             app.logger.info('Returning cached visualization data')
-            return jsonify(api_cache[cache_key]["response"])
+            return jsonify(cached_response)
         
         app.logger.info('Preparing data for visualization')
 
@@ -162,10 +203,7 @@ def mcp_visualize():
         visual_data = prepare_visual_data(merged_data)
         
         # Cache the response
-        api_cache[cache_key] = {
-            "response": visual_data,
-            "timestamp": datetime.now()
-        }
+        api_cache.set(cache_key, visual_data)
 
         app.logger.info('Data prepared for visualization')
         return jsonify(visual_data)
@@ -173,6 +211,29 @@ def mcp_visualize():
         app.logger.error(f'Error in mcp_visualize: {str(e)}')
         return jsonify({"error": str(e)}), 500
 
+@app.route('/mcp/cache-stats', methods=['GET'])
+def mcp_cache_stats():
+    return jsonify(cache_stats())
+
+@app.route('/mcp/parser-stats', methods=['GET'])
+def mcp_parser_stats():
+    if parser is None:
+        return jsonify({})
+    return jsonify(parser.fast_parser.stats())
+
+@app.route('/mcp/upstream-stats', methods=['GET'])
+def mcp_upstream_stats():
+    return jsonify(upstream_stats())
+
+@app.route('/mcp/prewarm-stats', methods=['GET'])
+def mcp_prewarm_stats():
+    return jsonify(prewarmer.stats() if prewarmer is not None else {})
+
+@app.route('/mcp/store-stats', methods=['GET'])
+def mcp_store_stats():
+    store = get_series_store()
+    return jsonify(store.stats() if store is not None else {})
+
 @app.route('/send-complaint', methods=['POST'])
 def send_complaint():
     try:
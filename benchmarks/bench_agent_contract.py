@@ -0,0 +1,89 @@
+"""
+Microbenchmark: agent -> MasterAgent hand-off for a 50-year, multi-source query.
+
+Compares the previous contract (agents return dataset.dict(), MasterAgent
+rebuilds DataSet(**result) before merging) with agents returning the typed
+DataSet whose SeriesFrame is reused by the merge. Reports CPU time and
+peak allocations (tracemalloc) per query. Usage:
+
+    python benchmarks/bench_agent_contract.py [years] [rounds]
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.master_agent import MasterAgent
+from src.schemas.data_schema import DataSet, Metadata, DataSource
+from src.schemas.series_frame import SeriesFrame
+
+SOURCES = [DataSource.WORLD_BANK, DataSource.IMF, DataSource.OECD, DataSource.UN]
+
+
+def transform(source: DataSource, years: int) -> DataSet:
+    """What an agent's transform_data produces for one source."""
+    frame = SeriesFrame.from_columns(
+        years=[1975 + i for i in range(years)],
+        values=[1.5e12 + i * 1e10 for i in range(years)],
+        country_codes=["USA"] * years,
+        country_names=["United States"] * years,
+        info={"indicator_code": "NY.GDP.MKTP.CD", "indicator_name": "GDP (current US$)"}
+    )
+    return frame.to_dataset(
+        Metadata(
+            source=source,
+            indicator_code="NY.GDP.MKTP.CD",
+            indicator_name="GDP (current US$)",
+            last_updated=datetime.now(),
+            frequency="yearly",
+            unit="trillions"
+        )
+    )
+
+
+async def dict_contract(master: MasterAgent, years: int) -> DataSet:
+    results = [transform(source, years).dict() for source in SOURCES]
+    return await master._merge_datasets([DataSet(**result) for result in results if "error" not in result])
+
+
+async def typed_contract(master: MasterAgent, years: int) -> DataSet:
+    results = [transform(source, years) for source in SOURCES]
+    return await master._merge_datasets([result for result in results if isinstance(result, DataSet)])
+
+
+async def measure(func, master: MasterAgent, years: int, rounds: int):
+    await func(master, years)  # warm up
+
+    start = time.process_time()
+    for _ in range(rounds):
+        await func(master, years)
+    cpu = (time.process_time() - start) / rounds
+
+    tracemalloc.start()
+    await func(master, years)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+async def main(years: int, rounds: int):
+    master = MasterAgent()
+    dict_cpu, dict_peak = await measure(dict_contract, master, years, rounds)
+    typed_cpu, typed_peak = await measure(typed_contract, master, years, rounds)
+
+    print(f"Query:            {years} years x {len(SOURCES)} sources, {rounds} rounds")
+    print(f"dict round trip:  {dict_cpu * 1000:.2f} ms CPU, {dict_peak / 1024:.0f} KiB peak")
+    print(f"typed DataSet:    {typed_cpu * 1000:.2f} ms CPU, {typed_peak / 1024:.0f} KiB peak")
+    print(f"CPU saved:        {(1 - typed_cpu / dict_cpu) * 100:.0f}%")
+    print(f"Peak alloc saved: {(1 - typed_peak / dict_peak) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    ))
@@ -0,0 +1,100 @@
+"""
+Microbenchmark: MasterAgent._merge_datasets on synthetic 10k-point datasets.
+
+Times the columnar merge, the DataPoint materialization and serializing
+the merged frame to dicts (what the response uses) separately, and compares both with the previous per-year
+generator scan. Inputs are frame-only datasets, as the agents return them.
+Usage:
+
+    python benchmarks/bench_merge.py [points_per_source]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.master_agent import MasterAgent
+from src.schemas.data_schema import DataSet, Metadata, DataSource
+from src.schemas.series_frame import SeriesFrame
+
+
+def make_dataset(source: DataSource, points: int, offset: int) -> DataSet:
+    frame = SeriesFrame.from_columns(
+        years=range(offset, offset + points),
+        values=[float(i) for i in range(points)],
+        country_codes=["SYN"] * points,
+        country_names=["Synthetic"] * points,
+        info={"indicator_id": "SYNTH", "indicator_name": "Synthetic"}
+    )
+    metadata = Metadata(
+        source=source,
+        indicator_code="SYNTH",
+        indicator_name="Synthetic",
+        last_updated=datetime.now(),
+        frequency="yearly",
+        unit="units"
+    )
+    return frame.to_dataset(metadata, materialize=False)
+
+
+def legacy_merge(datasets):
+    """The generator-scan merge MasterAgent used before (WB then IMF only)."""
+    merged_data_points = {}
+    all_years = set()
+    for dataset in datasets:
+        for data_point in dataset.data:
+            all_years.add(data_point.year)
+    for year in sorted(all_years):
+        wb_data_point = next((dp for ds in datasets if ds.metadata.source == DataSource.WORLD_BANK for dp in ds.data if dp.year == year), None)
+        imf_data_point = next((dp for ds in datasets if ds.metadata.source == DataSource.IMF for dp in ds.data if dp.year == year), None)
+        if wb_data_point:
+            merged_data_points[year] = wb_data_point
+        elif imf_data_point:
+            merged_data_points[year] = imf_data_point
+    return list(merged_data_points.values())
+
+
+async def main(points: int):
+    # Overlapping ranges so every source contributes some years
+    datasets = [
+        make_dataset(DataSource.WORLD_BANK, points, 0),
+        make_dataset(DataSource.IMF, points, points // 2),
+        make_dataset(DataSource.OECD, points, points),
+        make_dataset(DataSource.UN, points, points * 3 // 2),
+    ]
+    master = MasterAgent()
+
+    start = time.perf_counter()
+    merged = await master._merge_datasets(datasets)
+    merge = time.perf_counter() - start
+
+    # What the response uses: records straight from the merged frame
+    start = time.perf_counter()
+    merged.to_dict()
+    serialize = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged.materialize()
+    materialize = time.perf_counter() - start
+
+    # The legacy scan works on DataPoints; build them outside the timing
+    legacy_inputs = [dataset.materialize() for dataset in datasets]
+    start = time.perf_counter()
+    legacy = legacy_merge(legacy_inputs)
+    scan = time.perf_counter() - start
+
+    total = merge + materialize
+    print(f"Points per source:  {points}")
+    print(f"Columnar merge:     {merge * 1000:.1f} ms ({len(merged.data)} points, all sources)")
+    print(f"Materialization:    {materialize * 1000:.1f} ms ({materialize / len(merged.data) * 1e6:.1f} us/point)")
+    print(f"Merge + points:     {total * 1000:.1f} ms")
+    print(f"Frame to_dict():    {serialize * 1000:.1f} ms (response serialization, no DataPoints)")
+    print(f"Generator scan:     {scan * 1000:.1f} ms ({len(legacy)} points, WB + IMF only)")
+    print(f"Speedup:            {scan / total:.0f}x (merge + points)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
@@ -0,0 +1,130 @@
+"""
+Microbenchmark: buffered vs streaming parsing of SDMX-JSON responses.
+
+The buffered path reads the whole body and parses it with json.loads, as
+response.json() does. The streaming path feeds the same bytes in chunks
+through SDMXData.from_stream (ijson). The adaptive path is what the agents
+use, read_sdmx_response: json.loads up to STREAM_THRESHOLD bytes, streaming
+above it. Each is run on a response below the threshold and on one above it
+(the threshold is lowered for the latter, so the run stays short). Reports
+wall time, peak allocations (tracemalloc) and how early the first
+observation is available. Usage:
+
+    python benchmarks/bench_sdmx_stream.py [countries] [years]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sdmx_fixture import make_sdmx_bytes
+from src.utils.sdmx_stream import STREAM_THRESHOLD, SDMXData, iter_sdmx, read_sdmx_response
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ChunkedReader:
+    """Stand-in for aiohttp's StreamReader that hands out the body in chunks."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.offset = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        n = CHUNK_SIZE if n < 0 else min(n, CHUNK_SIZE)
+        chunk = self.body[self.offset:self.offset + n]
+        self.offset += len(chunk)
+        await asyncio.sleep(0)
+        return chunk
+
+    async def readexactly(self, n: int) -> bytes:
+        chunks, size = [], 0
+        while size < n:
+            chunk = await self.read(n - size)
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"".join(chunks), n)
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks)
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.content = ChunkedReader(body)
+
+
+async def buffered(body: bytes) -> SDMXData:
+    reader = ChunkedReader(body)
+    chunks = []
+    while True:
+        chunk = await reader.read()
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return SDMXData.from_json(json.loads(b"".join(chunks)))
+
+
+async def streaming(body: bytes) -> SDMXData:
+    return await SDMXData.from_stream(ChunkedReader(body))
+
+
+def adaptive(threshold: int):
+    async def _adaptive(body: bytes) -> SDMXData:
+        return await read_sdmx_response(FakeResponse(body), threshold)
+    return _adaptive
+
+
+async def measure(func, body: bytes):
+    start = time.perf_counter()
+    data = await func(body)
+    elapsed = time.perf_counter() - start
+
+    # Separate run, since tracing allocations slows everything down
+    tracemalloc.start()
+    await func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, elapsed, peak
+
+
+async def first_observation(body: bytes):
+    reader = ChunkedReader(body)
+    start = time.perf_counter()
+    async for kind, _ in iter_sdmx(reader):
+        if kind == "observation":
+            return time.perf_counter() - start, reader.offset
+
+
+async def compare(body: bytes, threshold: int, label: str):
+    buffered_data, buffered_time, buffered_peak = await measure(buffered, body)
+    streamed_data, streamed_time, streamed_peak = await measure(streaming, body)
+    adaptive_data, adaptive_time, adaptive_peak = await measure(adaptive(threshold), body)
+    assert len(buffered_data) == len(streamed_data) == len(adaptive_data)
+
+    print(f"{label}: {len(body) / 1e6:.1f} MB, threshold {threshold / 1e6:.1f} MB")
+    print(f"  Buffered json:      {buffered_time * 1000:5.0f} ms, {buffered_peak / 1e6:5.1f} MB peak")
+    print(f"  Streaming (ijson):  {streamed_time * 1000:5.0f} ms, {streamed_peak / 1e6:5.1f} MB peak")
+    print(f"  read_sdmx_response: {adaptive_time * 1000:5.0f} ms, {adaptive_peak / 1e6:5.1f} MB peak")
+
+
+async def main(countries: int, years: int):
+    body = make_sdmx_bytes(countries, years)
+    print(f"Response: {countries} series x {years} periods")
+    # A typical response, below the threshold: parsed with json.loads
+    await compare(body, max(STREAM_THRESHOLD, len(body)), "Below threshold")
+    # A response larger than the threshold: streamed, with bounded memory
+    await compare(body, len(body) // 8, "Above threshold")
+
+    first_time, first_offset = await first_observation(body)
+    print(f"First streamed observation: {first_time * 1000:.1f} ms, after {first_offset / 1e3:.0f} KB of {len(body) / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    ))
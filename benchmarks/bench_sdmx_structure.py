@@ -0,0 +1,84 @@
+"""
+Microbenchmark: decoding an SDMX-JSON message on a 200-country x 60-year fixture.
+
+Compares the previous transform (next() scans over the structure for every
+lookup, serie_key.split(":") and a country-name scan per observation) with
+the StructureIndex path the OECD and UN agents use now. Usage:
+
+    python benchmarks/bench_sdmx_structure.py [countries] [years] [rounds]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sdmx_fixture import make_sdmx_document
+from src.utils.sdmx import observation_columns
+from src.utils.sdmx_stream import SDMXData
+
+
+def legacy_country_name(structure, country_code):
+    dimensions = structure.get("dimensions", {}).get("series", [])
+    country_dim = next((dim for dim in dimensions if dim.get("id") == "REF_AREA"), {})
+    country = next((c for c in country_dim.get("values", []) if c.get("id") == country_code), {})
+    return country.get("name", country_code)
+
+
+def legacy_decode(document):
+    """Per-observation decoding as the agents did it before the structure index."""
+    structure = document["structure"]
+    series = document["dataSets"][0]["series"]
+    rows = []
+    for serie_key, serie_data in series.items():
+        for time_idx, obs in serie_data.get("observations", {}).items():
+            if obs and obs[0] is not None:
+                dimensions = structure.get("dimensions", {}).get("observation", [])
+                time_periods = next((dim for dim in dimensions if dim.get("id") == "TIME_PERIOD"), {})
+                series_dimensions = structure.get("dimensions", {}).get("series", [])
+                area_dim = next((dim for dim in series_dimensions if dim.get("id") == "REF_AREA"), {})
+                country_code = area_dim["values"][int(serie_key.split(":")[2])]["id"]
+                rows.append((
+                    int(time_periods["values"][int(time_idx)]["id"]),
+                    float(obs[0]),
+                    country_code,
+                    legacy_country_name(structure, country_code),
+                    serie_key.split(":")[1],
+                ))
+    return rows
+
+
+def indexed_decode(data):
+    columns, _, _ = observation_columns(data)
+    return columns
+
+
+def timed(func, arg, rounds):
+    func(arg)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func(arg)
+    return (time.perf_counter() - start) / rounds, result
+
+
+def main(countries: int, years: int, rounds: int):
+    document = make_sdmx_document(countries, years)
+    data = SDMXData.from_json(document)
+
+    legacy_time, rows = timed(legacy_decode, document, rounds)
+    indexed_time, columns = timed(indexed_decode, data, rounds)
+    assert len(rows) == len(columns["value"])
+
+    print(f"Fixture:           {countries} countries x {years} years ({len(rows)} observations)")
+    print(f"Structure scans:   {legacy_time * 1000:.1f} ms")
+    print(f"StructureIndex:    {indexed_time * 1000:.2f} ms")
+    print(f"Speedup:           {legacy_time / indexed_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 60,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    )
@@ -0,0 +1,83 @@
+"""
+Benchmark: fresh aiohttp session per query vs. the pooled SessionManager session.
+
+Runs a local stub HTTP server that answers like the World Bank API and times
+repeated queries. Usage:
+
+    python benchmarks/bench_session_pool.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.http_session import SessionManager
+
+STUB_PAYLOAD = [
+    {"page": 1, "pages": 1, "per_page": 1000, "total": 2},
+    [
+        {"date": "2020", "value": 2.6e12, "countryiso3code": "IND"},
+        {"date": "2021", "value": 3.1e12, "countryiso3code": "IND"},
+    ],
+]
+
+
+async def start_stub_server() -> tuple[web.AppRunner, str]:
+    async def handler(request):
+        return web.json_response(STUB_PAYLOAD)
+
+    app = web.Application()
+    app.router.add_get("/v2/country/{country}/indicator/{indicator}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v2/country/IND/indicator/NY.GDP.MKTP.CD"
+
+
+async def fresh_session_query(url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return await response.json()
+
+
+async def pooled_session_query(url: str):
+    session = SessionManager.get_session()
+    async with session.get(url) as response:
+        return await response.json()
+
+
+async def time_queries(query, url: str, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        await query(url)
+    return (time.perf_counter() - start) / count
+
+
+async def main(count: int):
+    runner, url = await start_stub_server()
+    try:
+        # Warm up both paths once so imports and DNS don't skew the numbers
+        await fresh_session_query(url)
+        await pooled_session_query(url)
+
+        fresh = await time_queries(fresh_session_query, url, count)
+        pooled = await time_queries(pooled_session_query, url, count)
+    finally:
+        await SessionManager.close()
+        await runner.cleanup()
+
+    print(f"Requests per mode: {count}")
+    print(f"Fresh session per query: {fresh * 1000:.3f} ms/request")
+    print(f"Pooled session:          {pooled * 1000:.3f} ms/request")
+    print(f"Speedup:                 {fresh / pooled:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,83 @@
+"""
+Microbenchmark: answering World Bank / IMF queries from the local snapshot.
+
+Ingests the small WDI and WEO fixtures in benchmarks/fixtures into a
+temporary series store, checks that the agents answer from it, and times
+SeriesStore.read and a full fetch_data + transform_data through the agents.
+No network access is needed. Usage:
+
+    python benchmarks/bench_snapshot.py [rounds]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def time_per_call(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+
+async def time_per_call_async(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await func()
+    return (time.perf_counter() - start) / rounds
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with tempfile.TemporaryDirectory() as root:
+        # The store location is read at import time
+        os.environ["SERIES_STORE_PATH"] = root
+        from src.agents.imf_agent import IMFAgent
+        from src.agents.world_bank_agent import WorldBankAgent
+        from src.utils.http_session import SessionManager
+        from src.utils.series_store import get_series_store
+        from src.utils.snapshot_ingest import ingest
+
+        store = get_series_store()
+        print("ingested WDI indicators:", ingest(store, "wdi", os.path.join(FIXTURES, "wdi_sample.csv")))
+        print("ingested WEO indicators:", ingest(store, "weo", os.path.join(FIXTURES, "weo_sample.xls")))
+
+        params = {"indicator": "gdp", "country": ["USA", "IND", "DEU"], "start_year": 2018, "end_year": 2022}
+        for agent_class in (WorldBankAgent, IMFAgent):
+            async with agent_class() as agent:
+                agent_params = params if agent_class is WorldBankAgent else {**params, "country": ["USA", "IND"]}
+                dataset = (await agent.transform_data(await agent.fetch_data(agent_params))).materialize()
+                print(
+                    f"{agent.name}: {len(dataset.data)} points in {dataset.metadata.unit}, "
+                    f"e.g. {dataset.data[-1].country_code} {dataset.data[-1].year} = {dataset.data[-1].value:.3f}"
+                )
+
+                read = time_per_call(
+                    lambda: store.read(agent.snapshot_source, dataset.metadata.indicator_code, agent_params["country"], 2018, 2022),
+                    rounds
+                )
+                fetch = await time_per_call_async(
+                    lambda: agent.fetch_data(agent_params), rounds
+                )
+                full = await time_per_call_async(
+                    lambda: _fetch_and_transform(agent, agent_params), max(rounds // 10, 1)
+                )
+                print(f"  store.read {read * 1e6:7.1f} us   fetch_data {fetch * 1e6:7.1f} us   fetch+transform {full * 1e6:7.1f} us")
+
+        print("store stats:", store.stats())
+        await SessionManager.close()
+
+
+async def _fetch_and_transform(agent, params):
+    return await agent.transform_data(await agent.fetch_data(params))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
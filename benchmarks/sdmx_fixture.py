@@ -0,0 +1,39 @@
+"""
+Synthetic SDMX-JSON 1.0 data message shared by the SDMX benchmarks.
+
+Series keys are FREQ:SERIES:REF_AREA, observations are keyed by TIME_PERIOD
+index, and the structure section comes after dataSets as in OECD/UN responses.
+"""
+import json
+
+
+def make_sdmx_document(countries: int = 200, years: int = 60) -> dict:
+    areas = [{"id": f"C{i:03d}", "name": f"Country {i}"} for i in range(countries)]
+    periods = [{"id": str(1960 + i), "name": str(1960 + i)} for i in range(years)]
+    series = {
+        f"0:0:{area}": {
+            "attributes": [0],
+            "observations": {str(t): [1.0e9 + area * 1e6 + t, 0] for t in range(years)}
+        }
+        for area in range(countries)
+    }
+    return {
+        "header": {"id": "synthetic", "prepared": "2024-01-01T00:00:00"},
+        "dataSets": [{"action": "Information", "series": series}],
+        "structure": {
+            "name": "Synthetic indicator",
+            "dimensions": {
+                "series": [
+                    {"id": "FREQ", "name": "Frequency", "values": [{"id": "A", "name": "Annual"}]},
+                    {"id": "SERIES", "name": "Series", "values": [{"id": "SYNTH", "name": "Synthetic"}]},
+                    {"id": "REF_AREA", "name": "Reference area", "values": areas},
+                ],
+                "observation": [{"id": "TIME_PERIOD", "name": "Time", "values": periods}],
+            },
+            "attributes": {"series": [{"id": "UNIT", "name": "US Dollar"}]},
+        },
+    }
+
+
+def make_sdmx_bytes(countries: int = 200, years: int = 60) -> bytes:
+    return json.dumps(make_sdmx_document(countries, years)).encode()
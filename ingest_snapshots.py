@@ -0,0 +1,45 @@
+"""
+Load bulk download files into the local series store, so the World Bank and
+IMF agents can answer from it instead of calling the APIs.
+
+    python ingest_snapshots.py wdi WDICSV.csv
+    python ingest_snapshots.py weo WEOOct2025all.xls
+
+By default only the indicators the agents map are kept; pass --all to store
+every indicator in the file. The store lives in SERIES_STORE_PATH
+(.cache/series by default) and is picked up by running workers on their next
+lookup.
+"""
+import argparse
+import logging
+import sys
+
+from src.agents.imf_agent import IMFAgent
+from src.agents.world_bank_agent import WorldBankAgent
+from src.utils.series_store import SeriesStore, STORE_PATH
+from src.utils.snapshot_ingest import ingest
+
+logging.basicConfig(level=logging.INFO)
+
+AGENTS = {"wdi": WorldBankAgent, "weo": IMFAgent}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ingest World Bank WDI / IMF WEO bulk files")
+    parser.add_argument("kind", choices=sorted(AGENTS), help="format of the bulk file")
+    parser.add_argument("path", help="path to the bulk file")
+    parser.add_argument("--all", action="store_true", help="store every indicator, not only the mapped ones")
+    parser.add_argument("--store", default=STORE_PATH, help="series store directory")
+    args = parser.parse_args()
+
+    if not args.store:
+        parser.error("no series store configured (SERIES_STORE_PATH is empty)")
+
+    indicator_codes = None if args.all else set(AGENTS[args.kind]().indicators_mapping.values())
+    count = ingest(SeriesStore(args.store), args.kind, args.path, indicator_codes)
+    print(f"Stored {count} indicators in {args.store}")
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
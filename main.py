@@ -4,8 +4,14 @@ from datetime import datetime
 import os
 from dotenv import load_dotenv
 from src.agents.master_agent import MasterAgent
-from mistralai.client import MistralClient
+from src.agents.registry import get_registry
+from src.utils.http_session import SessionManager
+from mistralai.async_client import MistralAsyncClient
+from src.utils.mistral_analyzer import chat_completion
+from src.utils.query_matcher import FastQueryParser, normalize_query
+from src.utils.cache import get_cache
 import re
+import json
 # Load environment variables at the start
 load_dotenv()
 
@@ -24,7 +30,7 @@ class QueryParser:
         if not isinstance(mistral_api_key, str) or len(mistral_api_key) < 32:
             raise ValueError("Invalid Mistral API key format")
         
-        self.client = MistralClient(api_key=mistral_api_key)
+        self.client = MistralAsyncClient(api_key=mistral_api_key)
         
         # Define supported indicators for each source with their unique IDs
         self.indicator_ids = {
@@ -141,6 +147,27 @@ class QueryParser:
             "emirates": "united arab emirates"
         }
 
+        # Indicator keys the agents understand, in source priority order
+        self.agent_indicators = []
+        for indicators in get_registry().indicators_by_source().values():
+            for indicator in indicators:
+                if indicator == indicator.lower() and indicator not in self.agent_indicators:
+                    self.agent_indicators.append(indicator)
+        for indicators in self.indicator_ids.values():
+            for indicator in indicators:
+                if indicator not in self.agent_indicators:
+                    self.agent_indicators.append(indicator)
+
+        # Rule-based parser tried before falling back to Mistral
+        country_phrases = {name: name for name in self.country_codes}
+        country_phrases.update(self.country_variations)
+        self.fast_parser = FastQueryParser(self.agent_indicators, country_phrases)
+        self.logger = logging.getLogger("QueryParser")
+
+        # Parsed parameters keyed by normalized query text; relative ranges
+        # like "last 10 years" make entries time-dependent, so keep the TTL short
+        self.cache = get_cache("parser:queries", ttl=6 * 3600, max_entries=4096)
+
     def _normalize_country_name(self, country: str) -> str:
         """Normalize country name and handle variations"""
         country = country.lower().strip()
@@ -148,46 +175,35 @@ class QueryParser:
         country = self.country_variations.get(country, country)
         return country
 
-    async def parse_query(self, query: str) -> dict:
-        """Parse natural language query using Mistral"""
-        try:
-            # Create a prompt for Mistral to extract information
-            prompt = f"""Extract the following information from this query: "{query}"
-1. Indicator type (e.g., GDP, population, literacy rate)
-2. Country name (extract the full country name)
-3. Start year (if mentioned, default to 2000)
-4. End year (if mentioned, default to 2025)
-
-Available indicators are: {', '.join(self.indicator_ids['world_bank'].keys())}
-
-Format the response as JSON:
-{{
-    "indicator": "extracted_indicator",
-    "country": "extracted_country",
-    "start_year": year,
-    "end_year": year
-}}
+    def _get_country_code(self, country: str) -> str:
+        """Convert a country name to its ISO code, suggesting close names if unknown"""
+        country_name = self._normalize_country_name(country)
+        country_code = self.country_codes.get(country_name)
+        
+        if not country_code:
+            similar_countries = [c for c in self.country_codes.keys() 
+                              if country_name in c or c in country_name]
+            if similar_countries:
+                suggestion = f"Did you mean: {', '.join(similar_countries)}?"
+                raise ValueError(f"Country code not found for: {country}. {suggestion}")
+            raise ValueError(f"Country code not found for: {country}")
+        return country_code
 
-Note: Be sure to output the complete country name, not abbreviations."""
+    async def parse_query(self, query: str) -> dict:
+        """Parse natural language query, trying the rule-based fast path before Mistral"""
+        cache_key = normalize_query(query)
+        cached_result = self.cache.get(cache_key)
+        if cached_result is not None:
+            self.logger.info(f"Returning cached parse for: {cache_key}")
+            return dict(cached_result)
 
-            # Get response from Mistral
-            response = self.client.chat(
-                model="mistral-medium",  # Consistently using mistral-medium
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that extracts structured information from queries. Only respond with the requested JSON format."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
+        try:
+            result = self.fast_parser.parse(query)
+            if result is None:
+                result = await self._parse_with_llm(query)
+            else:
+                self.logger.info(f"Parsed query without LLM: {result}")
 
-            # Parse the response
-            result = eval(response.choices[0].message.content)
-            
             # Normalize indicator
             indicator = result["indicator"].lower()
             
@@ -197,30 +213,66 @@ Note: Be sure to output the complete country name, not abbreviations."""
                 if indicator in indicators:
                     indicator_ids[source] = indicators[indicator]
             
-            if not indicator_ids:
+            if not indicator_ids and indicator not in self.agent_indicators:
                 available_indicators = ", ".join(self.indicator_ids['world_bank'].keys())
                 raise ValueError(f"Unsupported indicator. Available indicators for World Bank are: {available_indicators}")
             
             result["indicator_ids"] = indicator_ids
             
-            # Normalize and convert country name to code
-            country_name = self._normalize_country_name(result["country"])
-            country_code = self.country_codes.get(country_name)
-            
-            if not country_code:
-                similar_countries = [c for c in self.country_codes.keys() 
-                                  if country_name in c or c in country_name]
-                if similar_countries:
-                    suggestion = f"Did you mean: {', '.join(similar_countries)}?"
-                    raise ValueError(f"Country code not found for: {result['country']}. {suggestion}")
-                raise ValueError(f"Country code not found for: {result['country']}")
-            
-            result["country"] = country_code
+            # Normalize and convert country names to codes
+            if isinstance(result["country"], list):
+                result["country"] = [self._get_country_code(country) for country in result["country"]]
+            else:
+                result["country"] = self._get_country_code(result["country"])
+            self.cache.set(cache_key, dict(result))
             return result
 
         except Exception as e:
             raise ValueError(f"Error parsing query: {str(e)}")
 
+    async def _parse_with_llm(self, query: str) -> dict:
+        """Extract indicator, country and years from the query using Mistral"""
+        # Create a prompt for Mistral to extract information
+        prompt = f"""Extract the following information from this query: "{query}"
+1. Indicator type (e.g., GDP, population, literacy rate)
+2. Country name (extract the full country name; if several countries are compared, a list of names)
+3. Start year (if mentioned, default to 2000)
+4. End year (if mentioned, default to 2025)
+
+Available indicators are: {', '.join(self.indicator_ids['world_bank'].keys())}
+
+Format the response as JSON:
+{{
+    "indicator": "extracted_indicator",
+    "country": "extracted_country",
+    "start_year": year,
+    "end_year": year
+}}
+
+Note: Be sure to output the complete country name, not abbreviations. For comparisons use "country": ["name", "name"]."""
+
+        # Get response from Mistral without blocking the event loop
+        content = await chat_completion(
+            self.client,
+            model="mistral-medium",  # Consistently using mistral-medium
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a helpful assistant that extracts structured information from queries. Only respond with the requested JSON format."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        )
+
+        # Parse the JSON object out of the response
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        if not match:
+            raise ValueError(f"Unexpected response from Mistral: {content}")
+        return json.loads(match.group(0))
+
 async def main():
     load_dotenv()
     
@@ -290,5 +342,7 @@ async def main():
             print(f"\nError: {str(e)}")
             print("Please try again with a different query.")
 
+    await SessionManager.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,54 +1,66 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import aiohttp
 import asyncio
-from datetime import datetime, timedelta
 import logging
-from ..schemas.data_schema import DataPoint
+from urllib.parse import urlparse
+from ..schemas.data_schema import DataSet
+from ..schemas.series_frame import SeriesFrame
+from ..utils.http_session import SessionManager
+from ..utils.cache import get_cache
+from ..utils.persistent_cache import get_persistent_cache
+from ..utils.single_flight import SingleFlight
+from ..utils.unit_normalization import UNIT_SCALES, common_unit, rescale
+from ..utils.resilience import MAX_WAIT, backoff_delay, get_guard, is_retryable
+from ..utils.series_store import get_series_store
 
-# Define conversion factors globally
-conversion_factors = {
-    "millions": 1e-6,
-    "billions": 1e-3,
-    "trillions": 1.0  # Already in trillions
-}
-
-class SharedState:
-    """A simple shared state to store units determined by agents."""
-    un_unit: str = "unknown"
-    wb_unit: str = "unknown"
-
-    @classmethod
-    def set_un_unit(cls, unit: str):
-        cls.un_unit = unit
-
-    @classmethod
-    def set_wb_unit(cls, unit: str):
-        cls.wb_unit = unit
-
-    @classmethod
-    def get_un_unit(cls) -> str:
-        return cls.un_unit
-
-    @classmethod
-    def get_wb_unit(cls) -> str:
-        return cls.wb_unit
+# Coalesces identical in-flight upstream requests across all agent instances
+_agent_flights = SingleFlight("agents")
+# Background refreshes of stale entries by cache key, and why the last one failed
+_revalidations: Dict[str, asyncio.Task] = {}
+_revalidation_errors: Dict[str, str] = {}
 
 class BaseAgent(ABC):
+    # Upper bound on cached responses per agent class
+    cache_max_entries: int = 1024
+    # How long responses stay in the on-disk cache shared by all worker processes.
+    # Subclasses override this to match how often their source publishes revisions.
+    persistent_cache_duration: int = 24 * 3600
+    persistent_cache_max_entries: int = 20000
+    # How long past their TTL cached responses are still served while they are
+    # refreshed in the background (stale-while-revalidate)
+    stale_grace: int = 6 * 3600
+    # Bumped when the shape or scaling of stored DataSets changes, so stale disk entries are ignored
+    persistent_cache_version: int = 3
+    # Most countries one upstream request asks for; longer lists are split into batches
+    max_countries_per_request: int = 50
+    # How the source joins several country codes in one request
+    country_separator: str = ","
+    # Series store directory holding the source's ingested bulk files; None if it has none
+    snapshot_source: Optional[str] = None
+
     def __init__(self, name: str, cache_duration: int = 3600):
         self.name = name
-        self.cache = {}
         self.cache_duration = cache_duration
+        # Shared by every instance of the agent, since agents are created per query
+        self.cache = get_cache(f"agent:{name}", ttl=cache_duration, max_entries=self.cache_max_entries, grace=self.stale_grace)
+        self.persistent_cache = get_persistent_cache(
+            f"{name}:v{self.persistent_cache_version}", ttl=self.persistent_cache_duration,
+            max_entries=self.persistent_cache_max_entries, grace=self.stale_grace
+        )
         self.session: Optional[aiohttp.ClientSession] = None
         self.logger = logging.getLogger(name)
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # Borrow the process-wide pooled session instead of opening a new one
+        self.session = SessionManager.get_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The pooled session is shared with other agents, so it is not closed here.
+        # It is kept on the agent: a fetch that outlived its caller (see the
+        # deadlines in MasterAgent) still finishes and fills the cache.
+        pass
 
     @abstractmethod
     async def fetch_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -58,101 +70,242 @@ class BaseAgent(ABC):
         pass
 
     @abstractmethod
-    async def transform_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def transform_data(self, data: Dict[str, Any]) -> DataSet:
         """
-        Abstract method to transform data into the unified schema
+        Abstract method to transform data into the unified schema.
+        The returned DataSet is validated once here and then passed through
+        caching and merging as-is. It carries its SeriesFrame and leaves the
+        DataPoints unbuilt (see SeriesFrame.to_dataset); call materialize()
+        before reading `data`.
         """
         pass
 
-    def get_cache_key(self, params: Dict[str, Any]) -> str:
+    @staticmethod
+    def get_countries(params: Dict[str, Any]) -> List[str]:
         """
-        Generate a cache key from the parameters
+        Return the requested country codes; "country" may be one code or a list.
         """
-        return f"{self.name}_{str(sorted(params.items()))}"
+        country = params.get("country")
+        if isinstance(country, str):
+            return [country] if country else []
+        return list(country or [])
 
-    def is_cache_valid(self, cache_key: str) -> bool:
+    def join_countries(self, params: Dict[str, Any]) -> str:
         """
-        Check if the cached data is still valid
+        Format the requested countries for a single upstream request.
         """
-        if cache_key not in self.cache:
-            return False
-        cached_time = self.cache[cache_key]["timestamp"]
-        return (datetime.now() - cached_time).seconds < self.cache_duration
+        return self.country_separator.join(self.get_countries(params))
 
-    async def get_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def get_cache_key(self, params: Dict[str, Any]) -> str:
         """
-        Main method to get data with caching and error handling
+        Generate a cache key from the parameters
+        """
+        return f"{self.name}_{str(sorted(params.items()))}"
+
+    async def get_data(self, params: Dict[str, Any]) -> DataSet:
+        """
+        Main method to get data with caching and error handling.
+        Entries up to stale_grace seconds past their TTL are returned at once,
+        marked in warning_log, while one background task refreshes them.
         """
         cache_key = self.get_cache_key(params)
         
-        if self.is_cache_valid(cache_key):
+        cached_data, stale = self.cache.get_stale(cache_key)
+        if cached_data is not None:
+            if stale:
+                # The disk cache usually lives longer and may still hold a fresh copy
+                persisted_data, persisted_stale = await self._read_persistent_cache(cache_key)
+                if persisted_data is not None and not persisted_stale:
+                    self.cache.set(cache_key, persisted_data)
+                    return persisted_data
+                return self._serve_stale(cache_key, params, cached_data)
             self.logger.info(f"Returning cached data for {cache_key}")
-            return self.cache[cache_key]["data"]
+            return cached_data
+
+        # Concurrent callers with the same key share a single upstream request
+        return await _agent_flights.do(cache_key, lambda: self._load_data(cache_key, params))
+
+    async def _load_data(self, cache_key: str, params: Dict[str, Any]) -> DataSet:
+        """
+        Load data from the persistent cache or the upstream API and cache it
+        """
+        cached_data, stale = await self._read_persistent_cache(cache_key)
+        if cached_data is not None:
+            if stale:
+                return self._serve_stale(cache_key, params, cached_data)
+            self.logger.info(f"Returning persisted data for {cache_key}")
+            self.cache.set(cache_key, cached_data)
+            return cached_data
+
+        return await self.fetch_fresh(params)
+
+    def _serve_stale(self, cache_key: str, params: Dict[str, Any], cached_data: DataSet) -> DataSet:
+        """
+        Start a background refresh of an expired entry, unless one is already
+        running, and return the entry marked as stale.
+        """
+        task = _revalidations.get(cache_key)
+        if task is None or task.done():
+            _revalidations[cache_key] = asyncio.ensure_future(self._revalidate(cache_key, params))
+
+        error = _revalidation_errors.get(cache_key)
+        warning = f"Stale {self.name} data: the cached copy has expired and "
+        warning += f"could not be refreshed ({error})" if error else "is being refreshed"
+        self.logger.info(f"Returning stale data for {cache_key}")
+        return cached_data.model_copy(update={"warning_log": [*cached_data.warning_log, warning]})
+
+    async def _revalidate(self, cache_key: str, params: Dict[str, Any]) -> None:
+        """
+        Refresh an expired entry. On failure the stale entry stays in place and
+        keeps being served until its grace period ends.
+        """
+        try:
+            await self.fetch_fresh(params)
+            _revalidation_errors.pop(cache_key, None)
+        except Exception as e:
+            self.logger.warning(f"Refreshing stale data for {cache_key} failed: {str(e)}")
+            _revalidation_errors[cache_key] = str(e)
+        finally:
+            if _revalidations.get(cache_key) is asyncio.current_task():
+                del _revalidations[cache_key]
 
+    async def fetch_fresh(self, params: Dict[str, Any]) -> DataSet:
+        """
+        Fetch from the upstream API and cache the result, without going
+        through the caches or joining an identical in-flight request.
+        MasterAgent uses this for hedged duplicate requests.
+        """
+        cache_key = self.get_cache_key(params)
         try:
-            raw_data = await self.fetch_data(params)
-            transformed_data = await self.transform_data(raw_data)
+            transformed_data = await self._fetch_batches(params)
             
-            self.cache[cache_key] = {
-                "data": transformed_data,
-                "timestamp": datetime.now()
-            }
+            self.cache.set(cache_key, transformed_data)
+            self._write_persistent_cache(cache_key, transformed_data)
             
             return transformed_data
         except Exception as e:
             self.logger.error(f"Error in {self.name}: {str(e)}")
             raise
 
+    async def _fetch_batches(self, params: Dict[str, Any]) -> DataSet:
+        """
+        Fetch all requested countries in as few upstream calls as possible.
+        Up to max_countries_per_request countries share one call; larger lists
+        are split into batches that are fetched concurrently and combined.
+        """
+        countries = self.get_countries(params)
+        size = self.max_countries_per_request
+        if len(countries) <= size:
+            return await self.transform_data(await self.fetch_data(params))
+
+        async def _fetch_batch(batch: List[str]) -> DataSet:
+            return await self.transform_data(await self.fetch_data({**params, "country": batch}))
+
+        self.logger.info(f"Fetching {len(countries)} countries in batches of {size}")
+        datasets = await asyncio.gather(*(
+            _fetch_batch(countries[start:start + size]) for start in range(0, len(countries), size)
+        ))
+
+        # Batches may have picked different units, so align them before stacking
+        frames = [SeriesFrame.of(dataset) for dataset in datasets]
+        scale_factors = [dataset.metadata.scale_factor for dataset in datasets]
+        unit = common_unit(frames, scale_factors)
+        frame = SeriesFrame.concat(
+            rescale(frame, scale_factor, unit) for frame, scale_factor in zip(frames, scale_factors)
+        )
+        return frame.to_dataset(
+            datasets[0].metadata.model_copy(update={"unit": unit, "scale_factor": UNIT_SCALES[unit]}),
+            error_log=[message for dataset in datasets for message in dataset.error_log],
+            warning_log=[message for dataset in datasets for message in dataset.warning_log],
+            materialize=False
+        )
+
+    async def _read_persistent_cache(self, cache_key: str) -> Tuple[Optional[DataSet], bool]:
+        """
+        Look up the on-disk cache, returning (data, is_stale). The SQLite
+        query and unpickling run on a worker thread, off the event loop.
+        Failures are logged and treated as a miss.
+        """
+        if self.persistent_cache is None:
+            return None, False
+        return await asyncio.get_running_loop().run_in_executor(None, self._lookup_persistent_cache, cache_key)
+
+    def _lookup_persistent_cache(self, cache_key: str) -> Tuple[Optional[DataSet], bool]:
+        try:
+            cached_data, stale = self.persistent_cache.get_stale(cache_key)
+            # Entries written before agents returned DataSet objects hold plain dicts
+            if isinstance(cached_data, dict):
+                cached_data = DataSet(**cached_data)
+            return cached_data, stale
+        except Exception as e:
+            self.logger.warning(f"Persistent cache read failed for {cache_key}: {str(e)}")
+            return None, False
+
+    def _write_persistent_cache(self, cache_key: str, data: DataSet) -> None:
+        """
+        Store data in the on-disk cache from a worker thread, so the response
+        does not wait for pickling and the disk. Failures are logged and ignored.
+        """
+        if self.persistent_cache is None:
+            return
+
+        def _write():
+            try:
+                self.persistent_cache.set(cache_key, data)
+            except Exception as e:
+                self.logger.warning(f"Persistent cache write failed for {cache_key}: {str(e)}")
+
+        asyncio.get_running_loop().run_in_executor(None, _write)
+
+    def read_snapshot(self, indicator_code: str, params: Dict[str, Any]) -> Optional[SeriesFrame]:
+        """
+        Look the request up in the local bulk snapshot (see ingest_snapshots.py).
+        Returns None if the source has no snapshot or it does not cover every
+        requested country; failures are logged and treated as a miss. Series
+        MasterAgent wrote back to the store are not used here (max_age=0), so
+        a fetch from this agent always reaches the snapshot or the API.
+        """
+        store = get_series_store() if self.snapshot_source else None
+        if store is None:
+            return None
+        try:
+            frame = store.read(
+                self.snapshot_source,
+                indicator_code,
+                self.get_countries(params),
+                int(params.get("start_year", 2000)),
+                int(params.get("end_year", 2023)),
+                max_age=0
+            )
+        except Exception as e:
+            self.logger.warning(f"Snapshot read failed for {indicator_code}: {str(e)}")
+            return None
+        if frame is not None:
+            self.logger.info(f"Answering {indicator_code} from the local snapshot")
+        return frame
+
+    @property
+    def upstream_host(self) -> str:
+        """Host the agent's requests go to; rate limits and breakers are per host."""
+        return urlparse(self.base_url).netloc or self.name
+
     async def handle_retry(self, func, max_retries: int = 3, delay: int = 1):
         """
-        Retry mechanism for failed requests
+        Retry mechanism for failed requests.
+        Each attempt goes through the host's rate limiter and circuit breaker.
+        Only retryable errors (throttling, 5xx, timeouts, connection errors)
+        are retried, waiting at least as long as Retry-After asks. A
+        Retry-After longer than MAX_WAIT is not waited out here: the guard has
+        opened the host's circuit for it, and the error is raised at once.
         """
+        guard = get_guard(self.upstream_host)
         for attempt in range(max_retries):
             try:
-                return await func()
+                return await guard.call(func)
             except Exception as e:
-                if attempt == max_retries - 1:
+                retry_after = getattr(e, "retry_after", None)
+                if attempt == max_retries - 1 or not is_retryable(e) or (retry_after or 0) > MAX_WAIT:
                     raise
-                self.logger.warning(f"Attempt {attempt + 1} failed, retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
-                delay *= 2  # Exponential backoff 
-
-    def convert_to_unit(self, data_points: list[DataPoint], target_unit: str) -> list[DataPoint]:
-        """
-        Convert data points to the target unit.
-        """
-        # Get the conversion factor for the target unit
-        target_conversion_factor = conversion_factors.get(target_unit.lower(), 1.0)
-
-        # Convert each data point
-        converted_data_points = []
-        for point in data_points:
-            # Determine the current unit conversion factor
-            current_unit = point.additional_info.get("unit", "trillions").lower()
-            current_conversion_factor = conversion_factors.get(current_unit, 1.0)
-
-            # Convert value to target unit
-            converted_value = point.value * (current_conversion_factor / target_conversion_factor)
-            converted_data_points.append(DataPoint(
-                value=converted_value,
-                year=point.year,
-                country_code=point.country_code,
-                country_name=point.country_name,
-                additional_info=point.additional_info
-            ))
-
-        return converted_data_points 
-
-    def determine_unit(self, value: float) -> str:
-        """
-        Determine the unit of the data based on the number of digits.
-        """
-        num_digits = len(str(int(value)))
-        if num_digits <= 6:
-            return "units"
-        elif num_digits <= 9:
-            return "millions"
-        elif num_digits <= 12:
-            return "billions"
-        else:
-            return "trillions" 
\ No newline at end of file
+                wait = backoff_delay(attempt, delay, retry_after)
+                self.logger.warning(f"Attempt {attempt + 1} failed, retrying in {wait:.1f} seconds...")
+                await asyncio.sleep(wait)
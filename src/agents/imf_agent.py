@@ -1,14 +1,24 @@
-from typing import Dict, Any
+from typing import Dict, Any, Union
 import asyncio
 from datetime import datetime
 import aiohttp
-from .base_agent import BaseAgent, SharedState , conversion_factors
+from .base_agent import BaseAgent
 from ..schemas.data_schema import DataSet, DataPoint, Metadata, DataSource
+from ..schemas.series_frame import SeriesFrame
+from ..utils.resilience import UpstreamError
+from ..utils.unit_normalization import IMF_SOURCE_UNITS, normalize_series
 
 class IMFAgent(BaseAgent):
+    # WEO figures are only revised twice a year (April and October)
+    persistent_cache_duration = 30 * 24 * 3600
+    # NGDPD/USA/CHN/IND
+    country_separator = "/"
+    # WEO bulk file ingested with ingest_snapshots.py
+    snapshot_source = "imf"
+
     def __init__(self):
         super().__init__("IMF")
-        self.base_url = "http://dataservices.imf.org/REST/SDMX_JSON.svc"
+        self.base_url = "https://www.imf.org/external/datamapper/api/v1"
         self.indicators_mapping = {
     
                 # National Accounts
@@ -189,88 +199,10 @@ class IMFAgent(BaseAgent):
         """Return list of available indicators"""
         return sorted(self.indicators_mapping.keys())
 
-    def count_digits_before_decimal(self, value: float) -> int:
-        """
-        Count the number of digits before the decimal point in a floating-point number.
-        
-        Args:
-            value: A floating-point number
-            
-        Returns:
-            The number of digits before the decimal point
-            
-        Examples:
-            count_digits_before_decimal(1.23456) -> 1
-            count_digits_before_decimal(12.3456) -> 2
-            count_digits_before_decimal(123.456) -> 3
-            count_digits_before_decimal(1234.56) -> 4
-        """
-        # Convert to string and split at decimal point
-        str_value = str(value)
-        parts = str_value.split('.')
-        
-        # Return the length of the integer part
-        return len(parts[0])
-
-    def determine_adjustment_factor(self, value: float, target_unit: str) -> float:
-        """
-        Determine the adjustment factor based on the number of digits before the decimal point
-        and the target unit.
-        
-        Args:
-            value: The value to adjust
-            target_unit: The target unit (trillions, billions, millions)
-            
-        Returns:
-            The adjustment factor to apply to the value
-        """
-        digits_before = self.count_digits_before_decimal(value)
-        
-        # Handle trillions
-        if target_unit == "trillions":
-            if digits_before == 1:
-                return 1000000000  # 1 trillion
-            elif digits_before == 2:
-                return 1000000000   # 10 trillion
-            elif digits_before == 3:
-                return 1000000000    # 100 trillion
-            elif digits_before == 4:
-                return 1000000000     # 1 quadrillion
-            else:
-                return 1000000000  # Default case
-        
-        # Handle billions
-        elif target_unit == "billions":
-            if digits_before == 1:
-                return 1000000000  # 1 billion
-            elif digits_before == 2:
-                return 1000000000   # 10 billion
-            elif digits_before == 3:
-                return 1000000000    # 100 billion
-            elif digits_before == 4:
-                return 1000000000     # 1 trillion
-            else:
-                return 1  # Default case
-        
-        # Handle millions
-        elif target_unit == "millions":
-            if digits_before == 1:
-                return 1000000  # 1 million
-            elif digits_before == 2:
-                return 1000000   # 10 million
-            elif digits_before == 3:
-                return 1000000    # 100 million
-            elif digits_before == 4:
-                return 1000000     # 1 billion
-            else:
-                return 1  # Default case
-        
-        # Default case
-        return 1
-
-    async def fetch_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def fetch_data(self, params: Dict[str, Any]) -> Union[SeriesFrame, Dict[str, Any]]:
         """
-        Fetch data from IMF API
+        Fetch data from IMF API, or from the local WEO snapshot when it has
+        the indicator for every requested country
         """
         if not self.session:
             raise RuntimeError("Session not initialized. Use async context manager.")
@@ -288,9 +220,13 @@ class IMFAgent(BaseAgent):
             available = ", ".join(self.get_available_indicators())
             raise ValueError(f"Invalid indicator. Available indicators are: {available}")
 
+        snapshot = self.read_snapshot(indicator_code, params)
+        if snapshot is not None:
+            return snapshot
+
         # IMF specific endpoint construction
         years = ','.join(str(year) for year in range(int(start_year), int(end_year) + 1))
-        url = f"https://www.imf.org/external/datamapper/api/v1/{indicator_code}/{country}?periods={years}"
+        url = f"{self.base_url}/{indicator_code}/{self.join_countries(params)}?periods={years}"
 
         print(f"IMF API URL: {url}")
 
@@ -299,88 +235,73 @@ class IMFAgent(BaseAgent):
         async def _fetch():
             async with self.session.get(url) as response:
                 if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"IMF API error: {error_text}")
+                    raise await UpstreamError.from_response(response, "IMF API error")
                 return await response.json()
 
         return await self.handle_retry(_fetch)
 
-    async def transform_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def transform_data(self, raw_data: Union[SeriesFrame, Dict[str, Any]]) -> DataSet:
         """
         Transform IMF data into unified schema
         """
         try:
-            # Extract data series from IMF response
-            values = raw_data.get("values", {})
-            if not values:
-                raise ValueError("No data found in IMF response")
-
-            transformed_data_points = []
-            for indicator_code, countries in values.items():
-                for country_code, data in countries.items():
-                    for year, value in data.items():
-                        # Count digits before decimal for this value
-                        digits_before_decimal = self.count_digits_before_decimal(value)
-                        
-                        # Determine the target unit based on World Bank data
-                        target_unit = "trillions"  # Default to trillions
-                        wb_unit = SharedState.get_wb_unit()
-                        if wb_unit != 'unknown':
-                            target_unit = wb_unit
-                        
-                        # Determine the adjustment factor based on the target unit
-                        adjustment_factor = self.determine_adjustment_factor(value, target_unit)
-                        
-                        # Apply the adjustment factor to the value
-                        adjusted_value = float(value) * adjustment_factor
-                        
-                        transformed_data_points.append(
-                            DataPoint(
-                                value=adjusted_value,
-                                year=int(year),
-                                country_code=country_code,
-                                country_name="",  # Country name not provided in this structure
-                                additional_info={
-                                    "indicator_id": indicator_code,
-                                    "digits_before_decimal": digits_before_decimal,
-                                    "original_value": float(value),
-                                    "adjustment_factor": adjustment_factor,
-                                    "target_unit": target_unit
-                                }
-                            )
-                        )
-
-            # Access the units from SharedState
-            un_unit = SharedState.get_un_unit()
-            wb_unit = SharedState.get_wb_unit()
-
-            print(f"UN Unit: {un_unit}, WB Unit: {wb_unit}")  # Debugging output
-
-            # Use the same unit as World Bank data when available, otherwise default to trillions
-            target_unit = 'trillions'  # Default to trillions
-            if wb_unit != 'unknown':
-                target_unit = wb_unit
-                print(f"Using World Bank unit for IMF data: {target_unit}")  # Debugging output
+            if isinstance(raw_data, SeriesFrame):
+                # Read from the local snapshot, which is stored in base units
+                frame = raw_data
+                if not len(frame):
+                    raise ValueError("No data found in IMF snapshot")
+                source_unit = "units"
             else:
-                print(f"Using default unit for IMF data: {target_unit}")  # Debugging output
+                frame = self._frame_from_response(raw_data)
+                source_unit = frame.info["source_unit"]
 
-            # Sort data points by year
-            transformed_data_points.sort(key=lambda x: x.year)
+            # DataMapper publishes aggregates in billions or millions; convert the whole
+            # series from its source unit in one multiply. MasterAgent aligns units across
+            # sources after all of them have returned.
+            frame, target_unit, scale_factor = normalize_series(frame, source_unit)
 
-            dataset = DataSet(
-                metadata=Metadata(
+            dataset = frame.to_dataset(
+                Metadata(
                     source=DataSource.IMF,
-                    indicator_code=indicator_code,
-                    indicator_name="",  # Indicator name not provided in this structure
+                    indicator_code=frame.info.get("indicator_id", ""),
+                    # The API response has no indicator name; the WEO snapshot does
+                    indicator_name=frame.info.get("indicator_name", ""),
                     last_updated=datetime.now(),
                     frequency="yearly",  # Assuming yearly frequency
-                    unit=target_unit  # Store the target unit
+                    unit=target_unit,  # Store the target unit
+                    scale_factor=scale_factor
                 ),
-                data=transformed_data_points
+                materialize=False
             )
 
-            return dataset.dict()
+            return dataset
         except Exception as e:
             self.logger.error(f"Error transforming IMF data: {str(e)}")
-            raise 
-    
\ No newline at end of file
+            raise
+
+    def _frame_from_response(self, raw_data: Dict[str, Any]) -> SeriesFrame:
+        """
+        Collect the observations of an IMF DataMapper response into a frame
+        """
+        # Extract data series from IMF response
+        values = raw_data.get("values", {})
+        if not values:
+            raise ValueError("No data found in IMF response")
+
+        # Collect the observations column by column
+        years, original_values, country_codes = [], [], []
+        for indicator_code, countries in values.items():
+            for country_code, data in countries.items():
+                for year, value in data.items():
+                    years.append(int(year))
+                    original_values.append(float(value))
+                    country_codes.append(country_code)
+
+        return SeriesFrame.from_columns(
+            years, original_values, country_codes,
+            info={
+                "indicator_id": indicator_code,
+                "source_unit": IMF_SOURCE_UNITS.get(indicator_code, "units")
+            },
+            extras={"original_value": original_values}
+        ).sort_by_year()
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Dict, Any, List, Type, Optional
+from typing import Dict, Any, List, Type, Optional, Tuple, Union
 import logging
 from datetime import datetime
 import os
@@ -8,28 +8,59 @@ import hashlib
 import json
 
 from .base_agent import BaseAgent
-from .world_bank_agent import WorldBankAgent
-from .imf_agent import IMFAgent
-from .oecd_agent import OECDAgent
-from .un_agent import UNAgent
+from .prewarm import QueryPopularity
+from .registry import IndicatorRegistry, get_registry
 from ..schemas.data_schema import AggregatedDataResponse, DataSet, Metadata, DataSource, DataPoint
+from ..schemas.series_frame import SeriesFrame
 from ..utils.mistral_analyzer import MistralAnalyzer
+from ..utils.cache import get_cache
+from ..utils.single_flight import SingleFlight
+from ..utils.series_store import get_series_store
+from ..utils.unit_normalization import UNIT_SCALES, common_unit, normalize_series, rescale
 
 load_dotenv()
 
+# Default order in which sources fill a year when several of them report it
+DEFAULT_SOURCE_PRIORITY = [DataSource.WORLD_BANK, DataSource.IMF, DataSource.OECD, DataSource.UN]
+
+# Longest the fetch stage of a query waits for all sources together, in seconds
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "15"))
+# Longest a single source may take; SDMX sources get more by default
+SOURCE_TIMEOUT = float(os.getenv("SOURCE_TIMEOUT", "10"))
+DEFAULT_SOURCE_TIMEOUTS = {"oecd": 12.0, "un": 12.0}
+# After how many seconds a slow source gets a duplicate (hedged) request; unset disables hedging
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY")) if os.getenv("HEDGE_DELAY") else None
+# How long a response missing some sources is cached; late results land in the
+# agent caches meanwhile, so the next query is complete and fast
+PARTIAL_CACHE_DURATION = 60
+
 class MasterAgent:
-    def __init__(self):
+    def __init__(
+        self,
+        source_priority: Optional[List[DataSource]] = None,
+        deadline: float = FETCH_DEADLINE,
+        source_timeouts: Optional[Dict[str, float]] = None,
+        hedge_delay: Optional[float] = HEDGE_DELAY,
+        registry: Optional[IndicatorRegistry] = None
+    ):
         self.logger = logging.getLogger("MasterAgent")
-        self.agents: Dict[str, Type[BaseAgent]] = {
-            "world_bank": WorldBankAgent,
-            "imf": IMFAgent,
-            "oecd": OECDAgent,
-            "un": UNAgent,
-        }
+        # Sources earlier in the list win when merging; sources not listed are ignored
+        self.source_priority = list(source_priority or DEFAULT_SOURCE_PRIORITY)
+        # Sources still running at the deadline are left out of the response
+        self.deadline = deadline
+        self.source_timeouts = {**DEFAULT_SOURCE_TIMEOUTS, **(source_timeouts or {})}
+        self.hedge_delay = hedge_delay
+        # Routes each indicator to the sources that support it; built once per process
+        self.registry = registry or get_registry()
+        self.agents: Dict[str, Type[BaseAgent]] = self.registry.agents
         
         # Initialize cache
-        self.cache = {}
         self.cache_duration = 3600  # 1 hour cache duration
+        self.cache = get_cache("master:responses", ttl=self.cache_duration, max_entries=512)
+        # Concurrent identical queries share one set of upstream calls and one analysis
+        self.flights = SingleFlight("master")
+        # Request counts per query, used to keep popular responses warm (see PrewarmScheduler)
+        self.popularity = QueryPopularity()
         
         try:
             self.analyzer = MistralAnalyzer()
@@ -51,97 +82,129 @@ class MasterAgent:
         params_str = json.dumps(simplified_params, sort_keys=True)
         return hashlib.md5(params_str.encode()).hexdigest()
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if the cached data is still valid"""
-        if cache_key not in self.cache:
-            return False
-        cached_time = self.cache[cache_key]["timestamp"]
-        return (datetime.now() - cached_time).seconds < self.cache_duration
-
     async def _merge_datasets(self, datasets: List[DataSet]) -> DataSet:
         """
-        Merge datasets from all sources into a single dataset.
+        Merge datasets from all sources into a single dataset, taking each year
+        from the highest-priority source that reports it (see source_priority).
+        The result carries only its SeriesFrame; call materialize() for points.
         """
-        merged_data_points = {}
-
-        # Collect all unique years from the datasets
-        all_years = set()
-        for dataset in datasets:
-            for data_point in dataset.data:
-                all_years.add(data_point.year)
+        rank = {source: position for position, source in enumerate(self.source_priority)}
+        ranked_datasets = sorted(
+            (dataset for dataset in datasets if dataset.metadata.source in rank),
+            key=lambda dataset: rank[dataset.metadata.source]
+        )
 
-        # Prioritize World Bank data and fill missing years with IMF data
-        for year in sorted(all_years):
-            wb_data_point = next((dp for ds in datasets if ds.metadata.source == DataSource.WORLD_BANK for dp in ds.data if dp.year == year), None)
-            imf_data_point = next((dp for ds in datasets if ds.metadata.source == DataSource.IMF for dp in ds.data if dp.year == year), None)
+        frames, unit = self._normalize_units(ranked_datasets)
 
-            if wb_data_point:
-                # Use World Bank data if available
-                merged_data_points[year] = wb_data_point
-            elif imf_data_point:
-                # Use IMF data if World Bank data is not available
-                merged_data_points[year] = imf_data_point
+        # Merge in columnar form: each year is taken from the highest-priority
+        # source that reports it. DataPoints are not built at all; the response
+        # is serialized from the frames (see AggregatedDataResponse.to_dict)
+        merged_frame = SeriesFrame.merge(frames)
 
         # Create a merged dataset with normalized unit
-        merged_dataset = DataSet(
-            metadata=Metadata(
+        merged_dataset = merged_frame.to_dataset(
+            Metadata(
                 source=DataSource.WORLD_BANK,  # Use a generic source
                 indicator_code="merged",
                 indicator_name="Merged Data",
                 last_updated=datetime.now(),
                 frequency="yearly",
-                unit="trillions"  # Set the unit to trillions
+                unit=unit,
+                scale_factor=UNIT_SCALES[unit]
             ),
-            data=list(merged_data_points.values())
+            # Keep the sources' notes, e.g. that one of them served stale data
+            warning_log=[message for dataset in ranked_datasets for message in dataset.warning_log],
+            materialize=False
         )
 
         return merged_dataset
 
+    def _split_by_country(self, merged_dataset: DataSet, countries: List[str]) -> List[DataSet]:
+        """
+        Split a merged multi-country dataset into one dataset per requested
+        country, in the order they were asked for. Like the merged dataset,
+        they carry only their frames.
+        """
+        if len(countries) <= 1:
+            return [merged_dataset]
+
+        frames = SeriesFrame.of(merged_dataset).split_by_country()
+        empty = SeriesFrame.from_columns([], [], [])
+        return [
+            frames.get(country, empty).to_dataset(
+                merged_dataset.metadata.model_copy(),
+                warning_log=list(merged_dataset.warning_log),
+                materialize=False
+            )
+            for country in countries
+        ]
+
+    def _normalize_units(self, datasets: List[DataSet]) -> Tuple[List[SeriesFrame], str]:
+        """
+        Per-request normalization stage, run once every source has returned.
+        Agents each report their own unit and scale factor; here one unit is
+        picked for the whole request and every series is converted to it, so
+        the result does not depend on which agent finished first.
+        """
+        frames = [SeriesFrame.of(dataset) for dataset in datasets]
+        scale_factors = [dataset.metadata.scale_factor for dataset in datasets]
+        unit = common_unit(frames, scale_factors)
+        return [rescale(frame, scale_factor, unit) for frame, scale_factor in zip(frames, scale_factors)], unit
+
+    def record_request(self, params: Dict[str, Any], analysis: bool = False) -> str:
+        """
+        Count a request for a query towards its popularity and return its
+        cache key. Callers answering from their own cache call this too, so
+        the queries they serve are still kept warm here.
+        """
+        cache_key = self._get_cache_key(params)
+        self.popularity.record(cache_key, params, analysis=analysis)
+        return cache_key
+
+    def record_analysis(self, params: Dict[str, Any]) -> None:
+        """
+        Note that the analysis of a query was requested on its own, so the
+        analysis is kept warm along with the data.
+        """
+        self.popularity.mark_analysis(self._get_cache_key(params), params)
+
     async def fetch_data_only(self, params: Dict[str, Any]) -> AggregatedDataResponse:
         """
         Fetch only raw data without performing analysis.
         This is used for progressive loading where we want to display data immediately.
         """
         # Check cache first
-        cache_key = self._get_cache_key(params)
-        if self._is_cache_valid(cache_key):
+        cache_key = self.record_request(params)
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
             self.logger.info(f"Returning cached data for {params.get('indicator')}, {params.get('country')}")
-            return self.cache[cache_key]["response"]
-        
-        # Only fetch from agents that support the requested indicator
-        indicator = params.get("indicator", "").lower()
-        tasks = []
-        async with asyncio.TaskGroup() as group:
-            for agent_name, agent_class in self.agents.items():
-                # Skip agents that don't support this indicator
-                agent = agent_class()
-                if hasattr(agent, "get_available_indicators") and indicator in agent.get_available_indicators():
-                    tasks.append(
-                        group.create_task(
-                            self._fetch_from_agent(agent_class, params)
-                        )
-                    )
+            return cached_response
+
+        return await self.flights.do(("data", cache_key), lambda: self._build_data_response(params, cache_key))
 
-        results = [task.result() for task in tasks if not task.cancelled()]
+    async def _build_data_response(self, params: Dict[str, Any], cache_key: str, fresh: bool = False) -> AggregatedDataResponse:
+        """
+        Fetch and merge data from the agents, then cache the response.
+        With fresh the agents' caches are bypassed (see _fetch_from_agent).
+        """
+        results = await self._fetch_sources(params, fresh=fresh)
 
         # Merge datasets
-        merged_dataset = await self._merge_datasets([DataSet(**result) for result in results if "error" not in result])
+        merged_dataset = await self._merge_datasets([result for result in results if isinstance(result, DataSet)])
+        datasets = self._split_by_country(merged_dataset, BaseAgent.get_countries(params))
 
         # Create response without analysis
         response = AggregatedDataResponse(
             query_params=params,
             timestamp=datetime.now(),
-            datasets=[merged_dataset],
-            status="completed" if not any("error" in result for result in results) else "partial_success",
-            error_summary={result["agent"]: [result["error"]] for result in results if "error" in result},
+            datasets=datasets,
+            status="completed" if all(isinstance(result, DataSet) for result in results) else "partial_success",
+            error_summary={result["agent"]: [result["error"]] for result in results if not isinstance(result, DataSet)},
             analyses={}  # Empty analyses since we're not performing analysis
         )
         
         # Cache the response
-        self.cache[cache_key] = {
-            "response": response,
-            "timestamp": datetime.now()
-        }
+        self._cache_response(cache_key, response)
 
         return response
 
@@ -150,40 +213,54 @@ class MasterAgent:
         Fetch data from all available agents concurrently and merge the results.
         """
         # Check cache first
-        cache_key = self._get_cache_key(params)
-        if self._is_cache_valid(cache_key):
+        cache_key = self.record_request(params, analysis=True)
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
             self.logger.info(f"Returning cached data for {params.get('indicator')}, {params.get('country')}")
-            return self.cache[cache_key]["response"]
-        
-        # Only fetch from agents that support the requested indicator
-        indicator = params.get("indicator", "").lower()
-        tasks = []
-        async with asyncio.TaskGroup() as group:
-            for agent_name, agent_class in self.agents.items():
-                # Skip agents that don't support this indicator
-                agent = agent_class()
-                if hasattr(agent, "get_available_indicators") and indicator in agent.get_available_indicators():
-                    tasks.append(
-                        group.create_task(
-                            self._fetch_from_agent(agent_class, params)
-                        )
-                    )
+            return cached_response
 
-        results = [task.result() for task in tasks if not task.cancelled()]
+        return await self.flights.do(("analysis", cache_key), lambda: self._build_full_response(params, cache_key))
+
+    async def _build_full_response(
+        self,
+        params: Dict[str, Any],
+        cache_key: str,
+        fresh: bool = False
+    ) -> AggregatedDataResponse:
+        """
+        Fetch, merge and analyze data from the agents, then cache the response.
+        With fresh the agents' caches are bypassed and the analyses are
+        regenerated even if the analyzer has them cached.
+        """
+        results = await self._fetch_sources(params, fresh=fresh)
 
         # Merge datasets
-        merged_dataset = await self._merge_datasets([DataSet(**result) for result in results if "error" not in result])
+        merged_dataset = await self._merge_datasets([result for result in results if isinstance(result, DataSet)])
+        countries = BaseAgent.get_countries(params)
+        datasets = self._split_by_country(merged_dataset, countries)
 
-        # Analyze merged data
+        # Analyze merged data; comparison queries get one analysis per country
         analyses = {}
         if self.analyzer:
             try:
-                analysis = await self.analyzer.analyze_data(
-                    country=params.get("country", "Unknown"),
-                    indicator=params.get("indicator", "Unknown"),
-                    data=merged_dataset.dict()
-                )
-                analyses["merged"] = analysis
+                if len(datasets) == 1:
+                    analyses["merged"] = await self.analyzer.analyze_data(
+                        country=params.get("country", "Unknown"),
+                        indicator=params.get("indicator", "Unknown"),
+                        data=merged_dataset.to_dict(),
+                        refresh=fresh
+                    )
+                else:
+                    results_by_country = await asyncio.gather(*(
+                        self.analyzer.analyze_data(
+                            country=country,
+                            indicator=params.get("indicator", "Unknown"),
+                            data=dataset.to_dict(),
+                            refresh=fresh
+                        )
+                        for country, dataset in zip(countries, datasets)
+                    ))
+                    analyses.update(zip(countries, results_by_country))
             except Exception as e:
                 self.logger.error(f"Error analyzing merged data: {str(e)}")
                 analyses["error"] = f"Analysis failed: {str(e)}"
@@ -193,27 +270,98 @@ class MasterAgent:
         response = AggregatedDataResponse(
             query_params=params,
             timestamp=datetime.now(),
-            datasets=[merged_dataset],
-            status="completed" if not any("error" in result for result in results) else "partial_success",
-            error_summary={result["agent"]: [result["error"]] for result in results if "error" in result},
+            datasets=datasets,
+            status="completed" if all(isinstance(result, DataSet) for result in results) else "partial_success",
+            error_summary={result["agent"]: [result["error"]] for result in results if not isinstance(result, DataSet)},
             analyses=analyses
         )
         
         # Cache the response
-        self.cache[cache_key] = {
-            "response": response,
-            "timestamp": datetime.now()
-        }
+        self._cache_response(cache_key, response)
 
         return response
 
-    async def _fetch_from_agent(self, agent_class: Type[BaseAgent], params: Dict[str, Any]) -> Dict[str, Any]:
+    def _cache_response(self, cache_key: str, response: AggregatedDataResponse) -> None:
+        """
+        Cache a response; one missing sources or built from stale source data
+        only briefly, so it is rebuilt once the agents' caches are refreshed.
+        """
+        if response.status == "completed" and not any(dataset.warning_log for dataset in response.datasets):
+            self.cache.set(cache_key, response)
+        else:
+            self.cache.set(cache_key, response, ttl=PARTIAL_CACHE_DURATION)
+
+    async def _fetch_sources(self, params: Dict[str, Any], fresh: bool = False) -> List[Union[DataSet, Dict[str, Any]]]:
         """
-        Fetch data from a single agent with error handling
+        Fetch from every agent that supports the indicator, concurrently.
+
+        Each source has its own timeout and the whole stage has a deadline;
+        sources that miss them are reported as errors so the response is built
+        from whatever finished. Their upstream requests keep running in the
+        background and fill the agent caches for the next query.
+        """
+        # Only fetch from agents that support the requested indicator
+        tasks = {
+            agent_name: asyncio.ensure_future(
+                self._fetch_from_agent(agent_name, self.agents[agent_name], params, fresh=fresh)
+            )
+            for agent_name in self.registry.sources_for(params.get("indicator", ""))
+        }
+
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for agent_name, task in tasks.items():
+            if task in done:
+                results.append(task.result())
+            else:
+                self.logger.warning(f"{agent_name} missed the {self.deadline}s deadline")
+                results.append({
+                    "error": f"No response within the {self.deadline}s deadline",
+                    "agent": self.agents[agent_name].__name__
+                })
+        return results
+
+    async def _fetch_from_agent(
+        self,
+        agent_name: str,
+        agent_class: Type[BaseAgent],
+        params: Dict[str, Any],
+        fresh: bool = False
+    ) -> Union[DataSet, Dict[str, Any]]:
+        """
+        Fetch data from a single agent with error handling.
+        Returns the agent's DataSet, or an error dict if the fetch failed or
+        took longer than the source's timeout. With fresh the agent's caches
+        and the fetched series in the store are bypassed (ingested snapshots
+        are still used), so a refresh does not rebuild from copies that
+        expire along with the response.
         """
+        # Store reads touch the disk, so they run on a worker thread like the writes
+        stored = await asyncio.get_running_loop().run_in_executor(
+            None, self._read_store, agent_name, agent_class, params, fresh
+        )
+        if stored is not None:
+            return stored
+
+        timeout = self.source_timeouts.get(agent_name, SOURCE_TIMEOUT)
         try:
             async with agent_class() as agent:
-                return await agent.get_data(params)
+                fetch = self._get_fresh(agent, params) if fresh else self._get_hedged(agent, params)
+                dataset = await asyncio.wait_for(fetch, timeout)
+            self._write_store(agent_name, params, dataset)
+            return dataset
+        except asyncio.TimeoutError:
+            self.logger.warning(f"{agent_class.__name__} timed out after {timeout}s")
+            return {
+                "error": f"Timed out after {timeout}s",
+                "agent": agent_class.__name__
+            }
         except Exception as e:
             self.logger.error(f"Error fetching data from {agent_class.__name__}: {str(e)}")
             return {
@@ -221,6 +369,145 @@ class MasterAgent:
                 "agent": agent_class.__name__
             }
 
+    def _read_store(
+        self,
+        agent_name: str,
+        agent_class: Type[BaseAgent],
+        params: Dict[str, Any],
+        snapshots_only: bool = False
+    ) -> Optional[DataSet]:
+        """
+        Look the source's series up in the local series store: ingested
+        snapshots, or data fetched earlier and still younger than the agent's
+        persistent cache duration. A hit skips the agent entirely. With
+        snapshots_only fetched data is ignored however young it is.
+        """
+        store = get_series_store()
+        indicator_code = self.registry.indicator_code(agent_name, params.get("indicator", ""))
+        if store is None or indicator_code is None:
+            return None
+        try:
+            frame = store.read(
+                agent_name,
+                indicator_code,
+                BaseAgent.get_countries(params),
+                int(params.get("start_year", 2000)),
+                int(params.get("end_year", 2023)),
+                max_age=0 if snapshots_only else agent_class.persistent_cache_duration
+            )
+            if frame is None:
+                return None
+            entry = store.entry(agent_name, indicator_code)
+            # Stored in base units; pick the display unit as the agents do
+            frame, unit, scale_factor = normalize_series(frame)
+            dataset = frame.to_dataset(
+                Metadata(
+                    source=DataSource(agent_name),
+                    indicator_code=indicator_code,
+                    indicator_name=entry.get("indicator_name", ""),
+                    last_updated=datetime.fromtimestamp(entry.get("stored_at", 0)),
+                    frequency=entry.get("frequency", "yearly"),
+                    unit=unit,
+                    scale_factor=scale_factor
+                ),
+                materialize=False
+            )
+        except Exception as e:
+            self.logger.warning(f"Series store read failed for {agent_name}/{indicator_code}: {str(e)}")
+            return None
+        self.logger.info(f"Answering {agent_name}/{indicator_code} from the series store")
+        return dataset
+
+    def _write_store(self, agent_name: str, params: Dict[str, Any], dataset: DataSet) -> None:
+        """
+        Write a fetched dataset through to the series store from a worker
+        thread, so the response does not wait for the disk. Datasets with
+        warnings (e.g. stale data served while the agent revalidates) are not
+        written, since the store would serve them as freshly fetched.
+        """
+        store = get_series_store()
+        indicator_code = self.registry.indicator_code(agent_name, params.get("indicator", ""))
+        if store is None or indicator_code is None or dataset.warning_log:
+            return
+
+        def _write():
+            try:
+                store.write_dataset(
+                    agent_name,
+                    indicator_code,
+                    dataset,
+                    BaseAgent.get_countries(params),
+                    int(params.get("start_year", 2000)),
+                    int(params.get("end_year", 2023))
+                )
+            except Exception as e:
+                self.logger.warning(f"Series store write failed for {agent_name}/{indicator_code}: {str(e)}")
+
+        asyncio.get_running_loop().run_in_executor(None, _write)
+
+    async def _get_fresh(self, agent: BaseAgent, params: Dict[str, Any]) -> DataSet:
+        """
+        Get data straight from upstream, refreshing the agent's caches. If the
+        upstream request fails, fall back to whatever the caches hold (possibly
+        stale) rather than dropping the source from the response.
+        """
+        try:
+            return await agent.fetch_fresh(params)
+        except Exception as e:
+            self.logger.warning(f"Refreshing {agent.name} failed, using its cached data: {str(e)}")
+            return await agent.get_data(params)
+
+    async def _get_hedged(self, agent: BaseAgent, params: Dict[str, Any]) -> DataSet:
+        """
+        Get data from an agent; if it has not answered within hedge_delay, send
+        a duplicate request straight upstream and take whichever succeeds first.
+        The duplicate bypasses the agent's request coalescing, which would
+        otherwise just join the slow request.
+        """
+        primary = asyncio.ensure_future(agent.get_data(params))
+        if self.hedge_delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if not done:
+                self.logger.info(f"{agent.name} slower than {self.hedge_delay}s, sending hedged request")
+                tasks.add(asyncio.ensure_future(agent.fetch_fresh(params)))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing request is abandoned; a coalesced one keeps running for its other callers
+            for task in tasks:
+                task.cancel()
+
+    async def refresh(self, params: Dict[str, Any], with_analysis: bool = False, fresh: bool = True) -> AggregatedDataResponse:
+        """
+        Rebuild and re-cache a response without looking at the response cache.
+        Used by PrewarmScheduler; joins a build of the same query already in flight.
+
+        With fresh the data is fetched from upstream, bypassing the agents'
+        caches (which would otherwise expire along with the response), and the
+        analyses are regenerated. Without it the response is rebuilt from the
+        caches shared by all workers, which the fresh refresh keeps warm.
+        With with_analysis the analyses land in the analyzer's cache under the
+        same keys /mcp/analyze/stream looks up (one per requested country,
+        over that country's dataset).
+        """
+        cache_key = self._get_cache_key(params)
+        if with_analysis:
+            return await self.flights.do(
+                ("analysis", cache_key), lambda: self._build_full_response(params, cache_key, fresh=fresh)
+            )
+        return await self.flights.do(("data", cache_key), lambda: self._build_data_response(params, cache_key, fresh=fresh))
+
     async def fetch_with_retry(self, params: Dict[str, Any], max_retries: int = 2) -> AggregatedDataResponse:
         """
         Fetch data with retry mechanism
@@ -247,13 +534,4 @@ class MasterAgent:
         """
         Get available indicators from all agents
         """
-        indicators = {}
-        for agent_name, agent_class in self.agents.items():
-            try:
-                agent = agent_class()
-                if hasattr(agent, "get_available_indicators"):
-                    indicators[agent_name] = agent.get_available_indicators()
-            except Exception as e:
-                self.logger.error(f"Error getting indicators from {agent_name}: {str(e)}")
-                indicators[agent_name] = []
-        return indicators 
\ No newline at end of file
+        return self.registry.indicators_by_source()
@@ -1,11 +1,19 @@
-from typing import Dict, Any
+from typing import Dict, Any, Union
 import asyncio
 from datetime import datetime
 import aiohttp
 from .base_agent import BaseAgent
 from ..schemas.data_schema import DataSet, DataPoint, Metadata, DataSource
+from ..schemas.series_frame import SeriesFrame
+from ..utils.resilience import UpstreamError
+from ..utils.sdmx import FREQUENCY_DIMENSIONS, StructureIndex, base_unit_values, observation_columns
+from ..utils.sdmx_stream import SDMXData, read_sdmx_response
+from ..utils.unit_normalization import normalize_series
 
 class OECDAgent(BaseAgent):
+    # SDMX key with several LOCATION values: USA+CHN+IND
+    country_separator = "+"
+
     def __init__(self):
         super().__init__("OECD")
         self.base_url = "https://stats.oecd.org/SDMX-JSON/data"
@@ -47,7 +55,7 @@ class OECDAgent(BaseAgent):
             raise ValueError(f"Invalid indicator. Available indicators are: {available}")
 
         # OECD specific endpoint construction
-        url = f"{self.base_url}/{indicator_code}/{country}/all"
+        url = f"{self.base_url}/{indicator_code}/{self.join_countries(params)}/all"
         query_params = {
             "startTime": start_year,
             "endTime": end_year,
@@ -59,100 +67,73 @@ class OECDAgent(BaseAgent):
         async def _fetch():
             async with self.session.get(url, params=query_params) as response:
                 if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"OECD API error: {error_text}")
-                return await response.json()
+                    raise await UpstreamError.from_response(response, "OECD API error")
+                # Large SDMX-JSON bodies are parsed incrementally as they download
+                data = await read_sdmx_response(response)
+                # SDMX-JSON does not echo the dataflow path, so keep it for the metadata
+                data.dataflow = indicator_code
+                return data
 
         return await self.handle_retry(_fetch)
 
-    async def transform_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def transform_data(self, raw_data: Union[SDMXData, Dict[str, Any]]) -> DataSet:
         """
         Transform OECD data into unified schema
         """
         try:
-            # Extract data from OECD response
-            dataset = raw_data.get("dataSets", [{}])[0]
-            series = dataset.get("series", {})
-            if not series:
+            # Accept both the streamed columns and an already parsed document
+            data = raw_data if isinstance(raw_data, SDMXData) else SDMXData.from_json(raw_data)
+            if not len(data):
                 raise ValueError("No data found in OECD response")
 
+            # Decode series keys once and map observations to them by index
+            columns, index, _ = observation_columns(data)
+
             # Get metadata
-            structure = raw_data.get("structure", {})
-            dimensions = structure.get("dimensions", {}).get("observation", [])
-            time_periods = next((dim for dim in dimensions if dim.get("id") == "TIME_PERIOD"), {})
-            time_values = time_periods.get("values", [])
-
-            transformed_data_points = []
-            for serie_key, serie_data in series.items():
-                observations = serie_data.get("observations", {})
-                for time_idx, obs in observations.items():
-                    if obs and obs[0] is not None:  # OECD typically puts the value in first position
-                        time_period = time_values[int(time_idx)].get("id")
-                        transformed_data_points.append(
-                            DataPoint(
-                                value=float(obs[0]),
-                                year=int(time_period),
-                                country_code=country,
-                                country_name=self._get_country_name(structure, country),
-                                additional_info={
-                                    "unit": self._get_unit(structure),
-                                    "frequency": self._get_frequency(structure)
-                                }
-                            )
-                        )
+            unit = self._get_unit(index)
+            frequency = self._get_frequency(index)
 
-            # Sort data points by year
-            transformed_data_points.sort(key=lambda x: x.year)
+            # Series are published in a power of ten given by UNIT_MULT/POWERCODE; convert to base units
+            values = base_unit_values(data, columns, index)
 
-            dataset = DataSet(
-                metadata=Metadata(
+            # Sort data points by year
+            frame = SeriesFrame.from_columns(
+                columns["year"], values, columns["country_code"], columns["country_name"],
+                info={
+                    "unit": unit,
+                    "frequency": frequency
+                }
+            ).sort_by_year()
+
+            # Rescale the series to one unit chosen from its magnitude, as the other agents do
+            frame, display_unit, scale_factor = normalize_series(frame)
+
+            dataset = frame.to_dataset(
+                Metadata(
                     source=DataSource.OECD,
-                    indicator_code=indicator_code,
-                    indicator_name=self._get_indicator_name(structure),
+                    indicator_code=data.dataflow,
+                    indicator_name=self._get_indicator_name(index),
                     last_updated=datetime.now(),
-                    frequency=self._get_frequency(structure),
-                    unit=self._get_unit(structure)
+                    frequency=frequency,
+                    unit=display_unit,
+                    scale_factor=scale_factor
                 ),
-                data=transformed_data_points
+                materialize=False
             )
 
-            return dataset.dict()
+            return dataset
         except Exception as e:
             self.logger.error(f"Error transforming OECD data: {str(e)}")
             raise
 
-    def _get_country_name(self, structure: Dict[str, Any], country_code: str) -> str:
-        """Extract country name from OECD structure"""
-        try:
-            dimensions = structure.get("dimensions", {}).get("series", [])
-            country_dim = next((dim for dim in dimensions if dim.get("id") == "LOCATION"), {})
-            country_values = country_dim.get("values", [])
-            country = next((c for c in country_values if c.get("id") == country_code), {})
-            return country.get("name", country_code)
-        except Exception:
-            return country_code
-
-    def _get_indicator_name(self, structure: Dict[str, Any]) -> str:
+    def _get_indicator_name(self, index: StructureIndex) -> str:
         """Extract indicator name from OECD structure"""
-        try:
-            return structure.get("name", "")
-        except Exception:
-            return ""
+        return index.name
 
-    def _get_unit(self, structure: Dict[str, Any]) -> str:
+    def _get_unit(self, index: StructureIndex) -> str:
         """Extract unit from OECD structure"""
-        try:
-            attributes = structure.get("attributes", {}).get("series", [])
-            unit_attr = next((attr for attr in attributes if attr.get("id") == "UNIT"), {})
-            return unit_attr.get("name", "")
-        except Exception:
-            return ""
+        return index.attribute_name("UNIT")
 
-    def _get_frequency(self, structure: Dict[str, Any]) -> str:
+    def _get_frequency(self, index: StructureIndex) -> str:
         """Extract frequency from OECD structure"""
-        try:
-            dimensions = structure.get("dimensions", {}).get("series", [])
-            freq_dim = next((dim for dim in dimensions if dim.get("id") == "FREQUENCY"), {})
-            return freq_dim.get("name", "yearly")
-        except Exception:
-            return "yearly" 
\ No newline at end of file
+        return index.dimension_value_name(FREQUENCY_DIMENSIONS, "yearly")
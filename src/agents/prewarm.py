@@ -0,0 +1,237 @@
+import asyncio
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from ..utils.event_loop import BackgroundLoop
+from ..utils.series_store import STORE_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows: every worker refreshes from upstream
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger("Prewarm")
+
+# How many of the most popular queries are kept warm (0 disables prewarming)
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "30"))
+# Seconds between checks of the popular queries' cache entries
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "60"))
+# Entries expiring within this many seconds are refreshed
+PREWARM_MARGIN = float(os.getenv("PREWARM_MARGIN", "300"))
+# Popularity halves after this many seconds without requests
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE", str(6 * 3600)))
+# Lock file electing the one worker process that refreshes from upstream and
+# regenerates analyses; set to an empty string to let every worker do so
+PREWARM_LOCK_PATH = os.getenv("PREWARM_LOCK_PATH", os.path.join(STORE_PATH or ".cache", ".prewarm.lock"))
+
+
+class QueryPopularity:
+    """
+    Exponentially decayed request counts per query.
+
+    Each request adds one to its query's score and scores halve every
+    half_life seconds, so the ranking follows what is popular now. Only
+    max_tracked queries are kept; the least popular are dropped first.
+    """
+
+    def __init__(self, half_life: float = POPULARITY_HALF_LIFE, max_tracked: int = 1000, clock=time.monotonic):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self.clock = clock
+        # cache key -> [score, time of score, params, whether the analysis was asked for]
+        self._queries: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, since: float, now: float) -> float:
+        return score * math.pow(0.5, (now - since) / self.half_life)
+
+    def record(self, cache_key: str, params: Dict[str, Any], analysis: bool = False) -> None:
+        """Count one request for a query."""
+        now = self.clock()
+        with self._lock:
+            query = self._queries.get(cache_key)
+            if query is None:
+                self._queries[cache_key] = [1.0, now, dict(params), analysis]
+                if len(self._queries) > self.max_tracked:
+                    self._trim(now)
+                return
+            query[0] = self._decayed(query[0], query[1], now) + 1.0
+            query[1] = now
+            query[2] = dict(params)
+            query[3] = query[3] or analysis
+
+    def mark_analysis(self, cache_key: str, params: Dict[str, Any]) -> None:
+        """
+        Note that a query's analysis was asked for separately (the UI fetches
+        the data first, then streams the analysis), without counting a
+        second request. Untracked queries are counted once.
+        """
+        with self._lock:
+            query = self._queries.get(cache_key)
+            if query is not None:
+                query[3] = True
+                return
+        self.record(cache_key, params, analysis=True)
+
+    def _trim(self, now: float) -> None:
+        ranked = sorted(self._queries, key=lambda key: self._decayed(self._queries[key][0], self._queries[key][1], now))
+        for key in ranked[:len(self._queries) - self.max_tracked]:
+            del self._queries[key]
+
+    def top(self, n: int) -> List[Tuple[str, Dict[str, Any], bool, float]]:
+        """The n most popular queries as (cache key, params, analysis, score)."""
+        now = self.clock()
+        with self._lock:
+            scored = [
+                (key, params, analysis, self._decayed(score, since, now))
+                for key, (score, since, params, analysis) in self._queries.items()
+            ]
+        scored.sort(key=lambda query: query[3], reverse=True)
+        return scored[:n]
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+
+class PrewarmScheduler:
+    """
+    Keeps MasterAgent's cached responses for popular queries warm.
+
+    Every interval seconds the top_n queries by popularity are checked, and
+    those whose response expires within margin seconds (or has already
+    expired) are rebuilt in the background, at most max_concurrent at a time.
+    Users asking for a hot query keep hitting the cache while it is refreshed.
+
+    Each worker process warms its own response cache, but only one of them
+    (the holder of an exclusive lock on lock_path) refetches from upstream and
+    regenerates analyses. The others rebuild from the agents' on-disk caches
+    and the analyzer's cache, which are shared by all workers.
+    """
+
+    def __init__(
+        self,
+        master: Any,
+        top_n: int = PREWARM_TOP_N,
+        interval: float = PREWARM_INTERVAL,
+        margin: float = PREWARM_MARGIN,
+        max_concurrent: int = 2,
+        lock_path: Optional[str] = PREWARM_LOCK_PATH
+    ):
+        self.master = master
+        self.top_n = top_n
+        self.interval = interval
+        self.margin = margin
+        self.max_concurrent = max_concurrent
+        self.lock_path = lock_path
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run: Optional[float] = None
+        self._future = None
+        self._lock_file = None
+
+    def start(self) -> None:
+        """Start the refresh loop on the background event loop, once."""
+        if self.top_n <= 0 or (self._future is not None and not self._future.done()):
+            return
+        self._future = asyncio.run_coroutine_threadsafe(self.run(), BackgroundLoop.get_loop())
+        # Registered after BackgroundLoop.shutdown, so it runs before the loop stops
+        atexit.register(self.stop)
+        logger.info(f"Prewarming the top {self.top_n} queries every {self.interval}s")
+
+    def stop(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+            atexit.unregister(self.stop)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def is_leader(self) -> bool:
+        """
+        Whether this process refreshes from upstream. The first worker to lock
+        lock_path keeps the lock until it stops; the others try again on every
+        run, so one of them takes over when the leader exits.
+        """
+        if self._lock_file is not None or fcntl is None or not self.lock_path:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            handle = open(self.lock_path, "a")
+        except OSError as e:
+            logger.warning(f"Cannot open prewarm lock {self.lock_path}, refreshing from upstream: {str(e)}")
+            return True
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_file = handle
+        logger.info("This worker refreshes popular queries from upstream")
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error(f"Prewarm run failed: {str(e)}")
+
+    def due(self) -> List[Tuple[str, Dict[str, Any], bool, float]]:
+        """Popular queries whose cached response is missing or about to expire."""
+        due = []
+        for query in self.master.popularity.top(self.top_n):
+            remaining = self.master.cache.remaining_ttl(query[0])
+            if remaining is None or remaining <= self.margin:
+                due.append(query)
+        return due
+
+    async def refresh_due(self) -> int:
+        """Refresh every due query and return how many were refreshed."""
+        self.last_run = time.time()
+        due = self.due()
+        if not due:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        fresh = self.is_leader()
+
+        async def _refresh(params: Dict[str, Any], analysis: bool) -> bool:
+            async with semaphore:
+                try:
+                    await self.master.refresh(params, with_analysis=analysis, fresh=fresh)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Prewarm failed for {params.get('indicator')}, {params.get('country')}: {str(e)}")
+                    return False
+
+        results = await asyncio.gather(*(_refresh(params, analysis) for _, params, analysis, _ in due))
+        self.refreshed += sum(results)
+        self.failed += len(results) - sum(results)
+        logger.info(f"Prewarmed {sum(results)} of {len(due)} popular queries")
+        return sum(results)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._future is not None and not self._future.done(),
+            "leader": self._lock_file is not None,
+            "top_n": self.top_n,
+            "tracked": len(self.master.popularity),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "last_run": self.last_run,
+            "top": [
+                {"indicator": params.get("indicator"), "country": params.get("country"), "score": round(score, 2)}
+                for _, params, _, score in self.master.popularity.top(self.top_n)
+            ],
+        }
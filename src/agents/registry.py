@@ -0,0 +1,100 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Type
+
+from .base_agent import BaseAgent
+from .world_bank_agent import WorldBankAgent
+from .imf_agent import IMFAgent
+from .oecd_agent import OECDAgent
+from .un_agent import UNAgent
+
+logger = logging.getLogger("IndicatorRegistry")
+
+# Agents by source name, in source priority order
+DEFAULT_AGENTS: Dict[str, Type[BaseAgent]] = {
+    "world_bank": WorldBankAgent,
+    "imf": IMFAgent,
+    "oecd": OECDAgent,
+    "un": UNAgent,
+}
+
+
+class IndicatorRegistry:
+    """
+    Which sources support which indicators.
+
+    Each agent is instantiated once to read its indicator mapping, and the
+    result is kept as indicator -> source names and (source, indicator) ->
+    the source's indicator code, so routing a query is a single dict lookup
+    instead of building every agent per query. Call reload() after the
+    agents' mappings change.
+    """
+
+    def __init__(self, agents: Optional[Dict[str, Type[BaseAgent]]] = None):
+        self.agents: Dict[str, Type[BaseAgent]] = dict(agents or DEFAULT_AGENTS)
+        self._lock = threading.Lock()
+        self._by_source: Dict[str, Tuple[str, ...]] = {}
+        self._by_indicator: Dict[str, Tuple[str, ...]] = {}
+        self._codes: Dict[Tuple[str, str], str] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """
+        Re-read every agent's indicators. The new tables are built aside and
+        swapped in at once, so concurrent lookups see either the old or the new ones.
+        """
+        by_source: Dict[str, Tuple[str, ...]] = {}
+        by_indicator: Dict[str, List[str]] = {}
+        codes: Dict[Tuple[str, str], str] = {}
+        for agent_name, agent_class in self.agents.items():
+            try:
+                agent = agent_class()
+                indicators = tuple(agent.get_available_indicators())
+                mapping = getattr(agent, "indicators_mapping", {})
+            except Exception as e:
+                logger.error(f"Error getting indicators from {agent_name}: {str(e)}")
+                indicators, mapping = (), {}
+            by_source[agent_name] = indicators
+            # Agents lowercase the requested indicator before looking it up, so
+            # keys with capitals (e.g. World Bank "BCA") can never be resolved
+            resolvable = [indicator for indicator in indicators if indicator == indicator.lower() and indicator in mapping]
+            codes.update(((agent_name, indicator), mapping[indicator]) for indicator in resolvable)
+            for indicator in resolvable:
+                by_indicator.setdefault(indicator, []).append(agent_name)
+
+        with self._lock:
+            self._by_source = by_source
+            self._by_indicator = {indicator: tuple(sources) for indicator, sources in by_indicator.items()}
+            self._codes = codes
+        logger.info(f"Indexed {len(self._by_indicator)} indicators from {len(by_source)} sources")
+
+    def sources_for(self, indicator: str) -> Tuple[str, ...]:
+        """Names of the sources that support an indicator, in priority order."""
+        return self._by_indicator.get(indicator.lower(), ())
+
+    def indicator_code(self, source: str, indicator: str) -> Optional[str]:
+        """The source's own code for an indicator (e.g. "NY.GDP.MKTP.CD" for World Bank "gdp")."""
+        return self._codes.get((source, indicator.lower()))
+
+    def indicators_by_source(self) -> Dict[str, List[str]]:
+        """Sorted indicator names of every source."""
+        return {agent_name: list(indicators) for agent_name, indicators in self._by_source.items()}
+
+    def __contains__(self, indicator: str) -> bool:
+        return indicator.lower() in self._by_indicator
+
+
+# Registry of the default agents, shared by everything in the process
+_registry: Optional[IndicatorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> IndicatorRegistry:
+    """
+    Return the process-wide registry of the default agents, building it on first use.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = IndicatorRegistry()
+        return _registry
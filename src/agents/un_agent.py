@@ -1,13 +1,24 @@
-from typing import Dict, Any
+from typing import Dict, Any, Union
 import asyncio
 from datetime import datetime
 import aiohttp
-from .base_agent import BaseAgent, SharedState
+from .base_agent import BaseAgent
 from ..schemas.data_schema import DataSet, DataPoint, Metadata, DataSource
+from ..schemas.series_frame import SeriesFrame
+from ..utils.resilience import UpstreamError
+from ..utils.unit_normalization import normalize_series
+from ..utils.sdmx import INDICATOR_DIMENSIONS, FREQUENCY_DIMENSIONS, StructureIndex, base_unit_values, observation_columns
+from ..utils.sdmx_stream import SDMXData, read_sdmx_response
+import numpy as np
 import xml.etree.ElementTree as ET
 import csv
 
 class UNAgent(BaseAgent):
+    # SDMX key with several REF_AREA values: A.<indicator>.USA+CHN+IND
+    country_separator = "+"
+    # Values are now scaled by UNIT_MULT; entries cached before that are ignored
+    persistent_cache_version = BaseAgent.persistent_cache_version + 1
+
     def __init__(self):
         super().__init__("UN")
         self.base_url = "https://data.un.org/ws/rest/data"
@@ -29,85 +40,6 @@ class UNAgent(BaseAgent):
         """Return list of available indicators"""
         return sorted(self.indicators_mapping.keys())
 
-    def count_digits_before_decimal(self, value: float) -> int:
-        """
-        Count the number of digits before the decimal point in a floating-point number.
-        
-        Args:
-            value: A floating-point number
-            
-        Returns:
-            The number of digits before the decimal point
-            
-        Examples:
-            count_digits_before_decimal(1.23456) -> 1
-            count_digits_before_decimal(12.3456) -> 2
-            count_digits_before_decimal(123.456) -> 3
-            count_digits_before_decimal(1234.56) -> 4
-        """
-        # Convert to string and split at decimal point
-        str_value = str(value)
-        parts = str_value.split('.')
-        
-        # Return the length of the integer part
-        return len(parts[0])
-
-    def determine_adjustment_factor(self, value: float, target_unit: str) -> float:
-        """
-        Determine the adjustment factor based on the number of digits before the decimal point
-        and the target unit.
-        
-        Args:
-            value: The value to adjust
-            target_unit: The target unit (trillions, billions, millions)
-            
-        Returns:
-            The adjustment factor to apply to the value
-        """
-        digits_before = self.count_digits_before_decimal(value)
-        
-        # Handle trillions
-        if target_unit == "trillions":
-            if digits_before == 1:
-                return 1000000000000  # 1 trillion
-            elif digits_before == 2:
-                return 100000000000   # 10 trillion
-            elif digits_before == 3:
-                return 10000000000    # 100 trillion
-            elif digits_before == 4:
-                return 1000000000     # 1 quadrillion
-            else:
-                return 1  # Default case
-        
-        # Handle billions
-        elif target_unit == "billions":
-            if digits_before == 1:
-                return 1000000000  # 1 billion
-            elif digits_before == 2:
-                return 100000000   # 10 billion
-            elif digits_before == 3:
-                return 10000000    # 100 billion
-            elif digits_before == 4:
-                return 1000000     # 1 trillion
-            else:
-                return 1  # Default case
-        
-        # Handle millions
-        elif target_unit == "millions":
-            if digits_before == 1:
-                return 1000000  # 1 million
-            elif digits_before == 2:
-                return 100000   # 10 million
-            elif digits_before == 3:
-                return 10000    # 100 million
-            elif digits_before == 4:
-                return 1000     # 1 billion
-            else:
-                return 1  # Default case
-        
-        # Default case
-        return 1
-
     async def fetch_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Fetch data from UN API
@@ -130,7 +62,7 @@ class UNAgent(BaseAgent):
 
         # UN specific endpoint construction
         dataset_indicator = "DF_UNData_WDI"  # Update this to the correct dataset indicator if needed
-        query_key = f"A.{indicator_code}.{country}"
+        query_key = f"A.{indicator_code}.{self.join_countries(params)}"
         url = f"{self.base_url}/{dataset_indicator}/{query_key}?startPeriod={start_year}&endPeriod={end_year}"
 
         print(f"UN API URL: {url}")
@@ -139,113 +71,73 @@ class UNAgent(BaseAgent):
             headers = {"Accept": "application/json"}
             async with self.session.get(url, headers=headers) as response:
                 if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"UN API error: {error_text}")
+                    raise await UpstreamError.from_response(response, "UN API error")
 
-                # Return the JSON content
-                return await response.json()
+                # Large SDMX-JSON bodies are parsed incrementally as they download
+                return await read_sdmx_response(response)
 
         return await self.handle_retry(_fetch)
 
-    async def transform_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def transform_data(self, raw_data: Union[SDMXData, Dict[str, Any]]) -> DataSet:
         """
         Transform UN data from JSON into unified schema
         """
         try:
-            # Extract data from JSON response
-            data_set = raw_data.get("dataSets", [{}])[0]
-            series = data_set.get("series", {})
-            if not series:
+            # Accept both the streamed columns and an already parsed document
+            data = raw_data if isinstance(raw_data, SDMXData) else SDMXData.from_json(raw_data)
+            if not len(data):
                 raise ValueError("No data found in UN response")
 
-            transformed_data_points = []
-            # Extract time periods from the structure
-            structure = raw_data.get("structure", {})
-            dimensions = structure.get("dimensions", {}).get("observation", [])
-            time_periods = next((dim for dim in dimensions if dim.get("id") == "TIME_PERIOD"), {})
-            time_values = time_periods.get("values", [])
-
-            for serie_key, serie_data in series.items():
-                observations = serie_data.get("observations", {})
-                for time_idx, obs in observations.items():
-                    if obs and obs[0] is not None:
-                        year = int(time_values[int(time_idx)].get("id"))  # Map index to actual year
-                        value = float(obs[0])
-                        transformed_data_points.append(
-                            DataPoint(
-                                value=value,
-                                year=year,
-                                country_code=serie_key.split(":")[0],
-                                country_name="",  # Country name not provided in this structure
-                                additional_info={
-                                    "indicator_id": serie_key.split(":")[1]
-                                }
-                            )
-                        )
-
-            # Determine the unit of the data based on the first data point
-            if transformed_data_points:
-                first_value = transformed_data_points[0].value
-                unit = self.determine_unit(first_value)
-                print(f"Determined unit for UN data: {unit}")  # Print the determined unit
-                SharedState.set_un_unit(unit)  # Set the determined unit in SharedState
+            # Decode series keys once and map observations to them by index
+            columns, index, key_matrix = observation_columns(data)
+            indicator_dimension = index.find(INDICATOR_DIMENSIONS)
+            if indicator_dimension is not None:
+                series_indicators, _ = index.series_codes(key_matrix, indicator_dimension)
             else:
-                unit = "unknown"
+                series_indicators = np.array([key.split(":")[1] for key in data.series_keys], dtype=object)
+            indicator_ids = series_indicators[columns["series"]]
+
+            # Series may be published in a power of ten given by UNIT_MULT; convert to base units
+            values = base_unit_values(data, columns, index)
 
             # Sort data points by year
-            transformed_data_points.sort(key=lambda x: x.year)
+            frame = SeriesFrame.from_columns(
+                columns["year"], values, columns["country_code"], columns["country_name"],
+                extras={"indicator_id": indicator_ids}
+            ).sort_by_year()
 
-            dataset = DataSet(
-                metadata=Metadata(
+            # Rescale the series to one unit chosen from its magnitude, as the other agents do
+            frame, unit, scale_factor = normalize_series(frame)
+            print(f"Determined unit for UN data: {unit}")  # Print the determined unit
+
+            dataset = frame.to_dataset(
+                Metadata(
                     source=DataSource.UN,
-                    indicator_code=serie_key.split(":")[1],
-                    indicator_name="",  # Indicator name not provided in this structure
+                    indicator_code=series_indicators[0],
+                    indicator_name=self._get_indicator_name(index),
                     last_updated=datetime.now(),
                     frequency="yearly",  # Assuming yearly frequency
-                    unit=unit  # Store the determined unit
+                    unit=unit,  # Store the determined unit
+                    scale_factor=scale_factor
                 ),
-                data=transformed_data_points
+                materialize=False
             )
 
-            return dataset.dict()
+            return dataset
         except Exception as e:
             self.logger.error(f"Error transforming UN data: {str(e)}")
             raise
 
-    def _get_country_name(self, structure: Dict[str, Any], country_code: str) -> str:
-        """Extract country name from UN structure"""
-        try:
-            dimensions = structure.get("dimensions", [])
-            country_dim = next((dim for dim in dimensions if dim.get("id") == "REF_AREA"), {})
-            country_values = country_dim.get("values", [])
-            country = next((c for c in country_values if c.get("id") == country_code), {})
-            return country.get("name", country_code)
-        except Exception:
-            return country_code
-
-    def _get_indicator_name(self, structure: Dict[str, Any]) -> str:
+    def _get_indicator_name(self, index: StructureIndex) -> str:
         """Extract indicator name from UN structure"""
-        try:
-            dimensions = structure.get("dimensions", [])
-            indicator_dim = next((dim for dim in dimensions if dim.get("id") == "SERIES"), {})
-            return indicator_dim.get("name", "")
-        except Exception:
-            return ""
+        dimension = index.find(INDICATOR_DIMENSIONS)
+        names = index.names.get(dimension)
+        return names[0] if names is not None and len(names) == 1 else ""
 
-    def _get_unit(self, structure: Dict[str, Any]) -> str:
+    def _get_unit(self, index: StructureIndex) -> str:
         """Extract unit from UN structure"""
-        try:
-            attributes = structure.get("attributes", [])
-            unit_attr = next((attr for attr in attributes if attr.get("id") == "UNIT_MEASURE"), {})
-            return unit_attr.get("name", "")
-        except Exception:
-            return ""
+        return index.attribute_name("UNIT_MEASURE")
 
-    def _get_frequency(self, structure: Dict[str, Any]) -> str:
+    def _get_frequency(self, index: StructureIndex) -> str:
         """Extract frequency from UN structure"""
-        try:
-            dimensions = structure.get("dimensions", [])
-            freq_dim = next((dim for dim in dimensions if dim.get("id") == "FREQ"), {})
-            return freq_dim.get("name", "yearly")
-        except Exception:
-            return "yearly" 
\ No newline at end of file
+        return index.dimension_value_name(FREQUENCY_DIMENSIONS, "yearly")
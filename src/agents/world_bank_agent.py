@@ -1,10 +1,23 @@
-from typing import Dict, Any
+from typing import Dict, Any, Union
 import asyncio
 from datetime import datetime
-from .base_agent import BaseAgent, SharedState
+from .base_agent import BaseAgent
 from ..schemas.data_schema import DataSet, DataPoint, Metadata, DataSource
+from ..schemas.series_frame import SeriesFrame
+from ..utils.resilience import UpstreamError
+from ..utils.unit_normalization import normalize_series
 
 class WorldBankAgent(BaseAgent):
+    # WDI annual series are revised rarely
+    persistent_cache_duration = 7 * 24 * 3600
+    # country/USA;CHN;IND
+    country_separator = ";"
+    # Rows per page, and how many further pages are downloaded at once
+    page_size = 1000
+    max_concurrent_pages = 4
+    # WDI bulk CSV ingested with ingest_snapshots.py
+    snapshot_source = "world_bank"
+
     def __init__(self):
         super().__init__("WorldBank")
         self.base_url = "https://api.worldbank.org/v2"
@@ -190,9 +203,10 @@ class WorldBankAgent(BaseAgent):
         """Return list of available indicators"""
         return sorted(self.indicators_mapping.keys())
 
-    async def fetch_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def fetch_data(self, params: Dict[str, Any]) -> Union[SeriesFrame, Dict[str, Any]]:
         """
-        Fetch data from World Bank API
+        Fetch data from World Bank API, or from the local WDI snapshot when it
+        has the indicator for every requested country
         """
         if not self.session:
             raise RuntimeError("Session not initialized. Use async context manager.")
@@ -209,85 +223,124 @@ class WorldBankAgent(BaseAgent):
         if not indicator_code:
             available = ", ".join(self.get_available_indicators())
             raise ValueError(f"Invalid indicator. Available indicators are: {available}")
+
+        snapshot = self.read_snapshot(indicator_code, params)
+        if snapshot is not None:
+            return snapshot
         
-        url = f"{self.base_url}/country/{country}/indicator/{indicator_code}"
+        url = f"{self.base_url}/country/{self.join_countries(params)}/indicator/{indicator_code}"
         query_params = {
             "format": "json",
-            "per_page": 1000,
+            "per_page": self.page_size,
             "date": f"{start_year}:{end_year}"
         }
 
         print(f"World Bank API URL: {url}")
 
-        async def _fetch():
-            async with self.session.get(url, params=query_params) as response:
+        async def _fetch_page(page: int):
+            async with self.session.get(url, params={**query_params, "page": page}) as response:
                 if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"World Bank API error: {error_text}")
+                    raise await UpstreamError.from_response(response, "World Bank API error")
                 return await response.json()
 
-        return await self.handle_retry(_fetch)
+        first_page = await self.handle_retry(lambda: _fetch_page(1))
+        if not isinstance(first_page, list) or len(first_page) < 2 or not first_page[1]:
+            return first_page
 
-    async def transform_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Transform World Bank data into unified schema
-        """
-        try:
-            if not raw_data or len(raw_data) < 2:
-                raise ValueError("Invalid response from World Bank API")
+        pages = int(first_page[0].get("pages") or 1)
+        if pages <= 1:
+            return first_page
 
-            metadata_raw = raw_data[0]
-            data_points = raw_data[1]
+        # The first page says how many there are; fetch the rest concurrently,
+        # a few at a time, and append each page's rows as it arrives
+        self.logger.info(f"Fetching {pages - 1} more pages from {url}")
+        semaphore = asyncio.Semaphore(self.max_concurrent_pages)
 
-            if not data_points:
-                raise ValueError("No data points found in the response")
+        async def _fetch_remaining(page: int):
+            async with semaphore:
+                return await self.handle_retry(lambda: _fetch_page(page))
 
-            # Get indicator details from the first data point
-            first_point = data_points[0]
-            indicator_details = first_point.get("indicator", {})
+        data_points = list(first_page[1])
+        tasks = [asyncio.ensure_future(_fetch_remaining(page)) for page in range(2, pages + 1)]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                page_data = await next_page
+                if isinstance(page_data, list) and len(page_data) >= 2 and page_data[1]:
+                    data_points.extend(page_data[1])
+        finally:
+            # Stop the remaining downloads if a page failed
+            for task in tasks:
+                task.cancel()
 
-            transformed_data_points = []
-            for point in data_points:
-                if point.get("value") is not None:  # Only include points with values
-                    transformed_data_points.append(
-                        DataPoint(
-                            value=point.get("value"),
-                            year=int(point.get("date")),
-                            country_code=point.get("countryiso3code", ""),
-                            country_name=point.get("country", {}).get("value", ""),
-                            additional_info={
-                                "decimal": point.get("decimal", 0),
-                                "indicator_id": indicator_details.get("id", ""),
-                                "indicator_name": indicator_details.get("value", "")
-                            }
-                        )
-                    )
+        return [{**first_page[0], "page": 1, "pages": 1, "per_page": len(data_points)}, data_points]
 
-            # Determine the unit of the data based on the first data point
-            if transformed_data_points:
-                first_value = transformed_data_points[0].value
-                unit = self.determine_unit(first_value)
-                print(f"Determined unit for World Bank data: {unit}")  # Print the determined unit
-                SharedState.set_wb_unit(unit)  # Set the determined unit in SharedState
+    async def transform_data(self, raw_data: Union[SeriesFrame, Dict[str, Any]]) -> DataSet:
+        """
+        Transform World Bank data into unified schema
+        """
+        try:
+            if isinstance(raw_data, SeriesFrame):
+                # Read from the local snapshot, already columnar and in base units
+                frame = raw_data
+                if not len(frame):
+                    raise ValueError("No data points found in the snapshot")
             else:
-                unit = "unknown"
+                frame = self._frame_from_response(raw_data)
 
-            # Sort data points by year
-            transformed_data_points.sort(key=lambda x: x.year)
+            # World Bank reports base units; rescale the series to one unit chosen from its magnitude
+            frame, unit, scale_factor = normalize_series(frame)
+            print(f"Determined unit for World Bank data: {unit}")  # Print the determined unit
 
-            dataset = DataSet(
-                metadata=Metadata(
+            dataset = frame.to_dataset(
+                Metadata(
                     source=DataSource.WORLD_BANK,
-                    indicator_code=indicator_details.get("id", ""),
-                    indicator_name=indicator_details.get("value", ""),
+                    indicator_code=frame.info.get("indicator_id", ""),
+                    indicator_name=frame.info.get("indicator_name", ""),
                     last_updated=datetime.now(),
                     frequency="yearly",
-                    unit=unit  # Store the determined unit
+                    unit=unit,  # Store the determined unit
+                    scale_factor=scale_factor
                 ),
-                data=transformed_data_points
+                materialize=False
             )
 
-            return dataset.dict()
+            return dataset
         except Exception as e:
             self.logger.error(f"Error transforming World Bank data: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def _frame_from_response(self, raw_data: Any) -> SeriesFrame:
+        """
+        Collect the observations of a World Bank API response into a frame
+        """
+        if not raw_data or len(raw_data) < 2:
+            raise ValueError("Invalid response from World Bank API")
+
+        data_points = raw_data[1]
+
+        if not data_points:
+            raise ValueError("No data points found in the response")
+
+        # Get indicator details from the first data point
+        first_point = data_points[0]
+        indicator_details = first_point.get("indicator", {})
+
+        # Collect the observations column by column
+        years, values, country_codes, country_names, decimals = [], [], [], [], []
+        for point in data_points:
+            if point.get("value") is not None:  # Only include points with values
+                years.append(int(point.get("date")))
+                values.append(point.get("value"))
+                country_codes.append(point.get("countryiso3code", ""))
+                country_names.append(point.get("country", {}).get("value", ""))
+                decimals.append(point.get("decimal", 0))
+
+        # Sort data points by year
+        return SeriesFrame.from_columns(
+            years, values, country_codes, country_names,
+            info={
+                "indicator_id": indicator_details.get("id", ""),
+                "indicator_name": indicator_details.get("value", "")
+            },
+            extras={"decimal": decimals}
+        ).sort_by_year()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import Dict, List, Optional, Union, Any
 from datetime import datetime
 from enum import Enum
@@ -16,6 +16,8 @@ class Metadata(BaseModel):
     last_updated: datetime
     frequency: str
     unit: str
+    # Multiply values by this to get base units (e.g. 1e12 when unit is "trillions")
+    scale_factor: float = 1.0
 
 class DataPoint(BaseModel):
     value: Union[float, int, None]
@@ -29,6 +31,27 @@ class DataSet(BaseModel):
     data: List[DataPoint]
     error_log: List[str] = Field(default_factory=list)
     warning_log: List[str] = Field(default_factory=list)
+    # Columnar copy of `data` (a SeriesFrame) kept alongside the points; not serialized.
+    # Datasets passed between agents and MasterAgent carry only the frame and
+    # leave `data` empty until materialize() is called.
+    _frame: Any = PrivateAttr(default=None)
+
+    def materialize(self) -> "DataSet":
+        """Build `data` from the attached frame if it was left empty, and return the dataset."""
+        if self._frame is not None and len(self.data) != len(self._frame):
+            self.data = self._frame.to_data_points()
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Like model_dump(), but the points of a dataset that was not
+        materialized are serialized straight from its frame.
+        """
+        if self._frame is None or len(self.data) == len(self._frame):
+            return self.model_dump()
+        result = self.model_dump(exclude={"data"})
+        result["data"] = self._frame.to_records()
+        return result
 
 class AggregatedDataResponse(BaseModel):
     """
@@ -41,5 +64,11 @@ class AggregatedDataResponse(BaseModel):
     error_summary: Optional[Dict[str, List[str]]] = None
     analyses: Optional[Dict[str, str]] = None  # Analysis results for each data source
 
+    def to_dict(self) -> Dict[str, Any]:
+        """model_dump() with each dataset serialized by DataSet.to_dict()."""
+        result = self.model_dump(exclude={"datasets"})
+        result["datasets"] = [dataset.to_dict() for dataset in self.datasets]
+        return result
+
     class Config:
         arbitrary_types_allowed = True 
\ No newline at end of file
@@ -0,0 +1,314 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .data_schema import DataPoint, DataSet, Metadata
+
+class _Missing:
+    """Placeholder in extras columns for points whose source did not have that field."""
+
+    def __reduce__(self):
+        # Unpickle as the module's singleton, so frames from the persistent cache still match it
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+def _object_column(values: Sequence[Any]) -> np.ndarray:
+    """1-D object array; np.asarray would build a 2-D array from nested lists."""
+    column = np.empty(len(values), dtype=object)
+    column[:] = list(values)
+    return column
+
+
+def _point_builder():
+    """
+    Return a function building a DataPoint from a dict of already-typed fields.
+    It restores the state the way unpickling does, which costs about half of
+    model_construct (no per-field default handling).
+    """
+    state = DataPoint.model_construct(
+        value=None, year=0, country_code="", country_name="", additional_info={}
+    ).__getstate__()
+    new = DataPoint.__new__
+
+    def build(fields: Dict[str, Any]) -> DataPoint:
+        point = new(DataPoint)
+        point.__setstate__({**state, "__dict__": fields})
+        return point
+
+    return build
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Whether two info values are equal; values that cannot be compared count as different."""
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+class SeriesFrame:
+    """
+    Compact columnar form of a data series.
+
+    Holds years (int16), values (float64, NaN for missing) and country codes as
+    a categorical column (int16 indexes into `countries`). Per-series context
+    that DataPoint keeps in additional_info is stored once in `info`; values
+    that really differ per point go into `extras` columns. Merging and unit
+    conversion run as vectorized operations on the arrays, and DataPoint
+    objects are only built by to_data_points()/to_dataset().
+    """
+    __slots__ = ("years", "values", "country_index", "countries", "country_names", "info", "extras")
+
+    def __init__(
+        self,
+        years: np.ndarray,
+        values: np.ndarray,
+        country_index: np.ndarray,
+        countries: List[str],
+        country_names: List[str],
+        info: Optional[Dict[str, Any]] = None,
+        extras: Optional[Dict[str, np.ndarray]] = None
+    ):
+        self.years = years
+        self.values = values
+        self.country_index = country_index
+        self.countries = countries
+        self.country_names = country_names
+        self.info = info or {}
+        self.extras = extras or {}
+
+    @classmethod
+    def from_columns(
+        cls,
+        years: Sequence[int],
+        values: Sequence[Optional[float]],
+        country_codes: Sequence[str],
+        country_names: Optional[Sequence[str]] = None,
+        info: Optional[Dict[str, Any]] = None,
+        extras: Optional[Dict[str, Sequence[Any]]] = None
+    ) -> "SeriesFrame":
+        """
+        Build a frame from parallel per-point columns.
+        """
+        country_names = country_names if country_names is not None else [""] * len(country_codes)
+        categories: Dict[str, int] = {}
+        names: List[str] = []
+        country_index = np.empty(len(country_codes), dtype=np.int16)
+        for i, (code, name) in enumerate(zip(country_codes, country_names)):
+            position = categories.get(code)
+            if position is None:
+                position = categories[code] = len(names)
+                names.append(name)
+            elif not names[position] and name:
+                names[position] = name
+            country_index[i] = position
+
+        return cls(
+            years=np.asarray(years, dtype=np.int16),
+            values=np.array([np.nan if v is None else v for v in values], dtype=np.float64),
+            country_index=country_index,
+            countries=list(categories),
+            country_names=names,
+            info=info,
+            extras={key: _object_column(column) for key, column in (extras or {}).items()}
+        )
+
+    @classmethod
+    def from_data_points(cls, points: Sequence[DataPoint]) -> "SeriesFrame":
+        """
+        Build a frame from DataPoint objects. Their additional_info is kept
+        as per-point extras columns.
+        """
+        extra_keys: List[str] = []
+        for point in points:
+            for key in point.additional_info:
+                if key not in extra_keys:
+                    extra_keys.append(key)
+        return cls.from_columns(
+            years=[point.year for point in points],
+            values=[point.value for point in points],
+            country_codes=[point.country_code for point in points],
+            country_names=[point.country_name for point in points],
+            extras={key: [point.additional_info.get(key, _MISSING) for point in points] for key in extra_keys}
+        )
+
+    @classmethod
+    def from_dataset(cls, dataset: DataSet) -> "SeriesFrame":
+        return cls.from_data_points(dataset.data)
+
+    @classmethod
+    def of(cls, dataset: DataSet) -> "SeriesFrame":
+        """
+        Return the frame a dataset was built from, or build it once and keep it
+        on the dataset for later calls.
+        """
+        if dataset._frame is None:
+            dataset._frame = cls.from_dataset(dataset)
+        return dataset._frame
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    @property
+    def country_codes(self) -> np.ndarray:
+        """Country code of each point, decoded from the categorical column."""
+        return np.asarray(self.countries, dtype=object)[self.country_index]
+
+    def take(self, indexes: np.ndarray) -> "SeriesFrame":
+        """Return a frame with only the points at the given positions."""
+        return SeriesFrame(
+            years=self.years[indexes],
+            values=self.values[indexes],
+            country_index=self.country_index[indexes],
+            countries=self.countries,
+            country_names=self.country_names,
+            info=self.info,
+            extras={key: column[indexes] for key, column in self.extras.items()}
+        )
+
+    def sort_by_year(self) -> "SeriesFrame":
+        return self.take(np.argsort(self.years, kind="stable"))
+
+    def scaled(self, factor: Any) -> "SeriesFrame":
+        """
+        Multiply all values by a scalar or a per-point factor array in one operation.
+        """
+        frame = self.take(slice(None))
+        frame.values = self.values * factor
+        return frame
+
+    @staticmethod
+    def concat(frames: Iterable["SeriesFrame"]) -> "SeriesFrame":
+        """
+        Stack frames, remapping their country categories onto a shared list.
+        Info the frames agree on stays series-level; the rest is moved into
+        extras so it survives per point.
+        """
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return SeriesFrame.from_columns([], [], [])
+
+        countries: Dict[str, int] = {}
+        names: List[str] = []
+        indexes = []
+        extra_keys: List[str] = []
+        for frame in frames:
+            remap = np.empty(max(len(frame.countries), 1), dtype=np.int16)
+            for position, (code, name) in enumerate(zip(frame.countries, frame.country_names)):
+                if code not in countries:
+                    countries[code] = len(names)
+                    names.append(name)
+                remap[position] = countries[code]
+            indexes.append(remap[frame.country_index])
+            for key in list(frame.info) + list(frame.extras):
+                if key not in extra_keys:
+                    extra_keys.append(key)
+
+        info = {
+            key: value for key, value in frames[0].info.items()
+            if all(key not in frame.extras and _same(frame.info.get(key, _MISSING), value) for frame in frames)
+        }
+        extra_keys = [key for key in extra_keys if key not in info]
+
+        extras = {}
+        for key in extra_keys:
+            columns = []
+            for frame in frames:
+                if key in frame.extras:
+                    columns.append(frame.extras[key])
+                else:
+                    columns.append(_object_column([frame.info.get(key, _MISSING)] * len(frame)))
+            extras[key] = np.concatenate(columns)
+
+        return SeriesFrame(
+            years=np.concatenate([frame.years for frame in frames]),
+            values=np.concatenate([frame.values for frame in frames]),
+            country_index=np.concatenate(indexes),
+            countries=list(countries),
+            country_names=names,
+            info=info,
+            extras=extras
+        )
+
+    @staticmethod
+    def merge(frames: Sequence["SeriesFrame"]) -> "SeriesFrame":
+        """
+        Merge frames given in priority order: each (country, year) is taken from
+        the first frame that has it. The result is sorted by country, then year.
+        """
+        stacked = SeriesFrame.concat(frames)
+        # np.unique returns the index of the first occurrence of each key, sorted by key
+        keys = (stacked.country_index.astype(np.int64) << 16) | stacked.years.astype(np.uint16)
+        _, first = np.unique(keys, return_index=True)
+        return stacked.take(first)
+
+    def split_by_country(self) -> Dict[str, "SeriesFrame"]:
+        """Return one frame per country code, in category order."""
+        return {
+            code: self.take(np.flatnonzero(self.country_index == position))
+            for position, code in enumerate(self.countries)
+        }
+
+    def _point_fields(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one dict of DataPoint fields per point. Points of a frame without
+        extras share one additional_info dict (a copy of the frame's info);
+        points with the same extras (e.g. from the same source) share one too.
+        """
+        years = self.years.tolist()
+        values = [None if np.isnan(value) else value for value in self.values.tolist()]
+        index = self.country_index.tolist()
+        countries, names = self.countries, self.country_names
+        if not self.extras:
+            info = dict(self.info)
+            for value, year, i in zip(values, years, index):
+                yield {"value": value, "year": year, "country_code": countries[i], "country_name": names[i], "additional_info": info}
+            return
+
+        keys = list(self.extras)
+        rows = zip(*(column.tolist() for column in self.extras.values()))
+        shared: Dict[tuple, Dict[str, Any]] = {}
+        for value, year, i, row in zip(values, years, index, rows):
+            try:
+                additional_info = shared.get(row)
+            except TypeError:  # unhashable extras values
+                additional_info, row = None, None
+            if additional_info is None:
+                additional_info = dict(self.info)
+                additional_info.update((key, item) for key, item in zip(keys, row) if item is not _MISSING)
+                if row is not None:
+                    shared[row] = additional_info
+            yield {"value": value, "year": year, "country_code": countries[i], "country_name": names[i], "additional_info": additional_info}
+
+    def to_data_points(self) -> List[DataPoint]:
+        """
+        Materialize DataPoint objects. The columns are already typed, so the
+        points are constructed without running validation again. Their
+        additional_info dicts are shared (see _point_fields) and must not be
+        modified through them.
+        """
+        build = _point_builder()
+        return [build(fields) for fields in self._point_fields()]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Serialize the points as plain dicts in the shape of DataPoint.model_dump(),
+        without building DataPoints first. additional_info dicts are shared
+        between records as in to_data_points().
+        """
+        return list(self._point_fields())
+
+    def to_dataset(self, metadata: Metadata, materialize: bool = True, **kwargs) -> DataSet:
+        """
+        Build a DataSet with the given metadata. The frame stays attached to
+        it, so merging does not have to rebuild columns from the points. With
+        materialize=False the DataPoints are not built until
+        DataSet.materialize(); agents hand such datasets to MasterAgent, and
+        the final response is serialized from the frames (DataSet.to_dict).
+        """
+        dataset = DataSet(metadata=metadata, data=self.to_data_points() if materialize else [], **kwargs)
+        dataset._frame = self
+        return dataset
@@ -0,0 +1,291 @@
+import logging
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("Cache")
+
+
+class CacheEntry:
+    """A cached value with its expiry time and estimated size in bytes."""
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int = 0):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class CacheBackend(ABC):
+    """
+    Storage used by TTLCache. Backends keep entries in least-recently-used order
+    and track the total size of what they hold.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for key without changing its recency."""
+
+    @abstractmethod
+    def set(self, key: Hashable, entry: CacheEntry) -> None:
+        """Store an entry as the most recently used one."""
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> bool:
+        """Remove the entry for key; return whether there was one."""
+
+    @abstractmethod
+    def touch(self, key: Hashable) -> None:
+        """Mark key as the most recently used entry."""
+
+    @abstractmethod
+    def pop_lru(self) -> Optional[Hashable]:
+        """Remove the least recently used entry and return its key."""
+
+    @abstractmethod
+    def total_size(self) -> int:
+        """Sum of the sizes of all stored entries."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all entries."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend built on an OrderedDict."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._size = 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, entry: CacheEntry) -> None:
+        self.delete(key)
+        self._entries[key] = entry
+        self._size += entry.size
+
+    def delete(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+        return entry is not None
+
+    def touch(self, key: Hashable) -> None:
+        self._entries.move_to_end(key)
+
+    def pop_lru(self) -> Optional[Hashable]:
+        if not self._entries:
+            return None
+        key, entry = self._entries.popitem(last=False)
+        self._size -= entry.size
+        return key
+
+    def total_size(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the memory footprint of a value by its pickled length."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry time-to-live.
+
+    Entries expire ttl seconds after they are stored (measured with a monotonic
+    clock by default, so wall-clock jumps don't matter). When max_entries or
+    max_bytes is exceeded the least recently used entries are evicted. Sizes are
+    only computed when max_bytes is set.
+
+    With a grace period, expired entries are kept for another `grace` seconds
+    and can still be read with get_stale() (stale-while-revalidate); get()
+    treats them as missing either way.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        grace: float = 0,
+        backend: Optional[CacheBackend] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.clock = clock
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            now = self.clock()
+            if entry.expires_at <= now:
+                if entry.expires_at + self.grace <= now:
+                    self.backend.delete(key)
+                    self.expirations += 1
+                self.misses += 1
+                return default
+            self.backend.touch(key)
+            self.hits += 1
+            return entry.value
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Tuple[Any, bool]:
+        """
+        Return (value, is_stale) for key. An entry past its TTL but still within
+        the grace period is returned with is_stale=True; beyond that, or if the
+        key is missing, (default, False) is returned.
+        """
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is None:
+                self.misses += 1
+                return default, False
+            now = self.clock()
+            if entry.expires_at + self.grace <= now:
+                self.backend.delete(key)
+                self.expirations += 1
+                self.misses += 1
+                return default, False
+            self.backend.touch(key)
+            if entry.expires_at <= now:
+                self.stale_hits += 1
+                return entry.value, True
+            self.hits += 1
+            return entry.value, False
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least recently used entries if the cache is full.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"Not caching {key!r} in {self.name}: {size} bytes exceeds max_bytes")
+            return
+        with self._lock:
+            self.backend.set(key, CacheEntry(value, self.clock() + ttl, size))
+            self._evict()
+
+    def _evict(self) -> None:
+        while (
+            (self.max_entries is not None and len(self.backend) > self.max_entries)
+            or (self.max_bytes is not None and self.backend.total_size() > self.max_bytes)
+        ):
+            if self.backend.pop_lru() is None:
+                break
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self.backend.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.backend.clear()
+
+    def remaining_ttl(self, key: Hashable) -> Optional[float]:
+        """
+        Seconds until the entry for key expires, or None if it is missing or
+        expired. Does not count as a lookup.
+        """
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is None:
+                return None
+            remaining = entry.expires_at - self.clock()
+            return remaining if remaining > 0 else None
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self.backend.get(key)
+            return entry is not None and entry.expires_at > self.clock()
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.backend),
+                "bytes": self.backend.total_size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Process-wide registry of named caches
+_caches: Dict[str, TTLCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(
+    name: str,
+    ttl: float,
+    backend_factory: Optional[Callable[[], CacheBackend]] = None,
+    **kwargs,
+) -> TTLCache:
+    """
+    Return the process-wide cache with the given name, creating it on first use.
+    Later calls with the same name share the instance (and ignore the settings).
+    backend_factory is only called when the cache is actually created.
+    """
+    with _registry_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            if backend_factory is not None:
+                kwargs["backend"] = backend_factory()
+            cache = TTLCache(name, ttl, **kwargs)
+            _caches[name] = cache
+        return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Return stats for every registered cache."""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
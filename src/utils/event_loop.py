@@ -0,0 +1,118 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+from .http_session import SessionManager
+
+logger = logging.getLogger("BackgroundLoop")
+
+
+class BackgroundLoop:
+    """
+    A long-lived asyncio event loop running in a daemon thread.
+
+    Synchronous code (the Flask handlers) submits coroutines here instead of
+    calling asyncio.run() per request, so MasterAgent, the agents, the analyzer
+    and the pooled HTTP sessions keep their state between requests. The loop is
+    started lazily and restarted after a fork, so every gunicorn worker gets
+    its own loop.
+    """
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """
+        Return the background loop, starting it on first use in this process.
+        """
+        with cls._lock:
+            if cls._loop is None or cls._pid != os.getpid() or not cls._thread.is_alive():
+                cls._start()
+            return cls._loop
+
+    @classmethod
+    def _start(cls) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=_run, name="background-event-loop", daemon=True)
+        thread.start()
+        ready.wait()
+
+        cls._loop = loop
+        cls._thread = thread
+        cls._pid = os.getpid()
+        logger.info("Started background event loop")
+
+    @classmethod
+    def run(cls, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the background loop and block until it returns.
+        The coroutine is cancelled if it does not finish within the timeout.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, cls.get_loop())
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        Close the pooled HTTP session and stop the loop.
+        """
+        with cls._lock:
+            loop, thread = cls._loop, cls._thread
+            if loop is None or cls._pid != os.getpid() or not thread.is_alive():
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(SessionManager.close(loop), loop).result(5)
+            except Exception as e:
+                logger.warning(f"Error closing pooled session: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            cls._loop = None
+            cls._thread = None
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared background event loop from synchronous code.
+    """
+    return BackgroundLoop.run(coro, timeout)
+
+
+def iterate_async(agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+    """
+    Consume an async generator that runs on the background loop, item by item,
+    from synchronous code (e.g. a streaming Flask response). Closing the
+    returned generator early also closes the async generator.
+    """
+    async def _next():
+        return await agen.__anext__()
+
+    try:
+        while True:
+            try:
+                yield BackgroundLoop.run(_next(), timeout)
+            except StopAsyncIteration:
+                return
+    finally:
+        try:
+            BackgroundLoop.run(agen.aclose(), 5)
+        except Exception as e:
+            logger.warning(f"Error closing async generator: {e}")
+
+
+atexit.register(BackgroundLoop.shutdown)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("SessionManager")
+
+
+class SessionManager:
+    """
+    Process-wide registry of pooled aiohttp sessions.
+
+    Agents borrow a session from here instead of opening their own, so TCP/TLS
+    connections to the upstream APIs are kept alive and reused across queries.
+    aiohttp sessions are bound to the event loop they were created on, so one
+    session is kept per running loop.
+    """
+    _sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+    # Tunables (overridable through environment variables or configure())
+    limit: int = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+    limit_per_host: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+    keepalive_timeout: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+    dns_cache_ttl: int = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+    total_timeout: float = float(os.getenv("HTTP_TOTAL_TIMEOUT", "60"))
+    connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    read_timeout: float = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+    @classmethod
+    def configure(cls, **settings) -> None:
+        """
+        Override pool settings. Only affects sessions created afterwards.
+        """
+        for name, value in settings.items():
+            if not hasattr(cls, name) or name.startswith("_"):
+                raise ValueError(f"Unknown session setting: {name}")
+            setattr(cls, name, value)
+
+    @classmethod
+    def _create_session(cls) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=cls.limit,
+            limit_per_host=cls.limit_per_host,
+            keepalive_timeout=cls.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=cls.dns_cache_ttl,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=cls.total_timeout,
+            connect=cls.connect_timeout,
+            sock_read=cls.read_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    @classmethod
+    def _prune(cls) -> None:
+        """Drop sessions whose event loop has already been closed."""
+        for loop in [loop for loop in cls._sessions if loop.is_closed()]:
+            del cls._sessions[loop]
+
+    @classmethod
+    def get_session(cls) -> aiohttp.ClientSession:
+        """
+        Return the pooled session for the running event loop, creating it on first use.
+        """
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            cls._prune()
+            session = cls._create_session()
+            cls._sessions[loop] = session
+            logger.info("Created pooled HTTP session")
+        return session
+
+    @classmethod
+    async def close(cls, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Close the pooled session of the given (default: running) event loop.
+        """
+        loop = loop or asyncio.get_running_loop()
+        session = cls._sessions.pop(loop, None)
+        if session and not session.closed:
+            await session.close()
@@ -1,17 +1,76 @@
 import os
-from typing import Dict, Any, Optional
-from mistralai.client import MistralClient
+import asyncio
+from typing import Dict, Any, AsyncIterator, List, Optional
+from mistralai.async_client import MistralAsyncClient
 from mistralai.models.chat_completion import ChatMessage
 import re
-from datetime import datetime
 import logging
 import hashlib
 import json
 from dotenv import load_dotenv
+from .cache import get_cache
+from .persistent_cache import get_persistent_cache
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Upper bound on concurrent Mistral requests per process, and per-request timeout in seconds
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MISTRAL_MAX_CONCURRENCY", "4"))
+REQUEST_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", "60"))
+
+# One semaphore per event loop, shared by every client in the process
+_request_slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+def _get_request_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _request_slots.get(loop)
+    if slots is None:
+        slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        _request_slots[loop] = slots
+    return slots
+
+async def chat_completion(
+    client: MistralAsyncClient,
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: Optional[float] = REQUEST_TIMEOUT
+) -> str:
+    """
+    Run a chat completion without blocking the event loop.
+
+    Requests wait for one of MAX_CONCURRENT_REQUESTS slots, and raise
+    asyncio.TimeoutError if they take longer than timeout. Cancelling the
+    caller cancels the HTTP request.
+    """
+    async with _get_request_slots():
+        response = await asyncio.wait_for(client.chat(model=model, messages=messages), timeout)
+    return response.choices[0].message.content
+
+async def chat_completion_stream(
+    client: MistralAsyncClient,
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: Optional[float] = REQUEST_TIMEOUT
+) -> AsyncIterator[str]:
+    """
+    Stream a chat completion token by token.
+
+    Shares the concurrency slots of chat_completion(). Here timeout bounds
+    the wait for each chunk, not the whole generation.
+    """
+    async with _get_request_slots():
+        stream = client.chat_stream(model=model, messages=messages)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.aclose()
+
 class MistralAnalyzer:
     def __init__(self):
         # Initialize logger
@@ -20,10 +79,14 @@ class MistralAnalyzer:
         # Initialize MistralAI client
         mistral_api_key = os.getenv('MISTRAL_API_KEY')  # Load API key from environment variable
         
-        self.client = MistralClient(api_key=mistral_api_key)
-        # Initialize cache
-        self.cache = {}
+        self.client = MistralAsyncClient(api_key=mistral_api_key)
+        # Initialize cache; on disk when possible, so every worker process sees
+        # the analyses one of them generated (e.g. while prewarming)
         self.cache_duration = 3600  # 1 hour cache duration
+        self.cache = (
+            get_persistent_cache("analyzer", ttl=self.cache_duration, max_entries=4096)
+            or get_cache("analyzer:analyses", ttl=self.cache_duration, max_entries=512)
+        )
 
     def _create_analysis_prompt(self, country: str, indicator: str, data: Dict[str, Any]) -> str:
         """Create a prompt for data analysis"""
@@ -48,6 +111,7 @@ class MistralAnalyzer:
 
 Indicator Details:
 - Name: {metadata.get('indicator_name')}
+- Unit: {metadata.get('unit')}
 - Source: World Bank
 
 Data Points:
@@ -55,66 +119,103 @@ Data Points:
 
 Please provide a well-structured, detailed analysis that would be helpful for understanding the economic situation of {country} based on this {indicator} data. Do not mention any inconsistencies or errors in the data labeling."""
 
+    def _create_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Wrap the analysis prompt in the chat messages sent to Mistral"""
+        return [
+            {
+                "role": "system",
+                "content": "You are an expert economic analyst specializing in analyzing economic data and providing insightful analysis."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
     def _get_cache_key(self, country: str, indicator: str, data: Dict[str, Any]) -> str:
-        """Generate a cache key for the analysis"""
+        """
+        Generate a cache key for the analysis. Years and values are normalized,
+        since the UI posts datasets back as parsed JSON (2.0 arrives as 2) and
+        should still hit the analyses prewarmed from the server's own copy.
+        """
         # Create a simplified version of the data for the cache key
         simplified_data = {
             "country": country,
             "indicator": indicator,
-            "data_points": [{"year": p["year"], "value": p["value"]} for p in data.get("data", [])]
+            "data_points": [
+                {"year": int(p["year"]), "value": None if p["value"] is None else round(float(p["value"]), 10)}
+                for p in data.get("data", [])
+            ]
         }
         # Convert to JSON and hash it
         data_str = json.dumps(simplified_data, sort_keys=True)
         return hashlib.md5(data_str.encode()).hexdigest()
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if the cached data is still valid"""
-        if cache_key not in self.cache:
-            return False
-        cached_time = self.cache[cache_key]["timestamp"]
-        return (datetime.now() - cached_time).seconds < self.cache_duration
+    async def _get_cached(self, cache_key: str) -> Optional[str]:
+        """Look an analysis up on a worker thread, since the cache may be on disk."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.cache.get, cache_key)
+
+    def _set_cached(self, cache_key: str, analysis: str) -> None:
+        """Cache an analysis from a worker thread without waiting for the write."""
+        asyncio.get_running_loop().run_in_executor(None, self.cache.set, cache_key, analysis)
 
-    async def analyze_data(self, country: str, indicator: str, data: Dict[str, Any]) -> str:
+    async def analyze_data(self, country: str, indicator: str, data: Dict[str, Any], refresh: bool = False) -> str:
         """
-        Analyze the data using MistralAI with caching
+        Analyze the data using MistralAI with caching.
+        With refresh the cached analysis is ignored and replaced (used to prewarm).
         """
         try:
             # Check cache first
             cache_key = self._get_cache_key(country, indicator, data)
-            if self._is_cache_valid(cache_key):
+            cached_analysis = None if refresh else await self._get_cached(cache_key)
+            if cached_analysis is not None:
                 self.logger.info(f"Returning cached analysis for {country}, {indicator}")
-                return self.cache[cache_key]["analysis"]
+                return cached_analysis
             
             # Create analysis prompt
             prompt = self._create_analysis_prompt(country, indicator, data)
             
             # Use the medium model directly for faster response
-            response = self.client.chat(
+            analysis = await chat_completion(
+                self.client,
                 model="mistral-medium",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert economic analyst specializing in analyzing economic data and providing insightful analysis."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+                messages=self._create_messages(prompt)
             )
             
-            analysis = response.choices[0].message.content
-            
             # Cache the result
-            self.cache[cache_key] = {
-                "analysis": analysis,
-                "timestamp": datetime.now()
-            }
+            self._set_cached(cache_key, analysis)
             
             return analysis
             
+        except asyncio.TimeoutError:
+            return f"Error during analysis: the request timed out after {REQUEST_TIMEOUT:.0f} seconds."
         except Exception as e:
             error_msg = str(e)
             if "API key" in error_msg.lower():
                 return "Error: Invalid or missing MistralAI API key. Please check your environment variables."
-            return f"Error during analysis: {error_msg}" 
\ No newline at end of file
+            return f"Error during analysis: {error_msg}"
+
+    async def analyze_data_stream(self, country: str, indicator: str, data: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream the analysis token by token as Mistral generates it.
+        A cached analysis is yielded as a single chunk. The full text is cached
+        once the stream completes.
+        """
+        cache_key = self._get_cache_key(country, indicator, data)
+        cached_analysis = await self._get_cached(cache_key)
+        if cached_analysis is not None:
+            self.logger.info(f"Returning cached analysis for {country}, {indicator}")
+            yield cached_analysis
+            return
+
+        prompt = self._create_analysis_prompt(country, indicator, data)
+        tokens = []
+        async for token in chat_completion_stream(
+            self.client,
+            model="mistral-medium",
+            messages=self._create_messages(prompt)
+        ):
+            tokens.append(token)
+            yield token
+
+        self._set_cached(cache_key, "".join(tokens))
@@ -0,0 +1,166 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+from .cache import CacheBackend, CacheEntry, TTLCache, get_cache
+
+load_dotenv()
+
+logger = logging.getLogger("PersistentCache")
+
+# Location of the shared on-disk cache; set to an empty string to disable it
+CACHE_PATH = os.getenv("AGENT_CACHE_PATH", os.path.join(".cache", "agent_cache.sqlite3"))
+# Reads only move an entry up the LRU order if it was last touched this many
+# seconds ago, so most hits stay read-only transactions
+TOUCH_INTERVAL = float(os.getenv("AGENT_CACHE_TOUCH_INTERVAL", "300"))
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache backend stored in a SQLite database.
+
+    The database runs in WAL mode so several gunicorn workers can read and
+    write the same file concurrently, and entries survive restarts. Values
+    are pickled. Each namespace (one per agent) lives in the same table.
+    Expiry times are wall-clock timestamps, since a monotonic clock is not
+    comparable across processes. The LRU order is approximate: an entry's
+    access time is only rewritten once every TOUCH_INTERVAL seconds.
+    """
+
+    def __init__(self, path: str, namespace: str, touch_interval: float = TOUCH_INTERVAL):
+        self.path = path
+        self.namespace = namespace
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        # Access time of every entry read through this connection, as last seen in the table
+        self._accessed_at: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)"
+        )
+
+    def _seen(self, key: str, accessed_at: float) -> None:
+        # Entries other workers deleted are never removed here, so start over now and then
+        if len(self._accessed_at) >= 100000:
+            self._accessed_at.clear()
+        self._accessed_at[key] = accessed_at
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, size, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key)),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, size, accessed_at = row
+            self._seen(str(key), accessed_at)
+        return CacheEntry(pickle.loads(value), expires_at, size)
+
+    def set(self, key: Hashable, entry: CacheEntry) -> None:
+        blob = pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, str(key), blob, entry.expires_at, len(blob), now),
+            )
+            self._seen(str(key), now)
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            self._accessed_at.pop(str(key), None)
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key)),
+            )
+        return cursor.rowcount > 0
+
+    def touch(self, key: Hashable) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._accessed_at.get(str(key), 0.0) < self.touch_interval:
+                return
+            self._seen(str(key), now)
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, str(key)),
+            )
+
+    def pop_lru(self) -> Optional[Hashable]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT 1",
+                (self.namespace,),
+            ).fetchone()
+        if row is None or not self.delete(row[0]):
+            return None
+        return row[0]
+
+    def total_size(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        return row[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accessed_at.clear()
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        return row[0]
+
+
+def get_persistent_cache(namespace: str, ttl: float, max_entries: Optional[int] = None, grace: float = 0) -> Optional[TTLCache]:
+    """
+    Return the process-wide on-disk cache for a namespace, or None if the
+    persistent cache is disabled or cannot be opened.
+    """
+    if not CACHE_PATH:
+        return None
+    try:
+        return get_cache(
+            f"disk:{namespace}",
+            ttl=ttl,
+            backend_factory=lambda: SQLiteBackend(CACHE_PATH, namespace),
+            max_entries=max_entries,
+            grace=grace,
+            clock=time.time,
+        )
+    except sqlite3.Error as e:
+        logger.warning(f"Persistent cache unavailable at {CACHE_PATH}: {e}")
+        return None
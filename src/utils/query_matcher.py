@@ -0,0 +1,227 @@
+import re
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("FastQueryParser")
+
+# Default year range, matching what the LLM parser is told to use
+DEFAULT_START_YEAR = 2000
+DEFAULT_END_YEAR = 2025
+
+# Country keys that are also ordinary English words; only matched when written in capitals
+AMBIGUOUS_COUNTRY_KEYS = {"us"}
+
+# Words that start longer country names ("South Sudan", "Equatorial Guinea").
+# A known country right after one of them is probably part of a name the
+# table does not have, so the query is left to the LLM.
+COUNTRY_NAME_PREFIXES = {
+    "south", "north", "east", "west", "southern", "northern", "eastern", "western",
+    "central", "equatorial", "new", "democratic", "republic", "united", "papua",
+    "saint", "st", "great", "upper", "french", "british", "american",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_ORIGINAL_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+_RANGE_RE = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to|until|till|through|and)\s*((?:19|20)\d{2})\b"
+)
+_SINCE_RE = re.compile(r"\b(?:since|from|after|starting)\s+((?:19|20)\d{2})\b")
+_LAST_RE = re.compile(r"\b(?:last|past|previous)\s+(?:(\d+|ten|five|twenty)\s+years?|(decade))\b")
+_YEAR_RE = re.compile(r"\b((?:19|20)\d{2})\b")
+_NUMBER_WORDS = {"five": 5, "ten": 10, "twenty": 20}
+_NORMALIZE_RANGE_RE = re.compile(
+    r"\b(?:(?:from|between)\s+)?((?:19|20)\d{2})\s*(?:-|–|—|to|until|till|through|and)\s*((?:19|20)\d{2})\b"
+)
+_PUNCTUATION_RE = re.compile(r"[^a-z0-9\- ]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into alphanumeric tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a query, used as the parsed-query cache key.
+
+    Lowercases, rewrites year ranges ("from 2000 to 2020", "2000 - 2020",
+    "between 2000 and 2020") as "2000-2020", drops punctuation and collapses
+    whitespace, so near-duplicate queries share one entry.
+    """
+    text = query.lower().strip()
+    text = _NORMALIZE_RANGE_RE.sub(lambda m: f"{m.group(1)}-{m.group(2)}", text)
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+class PhraseTrie:
+    """
+    Token-level trie for matching multi-word phrases in a single pass.
+    """
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+
+    def add(self, phrase: str, value: Any) -> None:
+        """Add a phrase; the first value registered for a phrase wins."""
+        node = self.root
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node.setdefault("$value", value)
+
+    def find_all(self, tokens: List[str]) -> List[Tuple[int, int, Any]]:
+        """
+        Return the longest non-overlapping matches as (start, end, value),
+        scanning from left to right.
+        """
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if "$value" in node:
+                    best = (i, j, node["$value"])
+            if best:
+                matches.append(best)
+                i = best[1]
+            else:
+                i += 1
+        return matches
+
+
+class FastQueryParser:
+    """
+    Rule-based parser for the common "<indicator> of <country> from <year> to <year>"
+    query shapes. Indicators and countries are matched with phrase tries built
+    from the agents' indicator mappings and the country code table; years are
+    matched with regular expressions. parse() returns None when the query is
+    ambiguous or incomplete so the caller can fall back to the LLM.
+    """
+
+    def __init__(self, indicators: Iterable[str], countries: Dict[str, str]):
+        """
+        Args:
+            indicators: Indicator keys understood by the agents, in priority order
+            countries: Mapping of country phrases (names, variations) to canonical names
+        """
+        self.indicator_trie = PhraseTrie()
+        for indicator in indicators:
+            self.indicator_trie.add(indicator.replace("_", " "), indicator)
+
+        self.country_trie = PhraseTrie()
+        for phrase, country in countries.items():
+            self.country_trie.add(phrase, country)
+
+        self.attempts = 0
+        self.hits = 0
+
+    def _extract_years(self, text: str) -> Tuple[int, int]:
+        current_year = datetime.now().year
+
+        match = _RANGE_RE.search(text)
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            return min(start, end), max(start, end)
+
+        match = _LAST_RE.search(text)
+        if match:
+            if match.group(2):
+                span = 10
+            else:
+                span = _NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+            return current_year - span, current_year
+
+        match = _SINCE_RE.search(text)
+        if match:
+            return int(match.group(1)), DEFAULT_END_YEAR
+
+        years = [int(year) for year in _YEAR_RE.findall(text)]
+        if len(years) == 1:
+            return years[0], years[0]
+
+        return DEFAULT_START_YEAR, DEFAULT_END_YEAR
+
+    def _find_countries(self, query: str, tokens: List[str], matched: List[bool]) -> Optional[List[str]]:
+        """
+        Return the countries named in the query, marking their tokens in
+        matched, or None when a match looks like part of a longer name the
+        table does not know ("Guinea-Bissau", "South Sudan").
+        """
+        spans = [match.span() for match in _ORIGINAL_TOKEN_RE.finditer(query)]
+        if len(spans) != len(tokens):
+            # Lowercasing changed the tokens (some non-ASCII letters); let the LLM parse it
+            return None
+        countries = []
+        for start, end, country in self.country_trie.find_all(tokens):
+            phrase = " ".join(tokens[start:end])
+            if phrase in AMBIGUOUS_COUNTRY_KEYS and not query[spans[start][0]:spans[start][1]].isupper():
+                continue
+            before, after = spans[start][0], spans[end - 1][1]
+            hyphenated = (
+                (before > 1 and query[before - 1] == "-" and query[before - 2].isalnum())
+                or (after + 1 < len(query) and query[after] == "-" and query[after + 1].isalnum())
+            )
+            if hyphenated or (start > 0 and tokens[start - 1] in COUNTRY_NAME_PREFIXES):
+                return None
+            matched[start:end] = [True] * (end - start)
+            if country not in countries:
+                countries.append(country)
+        return countries
+
+    @staticmethod
+    def _has_unknown_names(query: str, matched: List[bool]) -> bool:
+        """
+        Whether a capitalized word other than the first is left unmatched:
+        likely a country (or other name) the tries do not know.
+        """
+        original_tokens = _ORIGINAL_TOKEN_RE.findall(query)
+        if len(original_tokens) != len(matched):
+            return True
+        return any(
+            token[0].isupper() and len(token) > 1 and not matched[position]
+            for position, token in enumerate(original_tokens)
+            if position > 0
+        )
+
+    def parse(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a query into indicator, country (a name, or a list of names when
+        several are compared) and year range, or return None.
+        """
+        self.attempts += 1
+        text = query.lower()
+        tokens = tokenize(text)
+
+        matched = [False] * len(tokens)
+        indicator_matches = self.indicator_trie.find_all(tokens)
+        for start, end, _ in indicator_matches:
+            matched[start:end] = [True] * (end - start)
+        indicators = {value for _, _, value in indicator_matches}
+        countries = self._find_countries(query, tokens, matched)
+        if len(indicators) != 1 or not countries or self._has_unknown_names(query, matched):
+            logger.info(f"Fast path miss for query: {query}")
+            return None
+
+        start_year, end_year = self._extract_years(text)
+        self.hits += 1
+        return {
+            "indicator": indicators.pop(),
+            # Comparison queries name several countries
+            "country": countries[0] if len(countries) == 1 else countries,
+            "start_year": start_year,
+            "end_year": end_year,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how often the fast path answered without the LLM."""
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "misses": self.attempts - self.hits,
+            "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+        }
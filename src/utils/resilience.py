@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("Resilience")
+
+# Statuses worth retrying: timeouts, throttling and server-side failures.
+# Other 4xx responses mean the request itself is wrong and will fail again.
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Defaults for every upstream host (overridable through environment variables)
+DEFAULT_RATE = float(os.getenv("UPSTREAM_RATE_LIMIT", "10"))          # requests per second
+DEFAULT_BURST = float(os.getenv("UPSTREAM_RATE_BURST", "10"))
+MIN_RATE = float(os.getenv("UPSTREAM_MIN_RATE", "0.5"))
+FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+# Longest a request waits for the rate limiter or between retries, in seconds.
+# A host asking for a longer pause has its circuit opened for that long instead.
+MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "5"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delay in seconds or an HTTP date) into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamError(Exception):
+    """
+    An upstream API answered with an error status.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status in RETRYABLE_STATUSES
+
+    @classmethod
+    async def from_response(cls, response: aiohttp.ClientResponse, prefix: str) -> "UpstreamError":
+        """Build the error for a non-200 response, keeping its status and Retry-After."""
+        error_text = await response.text()
+        return cls(
+            f"{prefix}: {error_text}",
+            status=response.status,
+            retry_after=parse_retry_after(response.headers.get("Retry-After"))
+        )
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a source whose circuit breaker is open.
+    """
+
+
+class RateLimitedError(CircuitOpenError):
+    """
+    Raised instead of waiting longer than allowed for the rate limiter.
+    """
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Classify an error: throttling, server errors, timeouts and connection
+    problems are retried; client errors and bad parameters are not.
+    """
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    """
+    Adaptive token-bucket rate limiter for one upstream host.
+
+    Tokens refill at `rate` per second up to `capacity`. When the host
+    throttles us, the rate is halved and requests pause for Retry-After;
+    every success raises the rate again by a small step, up to max_rate.
+    Waiters reserve tokens in arrival order, so no lock is held while sleeping;
+    a caller that would wait longer than max_wait gets RateLimitedError instead.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = MIN_RATE, clock: Callable[[], float] = time.monotonic):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated_at = clock()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """
+        Take a token and return how long to wait before using it. If that is
+        longer than max_wait, no token is taken and RateLimitedError is raised.
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            wait = max((1 - self.tokens) / self.rate if self.tokens < 1 else 0.0, self.blocked_until - now)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitedError(f"Rate limited for another {wait:.0f}s")
+            self.tokens -= 1
+            return wait
+
+    async def acquire(self, max_wait: Optional[float] = MAX_WAIT) -> None:
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        """The host pushed back: halve the rate and pause for Retry-After."""
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, self.clock() + retry_after)
+
+    def record_success(self) -> None:
+        """Additive increase back towards the configured rate."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "throttled": self.throttled,
+            "blocked_for": round(max(0.0, self.blocked_until - self.clock()), 3),
+        }
+
+
+class CircuitBreaker:
+    """
+    Stops calling a source that keeps failing.
+
+    After `failure_threshold` consecutive retryable failures the circuit opens
+    and calls fail immediately with CircuitOpenError. After `reset_timeout`
+    seconds one trial call is let through (half-open); success closes the
+    circuit, failure opens it again. open_for() opens it for a given time,
+    e.g. a long Retry-After.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.retry_at = 0.0
+        self.short_circuited = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.short_circuited += 1
+            retry_in = max(0.0, self.retry_at - self.clock())
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open, retrying in {retry_in:.0f}s)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """A call was cancelled before it finished; let the next one be the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.retry_at = self.clock() + self.reset_timeout
+                self._trial_in_flight = False
+
+    def open_for(self, seconds: float) -> None:
+        """Open the circuit for the given number of seconds (or longer, if it already is)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.name} opened for {seconds:.0f}s")
+            self.retry_at = max(self.retry_at if self.state == self.OPEN else 0.0, self.clock() + seconds)
+            self.state = self.OPEN
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class UpstreamGuard:
+    """
+    Rate limiter and circuit breaker for one upstream host.
+    Callers never wait more than max_wait inside the limiter; a Retry-After
+    longer than that opens the circuit for its duration, so calls fail fast
+    instead of sitting out their whole timeout.
+    """
+
+    def __init__(self, host: str, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST, max_wait: float = MAX_WAIT):
+        self.host = host
+        self.max_wait = max_wait
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(host)
+
+    async def call(self, func: Callable[[], Any]) -> Any:
+        """
+        Make one attempt through the breaker and limiter and record its outcome.
+        """
+        self.breaker.check()
+        try:
+            await self.limiter.acquire(self.max_wait)
+            result = await func()
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except RateLimitedError:
+            # Nothing was sent; the slot goes to the next caller
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if isinstance(e, UpstreamError) and (e.status == 429 or e.retry_after):
+                self.limiter.throttle(e.retry_after)
+                if e.retry_after and e.retry_after > self.max_wait:
+                    self.breaker.open_for(e.retry_after)
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                # The source answered; the request itself was wrong
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        self.limiter.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limiter": self.limiter.stats(), "breaker": self.breaker.stats()}
+
+
+# Guards by host, shared by all agents in the process
+_guards: Dict[str, UpstreamGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(host: str) -> UpstreamGuard:
+    """
+    Return the guard for a host, creating it on first use.
+    """
+    with _guards_lock:
+        guard = _guards.get(host)
+        if guard is None:
+            guard = _guards[host] = UpstreamGuard(host)
+        return guard
+
+
+def backoff_delay(attempt: int, base: float, retry_after: Optional[float] = None, cap: float = MAX_WAIT) -> float:
+    """
+    Exponential backoff with jitter, never shorter than Retry-After and never longer than cap.
+    """
+    delay = base * (2 ** attempt) * random.uniform(0.5, 1.0)
+    return min(max(delay, retry_after or 0.0), cap)
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Return limiter and breaker state for every upstream host.
+    """
+    with _guards_lock:
+        guards = dict(_guards)
+    return {host: guard.stats() for host, guard in guards.items()}
@@ -0,0 +1,170 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .sdmx_stream import SDMXData
+
+# Dimension ids SDMX providers use for the country of a series
+COUNTRY_DIMENSIONS = ("REF_AREA", "LOCATION", "COU")
+# ... for the indicator of a series
+INDICATOR_DIMENSIONS = ("SERIES", "INDICATOR", "SUBJECT", "TRANSACT")
+# ... for the frequency of a series
+FREQUENCY_DIMENSIONS = ("FREQ", "FREQUENCY")
+# Attributes holding the power of ten a series' values are expressed in (6: millions)
+UNIT_MULTIPLIER_ATTRIBUTES = ("UNIT_MULT", "POWERCODE")
+
+
+class StructureIndex:
+    """
+    Lookup tables for the structure section of one SDMX-JSON message.
+
+    Built once per response: series dimension id -> position in the series
+    keys, and for every dimension its value ids and names as arrays indexed
+    by code index, so series keys and observation indexes are decoded by
+    direct array access instead of scanning the structure.
+    """
+
+    def __init__(self, structure: Dict[str, Any]):
+        self.name: str = structure.get("name", "")
+        dimensions = structure.get("dimensions", {})
+        if not isinstance(dimensions, dict):
+            dimensions = {}
+
+        self.positions: Dict[str, int] = {}
+        self.ids: Dict[str, np.ndarray] = {}
+        self.names: Dict[str, np.ndarray] = {}
+        for position, dimension in enumerate(dimensions.get("series", [])):
+            self.positions[dimension.get("id")] = position
+            self._add_values(dimension)
+        for dimension in dimensions.get("observation", []):
+            self._add_values(dimension)
+
+        self.attributes: Dict[str, Dict[str, Any]] = {}
+        attributes = structure.get("attributes", {})
+        for group in (attributes.values() if isinstance(attributes, dict) else [attributes]):
+            for attribute in group or []:
+                self.attributes.setdefault(attribute.get("id"), attribute)
+        # Series-level attribute id -> position in each series' attribute indexes
+        series_attributes = attributes.get("series", []) if isinstance(attributes, dict) else []
+        self.series_attribute_positions: Dict[str, int] = {
+            attribute.get("id"): position for position, attribute in enumerate(series_attributes or [])
+        }
+
+        periods = self.ids.get("TIME_PERIOD", np.empty(0, dtype=object))
+        self.years = np.array([int(str(period)[:4]) for period in periods], dtype=np.int64)
+
+    def _add_values(self, dimension: Dict[str, Any]) -> None:
+        values = dimension.get("values", [])
+        self.ids[dimension.get("id")] = np.array([value.get("id", "") for value in values], dtype=object)
+        self.names[dimension.get("id")] = np.array([value.get("name", "") for value in values], dtype=object)
+
+    def find(self, dimension_ids: Sequence[str]) -> Optional[str]:
+        """Return the first of the given dimension ids present in the series keys."""
+        return next((dimension_id for dimension_id in dimension_ids if dimension_id in self.positions), None)
+
+    def decode_keys(self, series_keys: Sequence[str]) -> np.ndarray:
+        """
+        Split colon-separated series keys into a (series, dimension) matrix of
+        code indexes, splitting each key once.
+        """
+        if not series_keys:
+            return np.empty((0, len(self.positions)), dtype=np.intp)
+        return np.array([key.split(":") for key in series_keys], dtype=np.intp)
+
+    def series_codes(self, key_matrix: np.ndarray, dimension_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and names of one dimension for every series in a decoded key matrix."""
+        codes = key_matrix[:, self.positions[dimension_id]]
+        return self.ids[dimension_id][codes], self.names[dimension_id][codes]
+
+    def attribute_name(self, attribute_id: str, default: str = "") -> str:
+        """
+        Name of an attribute's value when it has a single one (e.g. the unit),
+        otherwise the attribute's own name.
+        """
+        attribute = self.attributes.get(attribute_id)
+        if not attribute:
+            return default
+        values = attribute.get("values") or []
+        if len(values) == 1:
+            return values[0].get("name", default)
+        return attribute.get("name", default)
+
+    def series_attribute_ids(self, data: SDMXData, attribute_id: str) -> np.ndarray:
+        """
+        Value id of an attribute for every series of a message: its only value
+        if it has one, else the value each series points to ("" when unset).
+        """
+        attribute = self.attributes.get(attribute_id) or {}
+        values = [value.get("id", "") for value in attribute.get("values") or []]
+        result = np.full(len(data.series_keys), values[0] if len(values) == 1 else "", dtype=object)
+        position = self.series_attribute_positions.get(attribute_id)
+        if position is None or len(values) <= 1:
+            return result
+        for series, indexes in enumerate(data.series_attributes):
+            if position < len(indexes) and indexes[position] is not None and indexes[position] < len(values):
+                result[series] = values[indexes[position]]
+        return result
+
+    def dimension_value_name(self, dimension_ids: Sequence[str], default: str = "") -> str:
+        """Name of a dimension's value when the message has a single one (e.g. the frequency)."""
+        for dimension_id in dimension_ids:
+            names = self.names.get(dimension_id)
+            if names is not None and len(names) == 1 and names[0]:
+                return names[0]
+        return default
+
+
+def unit_multipliers(data: SDMXData, index: StructureIndex) -> np.ndarray:
+    """
+    Factor turning each series' values into base units, from its UNIT_MULT
+    (or OECD.Stat POWERCODE) attribute; 1.0 where the message has none.
+    """
+    multipliers = np.ones(len(data.series_keys), dtype=np.float64)
+    attribute_id = next((attribute_id for attribute_id in UNIT_MULTIPLIER_ATTRIBUTES if attribute_id in index.attributes), None)
+    if attribute_id is None:
+        return multipliers
+    for series, exponent in enumerate(index.series_attribute_ids(data, attribute_id)):
+        try:
+            multipliers[series] = 10.0 ** int(exponent)
+        except (TypeError, ValueError):
+            pass
+    return multipliers
+
+
+def base_unit_values(data: SDMXData, columns: Dict[str, np.ndarray], index: StructureIndex) -> np.ndarray:
+    """
+    The "value" column of observation_columns() converted to base units with
+    each series' unit multiplier (see unit_multipliers).
+    """
+    return columns["value"] * unit_multipliers(data, index)[columns["series"]]
+
+
+def observation_columns(data: SDMXData) -> Tuple[Dict[str, np.ndarray], StructureIndex, np.ndarray]:
+    """
+    Decode the observations of an SDMX message into per-point columns.
+
+    Series keys are decoded once into code indexes; observations are then
+    mapped to their series, country and year by array indexing. Returns the
+    columns ("year", "value", "country_code", "country_name", "series"), the
+    structure index and the decoded (series, dimension) key matrix.
+    """
+    index = StructureIndex(data.structure)
+    key_matrix = index.decode_keys(data.series_keys)
+
+    country_dimension = index.find(COUNTRY_DIMENSIONS)
+    if country_dimension is not None:
+        codes, names = index.series_codes(key_matrix, country_dimension)
+    else:
+        # No country dimension; keep the first key component so series stay apart
+        codes = np.array([key.split(":")[0] for key in data.series_keys], dtype=object)
+        names = np.full(len(codes), "", dtype=object)
+
+    series = np.frombuffer(data.observation_series, dtype=np.intc)
+    columns = {
+        "year": index.years[np.frombuffer(data.observation_time, dtype=np.intc)],
+        "value": np.frombuffer(data.observation_values, dtype=np.float64),
+        "country_code": codes[series],
+        "country_name": names[series],
+        "series": series,
+    }
+    return columns, index, key_matrix
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+from array import array
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import ijson
+except ImportError:  # Optional: without it SDMX responses are parsed with response.json()
+    ijson = None
+
+# Responses up to this many bytes are read whole and parsed with json.loads,
+# which is several times faster than ijson; only larger ones are streamed,
+# to bound peak memory
+STREAM_THRESHOLD = int(os.getenv("SDMX_STREAM_THRESHOLD", str(8 * 1024 * 1024)))
+
+_START_EVENTS = ("start_map", "start_array")
+_END_EVENTS = ("end_map", "end_array")
+
+
+class SDMXData:
+    """
+    Observations of an SDMX-JSON data message in columnar form.
+
+    Holds the distinct series keys once, and for each observation the index
+    of its series key, its TIME_PERIOD index and its value in compact arrays,
+    together with the message's structure section and each series' attribute
+    value indexes (e.g. its UNIT_MULT). Observations without a value are
+    dropped. `dataflow` records what was requested, since SDMX-JSON messages
+    do not echo it.
+    """
+    __slots__ = (
+        "structure", "dataflow", "series_keys", "series_attributes",
+        "observation_series", "observation_time", "observation_values"
+    )
+
+    def __init__(self):
+        self.structure: Dict[str, Any] = {}
+        self.dataflow = ""
+        self.series_keys: List[str] = []
+        self.series_attributes: List[List[Optional[int]]] = []
+        self.observation_series = array("i")
+        self.observation_time = array("i")
+        self.observation_values = array("d")
+
+    def __len__(self) -> int:
+        return len(self.observation_values)
+
+    def add_series(self, series_key: str, attributes: Optional[List[Optional[int]]] = None) -> int:
+        self.series_keys.append(series_key)
+        self.series_attributes.append(list(attributes or []))
+        return len(self.series_keys) - 1
+
+    def add_observation(self, series: int, time_index: int, value: float) -> None:
+        self.observation_series.append(series)
+        self.observation_time.append(time_index)
+        self.observation_values.append(value)
+
+    @classmethod
+    def from_json(cls, document: Dict[str, Any]) -> "SDMXData":
+        """Build from an already parsed SDMX-JSON document."""
+        data = cls()
+        data.structure = document.get("structure", {})
+        series = (document.get("dataSets") or [{}])[0].get("series", {})
+        for series_key, series_data in series.items():
+            position = data.add_series(series_key, series_data.get("attributes"))
+            for time_index, observation in series_data.get("observations", {}).items():
+                if observation and observation[0] is not None:
+                    data.add_observation(position, int(time_index), float(observation[0]))
+        return data
+
+    @classmethod
+    async def from_stream(cls, stream: Any) -> "SDMXData":
+        """
+        Build incrementally from a byte stream such as aiohttp's response.content.
+        Only the compact columns are kept, never the whole document.
+        """
+        data = cls()
+        series_positions: Dict[str, int] = {}
+        async for kind, item in iter_sdmx(stream):
+            if kind == "observation":
+                series_key, time_index, value = item
+                position = series_positions.get(series_key)
+                if position is None:
+                    position = series_positions[series_key] = data.add_series(series_key)
+                data.add_observation(position, time_index, value)
+            elif kind == "series_attributes":
+                series_key, attributes = item
+                position = series_positions.get(series_key)
+                if position is None:
+                    series_positions[series_key] = data.add_series(series_key, attributes)
+                else:
+                    data.series_attributes[position] = attributes
+            else:
+                data.structure = item
+        return data
+
+
+class _PrefixedStream:
+    """A byte stream that returns already read bytes before the rest of the stream."""
+
+    def __init__(self, prefix: bytes, stream: Any):
+        self.prefix = prefix
+        self.stream = stream
+
+    async def read(self, n: int = -1) -> bytes:
+        if self.prefix:
+            chunk = self.prefix if n < 0 else self.prefix[:n]
+            self.prefix = self.prefix[len(chunk):]
+            return chunk
+        return await self.stream.read(n)
+
+
+async def read_sdmx_response(response: Any, threshold: int = STREAM_THRESHOLD) -> SDMXData:
+    """
+    Read an aiohttp SDMX-JSON response. Bodies up to threshold bytes are
+    parsed with json.loads; larger ones are streamed through ijson when it is
+    installed, continuing after the bytes already read.
+    """
+    if ijson is None:
+        return SDMXData.from_json(await response.json(content_type=None))
+    try:
+        head = await response.content.readexactly(threshold + 1)
+    except asyncio.IncompleteReadError as e:
+        return SDMXData.from_json(json.loads(e.partial))
+    return await SDMXData.from_stream(_PrefixedStream(head, response.content))
+
+
+async def iter_sdmx(stream: Any) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Incrementally parse an SDMX-JSON data message.
+
+    Yields ("observation", (series_key, time_index, value)) for every observation
+    with a value as soon as it has been read, ("series_attributes", (series_key,
+    value indexes)) for every series that has attributes, and ("structure",
+    dict) once the structure section is complete. Observations are available
+    before the rest of the download has arrived; in SDMX-JSON 1.0 the
+    structure usually comes last.
+    """
+    if ijson is None:
+        raise RuntimeError("ijson is required for streaming SDMX parsing")
+
+    # Nesting depth, and the last map key seen at each depth. The observation
+    # values sit at dataSets[i].series{key}.observations{time}[0], depth 7.
+    depth = 0
+    keys: List[Optional[str]] = [None] * 8
+    expecting_value = False
+    # Attribute value indexes of the series being read, while inside its "attributes" array
+    series_attributes: Optional[List[Optional[int]]] = None
+    structure_builder = None
+    structure_depth = 0
+
+    async for event, value in ijson.basic_parse_async(stream, use_float=True):
+        if structure_builder is not None:
+            structure_builder.event(event, value)
+            if event in _START_EVENTS:
+                structure_depth += 1
+            elif event in _END_EVENTS:
+                structure_depth -= 1
+                if not structure_depth:
+                    yield "structure", structure_builder.value
+                    structure_builder = None
+            continue
+
+        if event == "map_key":
+            if depth < len(keys):
+                keys[depth] = value
+        elif event in _START_EVENTS:
+            if depth == 1 and keys[1] == "structure" and event == "start_map":
+                structure_builder = ijson.ObjectBuilder()
+                structure_builder.event(event, value)
+                structure_depth = 1
+                continue
+            depth += 1
+            expecting_value = (
+                depth == 7 and keys[5] == "observations" and keys[3] == "series" and keys[1] == "dataSets"
+            )
+            if depth == 6 and keys[5] == "attributes" and keys[3] == "series" and keys[1] == "dataSets":
+                series_attributes = []
+        elif event in _END_EVENTS:
+            depth -= 1
+            expecting_value = False
+            if series_attributes is not None:
+                yield "series_attributes", (keys[4], series_attributes)
+                series_attributes = None
+        elif expecting_value:
+            expecting_value = False
+            if value is not None:
+                yield "observation", (keys[4], int(keys[6]), float(value))
+        elif series_attributes is not None:
+            series_attributes.append(None if value is None else int(value))
@@ -0,0 +1,459 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ..schemas.data_schema import DataSet
+from ..schemas.series_frame import SeriesFrame
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in different processes are not serialized
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger("SeriesStore")
+
+# Location of the local series store; set to an empty string to disable it
+STORE_PATH = os.getenv("SERIES_STORE_PATH", os.path.join(".cache", "series"))
+
+# Year span of every block: column j holds the year FIRST_YEAR + j. It is
+# fixed, so a country fetched later is appended as a row without rewriting
+# the block. Values outside the span are not stored.
+FIRST_YEAR = 1950
+YEARS = 120
+
+_LOCK_FILE = ".lock"
+_HEAD_SUFFIX = ".head"
+_UNSAFE_CHARACTERS = re.compile(r"[^\w.-]")
+# One fixed-size record per block row, mapped like the block itself. start and
+# end are the years covered by fetched data (0 when none); snapshots ignore them.
+_ROW_DTYPE = np.dtype([
+    ("country", "S8"), ("name", "S64"), ("start", "<i2"), ("end", "<i2"), ("fetched_at", "<f8")
+])
+_ROW_BYTES = YEARS * 8
+
+
+def _base_name(indicator_code: str) -> str:
+    """
+    File name prefix of an indicator. Codes may contain path separators
+    (e.g. OECD); unsafe characters are escaped so different codes never share files.
+    """
+    return _UNSAFE_CHARACTERS.sub(lambda match: f"~{ord(match.group()):02x}", indicator_code)
+
+
+def _atomic_write(path: str, write) -> None:
+    """Write through a temporary file and rename it over path, so readers never see a partial file."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as handle:
+        write(handle)
+    os.replace(temp_path, path)
+
+
+def _map(path: str, dtype: Any, row_shape: tuple = ()) -> np.ndarray:
+    """Map a file of fixed-size rows read-only; only whole rows are mapped."""
+    row_size = np.dtype(dtype).itemsize * int(np.prod(row_shape, dtype=np.int64))
+    count = os.stat(path).st_size // row_size
+    if not count:
+        return np.empty((0,) + row_shape, dtype=dtype)
+    # A plain ndarray view of the mapping; memmap subclass instances are slower to slice
+    return np.asarray(np.memmap(path, dtype=dtype, mode="r", shape=(count,) + row_shape))
+
+
+class _Block:
+    """
+    One generation of an indicator's files, mapped into memory:
+    <code>.<generation>.values holds the float64 rows, <code>.<generation>.rows
+    the record of every row, and <code>.<generation>.json the indicator's
+    metadata, read once when the generation is opened. Fetched countries are
+    appended to the files of the current generation; a bulk snapshot starts a
+    new one, and <code>.head names the generation readers should use.
+    """
+    __slots__ = ("head", "meta", "values_path", "rows_path", "records", "values", "row_of")
+
+    def __init__(self, directory: str, base: str, head: tuple):
+        with open(os.path.join(directory, base + _HEAD_SUFFIX), "r", encoding="utf-8") as handle:
+            prefix = os.path.join(directory, f"{base}.{handle.read().strip()}")
+        self.head = head
+        with open(prefix + ".json", "r", encoding="utf-8") as handle:
+            self.meta: Dict[str, Any] = json.load(handle)
+        self.values_path = prefix + ".values"
+        self.rows_path = prefix + ".rows"
+        self.records = np.empty(0, dtype=_ROW_DTYPE)
+        self.values = np.empty((0, YEARS))
+        self.row_of: Dict[str, int] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Map rows appended since the files were last mapped."""
+        if os.stat(self.rows_path).st_size // _ROW_DTYPE.itemsize == len(self.records):
+            return
+        # Values are appended before their record and mapped after it, so every mapped record has its row
+        records = _map(self.rows_path, _ROW_DTYPE)
+        self.values = _map(self.values_path, np.float64, (YEARS,))
+        for row in range(len(self.records), len(records)):
+            self.row_of.setdefault(records["country"][row].decode("utf-8"), row)
+        self.records = records
+
+    def rows(self, countries: Sequence[str]) -> Optional[List[int]]:
+        """Rows of the given countries, or None if any of them is not stored."""
+        rows = [self.row_of.get(country) for country in countries]
+        if None in rows:
+            self.refresh()
+            rows = [self.row_of.get(country) for country in countries]
+        return None if not rows or None in rows else rows
+
+
+class SeriesStore:
+    """
+    Read-optimized local store of annual series.
+
+    Each (source, indicator) is one contiguous float64 block of shape
+    (countries, YEARS) in base units with NaN where there is no value, next to
+    a file of fixed-size binary row records (country, name, covered years,
+    fetch time). Both are opened with mmap, so a (source, indicator, country)
+    lookup is a dict lookup plus a slice with no parsing, and every worker
+    process shares the same pages. Updates are written into the mapped files
+    (values before records), so readers see them without reopening anything.
+
+    Blocks come from two places: bulk snapshots (see snapshot_ingest), which
+    hold everything the source published, and DataSets written through by
+    MasterAgent, which record per country the years that were received
+    ("coverage") and when they were fetched.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._blocks: Dict[tuple, _Block] = {}
+        self._head_paths: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _source_dir(self, source: str) -> str:
+        return os.path.join(self.root, source)
+
+    @contextmanager
+    def _locked(self, source: str) -> Iterator[str]:
+        """Serialize writers of a source's directory, across threads and worker processes."""
+        directory = self._source_dir(source)
+        os.makedirs(directory, exist_ok=True)
+        with self._write_lock, open(os.path.join(directory, _LOCK_FILE), "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield directory
+
+    def _block(self, source: str, indicator_code: str) -> Optional[_Block]:
+        """Return the indicator's mapped block, reopening it if a snapshot replaced it."""
+        key = (source, indicator_code)
+        head_path = self._head_paths.get(key)
+        if head_path is None:
+            head_path = self._head_paths[key] = os.path.join(self._source_dir(source), _base_name(indicator_code) + _HEAD_SUFFIX)
+        try:
+            stat = os.stat(head_path)
+        except FileNotFoundError:
+            return None
+        head = (stat.st_ino, stat.st_mtime_ns)
+        block = self._blocks.get(key)
+        if block is not None and block.head == head:
+            return block
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block.head != head:
+                block = self._blocks[key] = _Block(self._source_dir(source), _base_name(indicator_code), head)
+        return block
+
+    def entry(self, source: str, indicator_code: str) -> Optional[Dict[str, Any]]:
+        """Metadata stored with an indicator's block, or None if it is not in the store."""
+        block = self._block(source, indicator_code)
+        return block.meta if block is not None else None
+
+    def read(
+        self,
+        source: str,
+        indicator_code: str,
+        countries: Sequence[str],
+        start_year: int,
+        end_year: int,
+        max_age: Optional[float] = None
+    ) -> Optional[SeriesFrame]:
+        """
+        Look up the requested countries and years of an indicator.
+
+        Returns None unless the store has the indicator and every requested
+        country, so callers can fall back to the API. Rows written from
+        fetched data must also cover the requested years and be at most
+        max_age seconds old; snapshots never expire. Missing values are left
+        out of the returned frame, as the agents do with API responses.
+        """
+        start_year, end_year = int(start_year), int(end_year)
+        block = self._block(source, indicator_code)
+        rows = block.rows(countries) if block is not None else None
+        if rows is None:
+            self.misses += 1
+            return None
+        records = block.records[rows]
+        snapshot = block.meta.get("snapshot", False)
+        if not snapshot:
+            starts = records["start"]
+            expired = max_age is not None and time.time() - records["fetched_at"].min() > max_age
+            if expired or starts.min() == 0 or starts.max() > start_year or records["end"].min() < end_year:
+                self.misses += 1
+                return None
+        self.hits += 1
+
+        start = min(max(start_year - FIRST_YEAR, 0), YEARS)
+        stop = min(max(end_year - FIRST_YEAR + 1, start), YEARS)
+        # Fancy indexing copies just the requested rows out of the mapped file
+        values = np.asarray(block.values[rows, start:stop], dtype=np.float64)
+
+        years = np.arange(FIRST_YEAR + start, FIRST_YEAR + stop, dtype=np.int16)
+        country_index = np.repeat(np.arange(len(rows), dtype=np.int16), len(years))
+        years = np.tile(years, len(rows))
+        values = values.ravel()
+        present = ~np.isnan(values)
+
+        info = {"indicator_id": indicator_code, "indicator_name": block.meta.get("indicator_name", "")}
+        if snapshot:
+            info["snapshot_date"] = block.meta.get("ingested_at", "")
+        frame = SeriesFrame(
+            years=years[present],
+            values=values[present],
+            country_index=country_index[present],
+            countries=list(countries),
+            country_names=[name.decode("utf-8") for name in records["name"]],
+            info=info
+        )
+        return frame.sort_by_year()
+
+    def write(
+        self,
+        source: str,
+        indicator_code: str,
+        block: np.ndarray,
+        countries: List[str],
+        country_names: List[str],
+        first_year: int,
+        **metadata: Any
+    ) -> None:
+        """Store one indicator's (countries, years) block."""
+        self.write_many(source, [dict(
+            indicator_code=indicator_code, block=block, countries=countries,
+            country_names=country_names, first_year=first_year, **metadata
+        )])
+
+    def write_many(self, source: str, series: Sequence[Dict[str, Any]]) -> None:
+        """
+        Store several indicators' bulk snapshot blocks, replacing what the
+        store held for them. Each item has indicator_code, block, countries,
+        country_names and first_year; any other keys are kept as metadata.
+        """
+        with self._locked(source) as directory:
+            for item in series:
+                item = dict(item)
+                indicator_code = item.pop("indicator_code")
+                block = np.asarray(item.pop("block"), dtype=np.float64)
+                first_year = int(item.pop("first_year"))
+                countries, names = list(item.pop("countries")), list(item.pop("country_names"))
+
+                # Place the file's years in the store's fixed span
+                values = np.full((len(countries), YEARS), np.nan)
+                offset = first_year - FIRST_YEAR
+                source_start, source_stop = max(-offset, 0), min(block.shape[1], YEARS - offset)
+                if source_stop > source_start:
+                    values[:, offset + source_start:offset + source_stop] = block[:, source_start:source_stop]
+                if np.isfinite(block).sum() != np.isfinite(values).sum():
+                    logger.warning(f"{indicator_code}: years outside {FIRST_YEAR}-{FIRST_YEAR + YEARS - 1} were not stored")
+
+                records = np.zeros(len(countries), dtype=_ROW_DTYPE)
+                records["country"] = [country.encode("utf-8") for country in countries]
+                records["name"] = [name.encode("utf-8")[:64] for name in names]
+                records["fetched_at"] = time.time()
+                self._write_generation(directory, indicator_code, values, records, {**item, "snapshot": True})
+            logger.info(f"Stored {len(series)} series for {source} in {directory}")
+
+    def write_dataset(
+        self,
+        source: str,
+        indicator_code: str,
+        dataset: DataSet,
+        countries: Sequence[str],
+        start_year: int,
+        end_year: int
+    ) -> bool:
+        """
+        Merge a DataSet fetched for the given countries and years into the
+        indicator's block, converted to base units. For every country the
+        fetch returned values for, the requested years replace what its row
+        held, and its coverage is extended by the years actually received.
+        Each country keeps the time of its oldest years still covered, so
+        writing one country does not make the others look fresh. New
+        countries are appended as rows. Bulk snapshots are left alone, and so
+        are series with more than one value per country and year (sub-annual
+        data). Returns whether anything was written.
+        """
+        frame = SeriesFrame.of(dataset)
+        start_year, end_year = max(int(start_year), FIRST_YEAR), min(int(end_year), FIRST_YEAR + YEARS - 1)
+        keys = (frame.country_index.astype(np.int64) << 16) | frame.years.astype(np.uint16)
+        if not countries or end_year < start_year or len(np.unique(keys)) != len(frame):
+            return False
+
+        # New row contents for every requested country that received values
+        years = frame.years.astype(np.int64)
+        received = {}
+        for position, code in enumerate(frame.countries):
+            if code not in countries:
+                continue
+            points = (frame.country_index == position) & (years >= start_year) & (years <= end_year)
+            if points.any():
+                received[code] = (
+                    frame.country_names[position],
+                    years[points] - FIRST_YEAR,
+                    frame.values[points] * dataset.metadata.scale_factor
+                )
+        if not received:
+            return False
+
+        with self._locked(source) as directory:
+            block = self._block(source, indicator_code)
+            if block is not None and block.meta.get("snapshot", False):
+                return False
+            if block is not None:
+                block.refresh()
+
+            now = time.time()
+            updates, appended = [], []
+            for country, (name, offsets, values) in received.items():
+                row = block.row_of.get(country) if block is not None else None
+                if row is None:
+                    record = np.zeros(1, dtype=_ROW_DTYPE)[0]
+                    record["country"] = country.encode("utf-8")
+                    row_values = np.full(YEARS, np.nan)
+                else:
+                    record = block.records[row].copy()
+                    row_values = np.array(block.values[row])
+                row_values[start_year - FIRST_YEAR:end_year - FIRST_YEAR + 1] = np.nan
+                row_values[offsets] = values
+                if name:
+                    record["name"] = name.encode("utf-8")[:64]
+
+                first, last = int(offsets.min()) + FIRST_YEAR, int(offsets.max()) + FIRST_YEAR
+                known = (int(record["start"]), int(record["end"])) if record["start"] else None
+                if known and first <= known[0] and known[1] <= last:
+                    record["start"], record["end"], record["fetched_at"] = first, last, now
+                elif known and known[0] <= last + 1 and first <= known[1] + 1:
+                    # Years kept from the earlier fetch are as old as that fetch
+                    record["start"], record["end"] = min(known[0], first), max(known[1], last)
+                else:
+                    record["start"], record["end"], record["fetched_at"] = first, last, now
+                (appended if row is None else updates).append((row, record, row_values))
+
+            if block is None:
+                records = np.array([record for _, record, _ in appended], dtype=_ROW_DTYPE)
+                values = np.vstack([row_values for _, _, row_values in appended])
+                self._write_generation(directory, indicator_code, values, records, {
+                    "indicator_name": dataset.metadata.indicator_name,
+                    "frequency": dataset.metadata.frequency,
+                    "unit": "units",
+                    "scale_factor": 1.0,
+                    "snapshot": False,
+                })
+                return True
+
+            # Values go in before the records that point readers at them
+            with open(block.values_path, "r+b") as values_file, open(block.rows_path, "r+b") as rows_file:
+                for row, _, row_values in updates:
+                    values_file.seek(row * _ROW_BYTES)
+                    values_file.write(row_values.tobytes())
+                values_file.seek(len(block.records) * _ROW_BYTES)
+                for _, _, row_values in appended:
+                    values_file.write(row_values.tobytes())
+                values_file.flush()
+                for row, record, _ in updates:
+                    rows_file.seek(row * _ROW_DTYPE.itemsize)
+                    rows_file.write(record.tobytes())
+                rows_file.seek(len(block.records) * _ROW_DTYPE.itemsize)
+                for _, record, _ in appended:
+                    rows_file.write(record.tobytes())
+        return True
+
+    def _write_generation(
+        self,
+        directory: str,
+        indicator_code: str,
+        values: np.ndarray,
+        records: np.ndarray,
+        metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Write a new generation of an indicator's files and point its head at
+        it; the caller holds the source's lock. Readers still mapping the
+        previous generation keep valid mappings after its files are unlinked.
+        """
+        base = _base_name(indicator_code)
+        head_path = os.path.join(directory, base + _HEAD_SUFFIX)
+        try:
+            with open(head_path, "r", encoding="utf-8") as handle:
+                previous = handle.read().strip()
+        except FileNotFoundError:
+            previous = None
+
+        generation = str(time.time_ns())
+        prefix = os.path.join(directory, f"{base}.{generation}")
+        meta = {
+            **metadata,
+            "indicator_code": indicator_code,
+            "ingested_at": metadata.get("ingested_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+            "stored_at": time.time(),
+        }
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        _atomic_write(prefix + ".values", lambda handle: handle.write(values.tobytes()))
+        _atomic_write(prefix + ".rows", lambda handle: handle.write(records.tobytes()))
+        _atomic_write(prefix + ".json", lambda handle: handle.write(json.dumps(meta).encode("utf-8")))
+        _atomic_write(head_path, lambda handle: handle.write(generation.encode("utf-8")))
+
+        if previous is not None and previous != generation:
+            for suffix in (".values", ".rows", ".json"):
+                try:
+                    os.remove(os.path.join(directory, f"{base}.{previous}{suffix}"))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        sources = {}
+        if os.path.isdir(self.root):
+            for source in sorted(os.listdir(self.root)):
+                directory = self._source_dir(source)
+                if os.path.isdir(directory):
+                    count = sum(1 for name in os.listdir(directory) if name.endswith(_HEAD_SUFFIX))
+                    if count:
+                        sources[source] = count
+        return {"path": self.root, "indicators": sources, "hits": self.hits, "misses": self.misses}
+
+
+# Store shared by all agents in the process
+_store: Optional[SeriesStore] = None
+_store_lock = threading.Lock()
+
+
+def get_series_store() -> Optional[SeriesStore]:
+    """
+    Return the process-wide series store, or None if it is disabled
+    (SERIES_STORE_PATH set to an empty string).
+    """
+    global _store
+    if not STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SeriesStore(STORE_PATH)
+        return _store
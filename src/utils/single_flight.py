@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger("SingleFlight")
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+
+    The first caller for a key runs the work; callers that arrive while it is
+    still in flight await the same future instead of starting their own. Once
+    the work finishes the key is released, so later calls run again (usually
+    hitting a cache that the first call filled).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func() unless a call with the same key is already in flight,
+        in which case wait for that call's result.
+        """
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            self.shared += 1
+            logger.info(f"{self.name}: joining in-flight call for {key}")
+            # Shield so that a cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(func())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._release(key, done))
+        # The call keeps running (and can still be joined) if this caller is cancelled
+        return await asyncio.shield(future)
+
+    def _release(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved even when every waiter was cancelled
+            future.exception()
@@ -0,0 +1,192 @@
+import csv
+import io
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, TextIO
+
+import numpy as np
+
+from .series_store import SeriesStore
+from .unit_normalization import UNIT_SCALES
+
+logger = logging.getLogger("SnapshotIngest")
+
+# Store directories of the sources that publish bulk files (DataSource values)
+WDI_SOURCE = "world_bank"
+WEO_SOURCE = "imf"
+
+# Cells the WEO uses for missing values
+_WEO_MISSING = {"", "n/a", "--", "NA"}
+
+
+def _year_columns(header: Sequence[str]) -> List[tuple]:
+    """(column, year) for every column whose header is a year."""
+    return [(column, int(name)) for column, name in enumerate(header) if name.strip().isdigit()]
+
+
+def _collect(
+    rows: Iterable[Dict[str, Any]],
+    year_columns: List[tuple],
+    parse_value
+) -> List[Dict[str, Any]]:
+    """
+    Group per-(country, indicator) rows into one (countries, years) block per
+    indicator, in the shape SeriesStore.write_many takes.
+    """
+    first_year = min(year for _, year in year_columns)
+    width = max(year for _, year in year_columns) - first_year + 1
+    offsets = [(column, year - first_year) for column, year in year_columns]
+
+    series: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        entry = series.get(row["indicator_code"])
+        if entry is None:
+            entry = series[row["indicator_code"]] = {
+                "indicator_code": row["indicator_code"],
+                "indicator_name": row["indicator_name"],
+                "countries": [],
+                "country_names": [],
+                "rows": [],
+            }
+        values = np.full(width, np.nan)
+        cells = row["cells"]
+        for column, offset in offsets:
+            if column < len(cells):
+                values[offset] = parse_value(cells[column])
+        values *= row.get("scale", 1.0)
+        entry["countries"].append(row["country_code"])
+        entry["country_names"].append(row["country_name"])
+        entry["rows"].append(values)
+
+    return [
+        {
+            "indicator_code": entry["indicator_code"],
+            "indicator_name": entry["indicator_name"],
+            "block": np.vstack(entry["rows"]),
+            "countries": entry["countries"],
+            "country_names": entry["country_names"],
+            "first_year": first_year,
+            # Bulk values are stored in base units; agents pick a display unit per request
+            "unit": "units",
+            "scale_factor": 1.0,
+        }
+        for entry in series.values()
+    ]
+
+
+def _parse_wdi_value(cell: str) -> float:
+    return float(cell) if cell else np.nan
+
+
+def read_wdi_csv(handle: TextIO, indicator_codes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Read the World Bank WDI bulk CSV (WDICSV.csv, or a per-indicator API CSV
+    download): one row per country and indicator, one column per year.
+    Only the given indicator codes are kept, if any are given.
+    """
+    wanted = set(indicator_codes) if indicator_codes is not None else None
+    reader = csv.reader(handle)
+    # API downloads start with a few lines of notes before the header
+    for header in reader:
+        if header and header[0].lstrip("\ufeff") == "Country Name":
+            break
+    else:
+        raise ValueError("Not a WDI CSV file: no 'Country Name' header found")
+
+    columns = {name: column for column, name in enumerate(header)}
+    code_column = columns["Indicator Code"]
+
+    def rows():
+        for cells in reader:
+            if len(cells) <= code_column or (wanted is not None and cells[code_column] not in wanted):
+                continue
+            yield {
+                "indicator_code": cells[code_column],
+                "indicator_name": cells[columns["Indicator Name"]],
+                "country_code": cells[columns["Country Code"]],
+                "country_name": cells[columns["Country Name"]],
+                "cells": cells,
+            }
+
+    return _collect(rows(), _year_columns(header), _parse_wdi_value)
+
+
+def _parse_weo_value(cell: str) -> float:
+    cell = cell.strip()
+    if cell in _WEO_MISSING:
+        return np.nan
+    return float(cell.replace(",", ""))
+
+
+def read_weo_file(handle: TextIO, indicator_codes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Read the IMF World Economic Outlook bulk file (WEO*all.xls, which is
+    tab-separated text): one row per country and subject, one column per year.
+    Values are converted from the row's Scale (billions, millions) to base units.
+    Only the given WEO subject codes are kept, if any are given.
+    """
+    wanted = set(indicator_codes) if indicator_codes is not None else None
+    reader = csv.reader(handle, delimiter="\t")
+    header = [name.strip() for name in next(reader)]
+    columns = {name: column for column, name in enumerate(header)}
+    code_column = columns["WEO Subject Code"]
+
+    def rows():
+        for cells in reader:
+            # The file ends with a source note instead of data
+            if len(cells) <= code_column or not cells[columns["ISO"]].strip():
+                continue
+            if wanted is not None and cells[code_column] not in wanted:
+                continue
+            scale = cells[columns["Scale"]].strip().lower() if "Scale" in columns else ""
+            yield {
+                "indicator_code": cells[code_column],
+                "indicator_name": cells[columns["Subject Descriptor"]],
+                "country_code": cells[columns["ISO"]].strip(),
+                "country_name": cells[columns["Country"]],
+                "scale": UNIT_SCALES.get(scale, 1.0),
+                "cells": cells,
+            }
+
+    return _collect(rows(), _year_columns(header), _parse_weo_value)
+
+
+def open_bulk_file(path: str) -> TextIO:
+    """
+    Open a bulk download as text. WEO files are UTF-16 or Latin-1 depending
+    on the release; WDI files are UTF-8.
+    """
+    with open(path, "rb") as raw:
+        start = raw.read(4)
+    if start.startswith((b"\xff\xfe", b"\xfe\xff")):
+        encoding = "utf-16"
+    else:
+        try:
+            with io.open(path, "r", encoding="utf-8-sig") as handle:
+                handle.read(1 << 20)
+            encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+    return io.open(path, "r", encoding=encoding, newline="")
+
+
+def ingest(
+    store: SeriesStore,
+    kind: str,
+    path: str,
+    indicator_codes: Optional[Iterable[str]] = None
+) -> int:
+    """
+    Load a bulk file ("wdi" or "weo") into the store and return how many
+    indicators were written.
+    """
+    readers = {"wdi": (read_wdi_csv, WDI_SOURCE), "weo": (read_weo_file, WEO_SOURCE)}
+    if kind not in readers:
+        raise ValueError(f"Unknown bulk file kind {kind!r}; expected one of {', '.join(readers)}")
+    read, source = readers[kind]
+
+    with open_bulk_file(path) as handle:
+        series = read(handle, indicator_codes)
+    if series:
+        store.write_many(source, series)
+    logger.info(f"Ingested {len(series)} indicators from {path} into {source}")
+    return len(series)
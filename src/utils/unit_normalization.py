@@ -0,0 +1,103 @@
+import logging
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..schemas.series_frame import SeriesFrame
+
+logger = logging.getLogger("UnitNormalization")
+
+# Multiplier from each unit to base units
+UNIT_SCALES = {
+    "units": 1.0,
+    "thousands": 1e3,
+    "millions": 1e6,
+    "billions": 1e9,
+    "trillions": 1e12,
+}
+
+# Magnitude thresholds (log10 of base units) at which a series switches unit, largest first
+_MAGNITUDE_UNITS = [(12, "trillions"), (9, "billions"), (6, "millions")]
+
+# Units the IMF DataMapper publishes non-base indicators in. Anything not
+# listed (rates, percentages, indexes, per-capita values) is in base units.
+IMF_SOURCE_UNITS = {
+    "NGDPD": "billions",      # GDP, current prices (USD)
+    "PPPGDP": "billions",     # GDP, current prices (PPP)
+    "NGDPRPPP": "billions",   # GDP, constant prices (PPP)
+    "NGDP": "billions",       # GDP, current prices (national currency)
+    "NGDP_R": "billions",     # GDP, constant prices (national currency)
+    "NGDP_FY": "billions",    # GDP for the fiscal year
+    "BCA": "billions",        # Current account balance
+    "BX": "billions",         # Exports of goods and services
+    "BM": "billions",         # Imports of goods and services
+    "D": "billions",          # External debt, total
+    "DS": "billions",         # External debt service
+    "LP": "millions",         # Population
+    "LPA": "millions",        # Working-age population
+    "LE": "millions",         # Employment
+}
+
+
+def unit_for_magnitude(values: np.ndarray) -> str:
+    """
+    Pick one unit for a whole series from the log10 of its median absolute
+    value. Works on negative values and ignores NaN and zeros; a series with
+    no usable values stays in units.
+    """
+    magnitudes = np.abs(np.asarray(values, dtype=np.float64))
+    magnitudes = magnitudes[np.isfinite(magnitudes) & (magnitudes > 0)]
+    if not magnitudes.size:
+        return "units"
+    exponent = np.floor(np.log10(np.median(magnitudes)))
+    for threshold, unit in _MAGNITUDE_UNITS:
+        if exponent >= threshold:
+            return unit
+    return "units"
+
+
+def normalize_series(
+    frame: SeriesFrame,
+    source_unit: str = "units",
+    target_unit: Optional[str] = None
+) -> Tuple[SeriesFrame, str, float]:
+    """
+    Rescale a series from the unit its source reports in to a single target unit.
+
+    If no target unit is given, one is chosen from the magnitude of the series
+    in base units. All values are converted with one vectorized multiply.
+
+    Returns:
+        The rescaled frame, the unit of its values, and the scale factor that
+        turns those values back into base units (value * scale_factor).
+    """
+    source_scale = UNIT_SCALES.get(source_unit, 1.0)
+    if target_unit not in UNIT_SCALES:
+        if target_unit is not None:
+            logger.warning(f"Unknown unit {target_unit!r}, choosing one from the data")
+        target_unit = unit_for_magnitude(frame.values * source_scale)
+    scale_factor = UNIT_SCALES[target_unit]
+
+    factor = source_scale / scale_factor
+    if factor != 1.0:
+        frame = frame.scaled(factor)
+    return frame, target_unit, scale_factor
+
+
+def common_unit(frames: Sequence[SeriesFrame], scale_factors: Sequence[float]) -> str:
+    """
+    Pick one unit for several series at once, from all their values in base units.
+    """
+    if not frames:
+        return "units"
+    return unit_for_magnitude(np.concatenate([
+        frame.values * scale_factor for frame, scale_factor in zip(frames, scale_factors)
+    ]))
+
+
+def rescale(frame: SeriesFrame, scale_factor: float, target_unit: str) -> SeriesFrame:
+    """
+    Convert a series stored with the given scale factor to the target unit.
+    """
+    factor = scale_factor / UNIT_SCALES[target_unit]
+    return frame.scaled(factor) if factor != 1.0 else frame
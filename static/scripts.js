@@ -1,6 +1,6 @@
-function formatAnalysis(analysis) {
+function formatAnalysis(analysis, title = 'Analysis Summary') {
     const lines = analysis.split('\n');
-    let formatted = '<h3>Analysis Summary</h3><div>';
+    let formatted = `<h3>${title}</h3><div>`;
     lines.forEach(line => {
         if (line.trim()) {
             // Check if the line starts with a number followed by a period (e.g., '1.', '2.')
@@ -17,8 +17,9 @@ function formatAnalysis(analysis) {
     return formatted;
 }
 
-function formatData(data) {
-    let formatted = '<h3>Data Points</h3><table><tr><th>Year</th><th>Value</th></tr>';
+function formatData(data, unit, title = 'Data Points') {
+    const valueHeader = unit && unit !== 'units' ? `Value (${unit})` : 'Value';
+    let formatted = `<h3>${title}</h3><table><tr><th>Year</th><th>${valueHeader}</th></tr>`;
     data.forEach(point => {
         formatted += `<tr><td>${point.year}</td><td>${point.value.toLocaleString()}</td></tr>`;
     });
@@ -28,24 +29,53 @@ function formatData(data) {
 
 let currentChart = null;
 
-async function renderVisualization(mergedData, chartType = 'line') {
+// Line colours for the countries of a comparison query
+const CHART_COLORS = [
+    'rgba(75, 192, 192, 1)',
+    'rgba(255, 99, 132, 1)',
+    'rgba(54, 162, 235, 1)',
+    'rgba(255, 159, 64, 1)',
+    'rgba(153, 102, 255, 1)',
+    'rgba(201, 203, 207, 1)'
+];
+
+// Country codes of a query; "country" is one code or a list of them
+function queryCountries(queryParams) {
+    return Array.isArray(queryParams.country) ? queryParams.country : [queryParams.country];
+}
+
+// Heading for one dataset: the country name when several countries are shown
+function datasetLabel(dataset, country, count) {
+    if (count <= 1) {
+        return '';
+    }
+    return (dataset.data.length && dataset.data[0].country_name) || country;
+}
+
+// Draw every dataset (one per country) as its own series on one chart
+async function renderVisualization(datasets, chartType = 'line', labels = []) {
     // Show loading spinner
     document.getElementById('graphSpinner').style.display = 'block';
 
     try {
-        const response = await fetch('/mcp/visualize', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ merged_data: mergedData })
-        });
-        
-        if (!response.ok) {
-            throw new Error(`Visualization error: ${response.status}`);
-        }
-        
-        const visualData = await response.json();
+        const series = await Promise.all(datasets.map(async dataset => {
+            const response = await fetch('/mcp/visualize', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ merged_data: dataset })
+            });
+            
+            if (!response.ok) {
+                throw new Error(`Visualization error: ${response.status}`);
+            }
+            
+            return response.json();
+        }));
+
+        // One x axis for all countries; years a country lacks are left as gaps
+        const years = [...new Set(series.flatMap(visualData => visualData.years))].sort((a, b) => a - b);
 
         // Hide loading spinner
         document.getElementById('graphSpinner').style.display = 'none';
@@ -61,14 +91,18 @@ async function renderVisualization(mergedData, chartType = 'line') {
         currentChart = new Chart(ctx, {
             type: chartType,
             data: {
-                labels: visualData.years,
-                datasets: [{
-                    label: 'Value',
-                    data: visualData.values,
-                    borderColor: 'rgba(75, 192, 192, 1)',
-                    borderWidth: 2,
-                    fill: false
-                }]
+                labels: years,
+                datasets: series.map((visualData, i) => {
+                    const valuesByYear = new Map(visualData.years.map((year, j) => [year, visualData.values[j]]));
+                    return {
+                        label: labels[i] || 'Value',
+                        data: years.map(year => valuesByYear.has(year) ? valuesByYear.get(year) : null),
+                        borderColor: CHART_COLORS[i % CHART_COLORS.length],
+                        backgroundColor: CHART_COLORS[i % CHART_COLORS.length],
+                        borderWidth: 2,
+                        fill: false
+                    };
+                })
             },
             options: {
                 scales: {
@@ -100,11 +134,65 @@ const graphTypeButtons = document.getElementById('graphTypeButtons');
 graphTypeButtons.addEventListener('click', async function(event) {
     if (event.target.tagName === 'BUTTON') {
         const selectedType = event.target.getAttribute('data-type');
-        const mergedData = JSON.parse(document.getElementById('rawData').dataset.mergedData);
-        await renderVisualization(mergedData, selectedType);
+        const { datasets, labels } = JSON.parse(document.getElementById('rawData').dataset.mergedData);
+        await renderVisualization(datasets, selectedType, labels);
     }
 });
 
+// Read the server-sent events from /mcp/analyze/stream and hand each token to onToken
+async function streamAnalysis(payload, onToken) {
+    const response = await fetch('/mcp/analyze/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(payload)
+    });
+    
+    if (!response.ok) {
+        throw new Error(`Analysis error: ${response.status}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        
+        for (const rawEvent of events) {
+            let eventType = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    eventType = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            
+            const message = data ? JSON.parse(data) : {};
+            if (eventType === 'error') {
+                throw new Error(`Analysis error: ${message.error}`);
+            }
+            if (eventType === 'done') {
+                return;
+            }
+            if (message.token) {
+                onToken(message.token);
+            }
+        }
+    }
+}
+
 // Progressive loading implementation
 async function fetchDataProgressively(query) {
     // Clear previous results
@@ -135,49 +223,50 @@ async function fetchDataProgressively(query) {
         // Hide raw data spinner
         document.getElementById('rawDataSpinner').style.display = 'none';
         
+        // Comparison queries return one dataset per country, in the order asked for
+        const datasets = rawDataResult.datasets || [];
+        const countries = queryCountries(rawDataResult.query_params);
+        const labels = datasets.map((dataset, i) => datasetLabel(dataset, countries[i], datasets.length));
+        
         // Format and display raw data immediately
-        if (rawDataResult.datasets && rawDataResult.datasets.length > 0 && rawDataResult.datasets[0].data) {
-            const dataHtml = formatData(rawDataResult.datasets[0].data);
-            document.getElementById('rawData').innerHTML = dataHtml;
-            document.getElementById('rawData').dataset.mergedData = JSON.stringify(rawDataResult.datasets[0]);
+        if (datasets.some(dataset => dataset.data.length > 0)) {
+            document.getElementById('rawData').innerHTML = datasets.map((dataset, i) => 
+                formatData(dataset.data, dataset.metadata.unit, labels[i] ? `Data Points: ${labels[i]}` : 'Data Points')
+            ).join('');
+            document.getElementById('rawData').dataset.mergedData = JSON.stringify({ datasets, labels });
             
             // Start visualization process
-            renderVisualization(rawDataResult.datasets[0], 'line');
+            renderVisualization(datasets, 'line', labels);
         } else {
             document.getElementById('rawData').innerHTML = 
                 '<div class="warning-message">No data available for this query.</div>';
         }
         
-        // Step 2: Fetch analysis in parallel
-        const analysisPromise = fetch('/mcp/analyze', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ 
-                country: rawDataResult.query_params.country,
-                indicator: rawDataResult.query_params.indicator,
-                dataset: rawDataResult.datasets[0]
-            })
-        });
-        
-        // Wait for analysis to complete
-        const analysisResponse = await analysisPromise;
-        
-        if (!analysisResponse.ok) {
-            throw new Error(`Analysis error: ${analysisResponse.status}`);
-        }
-        
-        const analysisResult = await analysisResponse.json();
+        // Step 2: Stream one analysis per country and render tokens as they arrive.
+        // The country sent with each dataset matches what the server prewarms.
+        const analysisTexts = datasets.map(() => '');
+        const renderAnalyses = () => {
+            document.getElementById('aiAnalysis').innerHTML = analysisTexts
+                .map((text, i) => text ? formatAnalysis(text, labels[i] ? `Analysis Summary: ${labels[i]}` : 'Analysis Summary') : '')
+                .join('');
+        };
+        // The analyses stream concurrently, each into its own slot
+        await Promise.all(datasets.map((dataset, i) => streamAnalysis({ 
+            country: datasets.length > 1 ? countries[i] : rawDataResult.query_params.country,
+            indicator: rawDataResult.query_params.indicator,
+            dataset,
+            query_params: rawDataResult.query_params
+        }, token => {
+            // Hide analysis spinner on the first token
+            document.getElementById('aiAnalysisSpinner').style.display = 'none';
+            analysisTexts[i] += token;
+            renderAnalyses();
+        })));
         
         // Hide analysis spinner
         document.getElementById('aiAnalysisSpinner').style.display = 'none';
         
-        // Format and display analysis
-        if (analysisResult.analysis) {
-            const analysisHtml = formatAnalysis(analysisResult.analysis);
-            document.getElementById('aiAnalysis').innerHTML = analysisHtml;
-        } else {
+        if (!analysisTexts.some(text => text)) {
             document.getElementById('aiAnalysis').innerHTML = 
                 '<div class="warning-message">No analysis available for this data.</div>';
         }
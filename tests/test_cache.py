@@ -0,0 +1,87 @@
+"""
+Tests for TTLCache: LRU eviction, byte limits, the stale grace period and
+remaining_ttl, driven by a fake clock.
+"""
+from src.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_evicts_least_recently_used_entry():
+    cache = TTLCache("test", ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_until_under_max_bytes():
+    cache = TTLCache("test", ttl=60, max_bytes=100, sizeof=len)
+    cache.set("a", "x" * 40)
+    cache.set("b", "x" * 40)
+    cache.set("c", "x" * 40)
+
+    assert "a" not in cache
+    assert cache.backend.total_size() == 80
+    assert len(cache) == 2
+
+
+def test_does_not_cache_values_larger_than_max_bytes():
+    cache = TTLCache("test", ttl=60, max_bytes=10, sizeof=len)
+    cache.set("small", "x" * 5)
+    cache.set("big", "x" * 50)
+
+    assert "big" not in cache
+    assert cache.get("small") == "x" * 5
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=60, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=120)
+
+    clock.now += 61
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_get_stale_serves_expired_entries_within_grace():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=60, grace=30, clock=clock)
+    cache.set("a", 1)
+
+    assert cache.get_stale("a") == (1, False)
+    clock.now += 70
+    assert cache.get("a") is None  # get() never returns stale entries
+    assert cache.get_stale("a") == (1, True)
+    clock.now += 30
+    assert cache.get_stale("a") == (None, False)
+    assert len(cache) == 0
+
+
+def test_remaining_ttl():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=60, grace=30, clock=clock)
+    cache.set("a", 1)
+
+    clock.now += 15
+    assert cache.remaining_ttl("a") == 45
+    assert cache.remaining_ttl("missing") is None
+    clock.now += 50
+    # Expired but still within grace: no time left, and the lookup is not counted
+    assert cache.remaining_ttl("a") is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
@@ -0,0 +1,67 @@
+"""
+Tests for the SQLite cache backend shared by worker processes.
+"""
+import multiprocessing
+import time
+
+from src.utils.cache import TTLCache
+from src.utils.persistent_cache import SQLiteBackend
+
+
+def _open(path: str, namespace: str = "agent") -> TTLCache:
+    return TTLCache("disk", ttl=60, backend=SQLiteBackend(path, namespace), clock=time.time)
+
+
+def _write_in_child(path: str, key: str, value) -> None:
+    _open(path).set(key, value)
+
+
+def _delete_in_child(path: str, key: str) -> None:
+    _open(path).delete(key)
+
+
+def _run_in_child(target, *args) -> None:
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+
+def test_entries_written_by_another_process_are_visible(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = _open(path)
+
+    _run_in_child(_write_in_child, path, "gdp", {"values": [1.0, 2.0]})
+
+    assert cache.get("gdp") == {"values": [1.0, 2.0]}
+
+
+def test_deletes_by_another_process_are_visible(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = _open(path)
+    cache.set("gdp", 1)
+
+    _run_in_child(_delete_in_child, path, "gdp")
+
+    assert cache.get("gdp") is None
+
+
+def test_namespaces_are_separate(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    imf, oecd = _open(path, "imf"), _open(path, "oecd")
+    imf.set("gdp", 1)
+
+    assert oecd.get("gdp") is None
+    assert len(imf) == 1 and len(oecd) == 0
+
+
+def test_delete_and_pop_lru_report_what_they_removed(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), "agent", touch_interval=0)
+    cache = TTLCache("disk", ttl=60, backend=backend, clock=time.time)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert backend.delete("a") is True
+    assert backend.delete("a") is False
+    assert backend.pop_lru() == "b"
+    assert backend.pop_lru() is None
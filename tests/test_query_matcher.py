@@ -0,0 +1,69 @@
+"""
+Tests for query normalization and the rule-based FastQueryParser, including
+the cases it must leave to the LLM parser.
+"""
+import pytest
+
+from src.utils.query_matcher import DEFAULT_END_YEAR, DEFAULT_START_YEAR, FastQueryParser, normalize_query
+
+COUNTRIES = {
+    "united states": "United States",
+    "usa": "United States",
+    "us": "United States",
+    "india": "India",
+    "germany": "Germany",
+    "guinea": "Guinea",
+    "sudan": "Sudan",
+}
+
+
+@pytest.fixture
+def parser():
+    return FastQueryParser(["gdp", "gdp_growth", "population", "inflation"], COUNTRIES)
+
+
+@pytest.mark.parametrize("query", [
+    "GDP of India from 2000 to 2020",
+    "gdp of india 2000-2020",
+    "GDP of India, between 2000 and 2020!",
+    "  gdp   of India 2000 – 2020 ",
+])
+def test_normalize_query_maps_variants_to_one_key(query):
+    assert normalize_query(query) == "gdp of india 2000-2020"
+
+
+def test_parses_indicator_country_and_years(parser):
+    assert parser.parse("GDP growth of India from 2005 to 2015") == {
+        "indicator": "gdp_growth", "country": "India", "start_year": 2005, "end_year": 2015
+    }
+
+
+def test_parses_comparisons_and_default_years(parser):
+    result = parser.parse("Compare population of India and Germany")
+
+    assert result["country"] == ["India", "Germany"]
+    assert (result["start_year"], result["end_year"]) == (DEFAULT_START_YEAR, DEFAULT_END_YEAR)
+
+
+def test_lowercase_us_is_a_word_not_a_country(parser):
+    assert parser.parse("show us the inflation of India")["country"] == "India"
+    assert parser.parse("inflation of the US since 2010")["country"] == "United States"
+
+
+@pytest.mark.parametrize("query", [
+    "weather in India",                          # no known indicator
+    "GDP and population of India",               # two indicators
+    "GDP of Narnia",                             # no known country
+    "GDP of India and Brazil",                   # a capitalized name the table lacks
+    "GDP of Guinea-Bissau",                      # part of a hyphenated name
+    "GDP of South Sudan",                        # part of a longer name
+])
+def test_leaves_ambiguous_queries_to_the_llm(parser, query):
+    assert parser.parse(query) is None
+
+
+def test_counts_hits_and_misses(parser):
+    parser.parse("GDP of India")
+    parser.parse("GDP of Narnia")
+
+    assert parser.stats() == {"attempts": 2, "hits": 1, "misses": 1, "hit_rate": 0.5}
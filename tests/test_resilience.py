@@ -0,0 +1,143 @@
+"""
+Tests for the upstream rate limiter, circuit breaker and Retry-After handling.
+"""
+import asyncio
+from email.utils import formatdate
+import time
+
+import pytest
+
+from src.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimitedError,
+    TokenBucket,
+    UpstreamError,
+    UpstreamGuard,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_spends_burst_then_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Out of tokens: each further reservation waits for the next refill
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_token_bucket_refuses_waits_longer_than_max_wait():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+    bucket.reserve()
+
+    with pytest.raises(RateLimitedError):
+        bucket.reserve(max_wait=0.5)
+    # No token was taken by the refused call
+    assert bucket.reserve(max_wait=1.0) == pytest.approx(1.0)
+
+
+def test_token_bucket_throttle_halves_rate_and_honours_retry_after():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, capacity=4, min_rate=1, clock=clock)
+
+    bucket.throttle(retry_after=10)
+
+    assert bucket.rate == 2
+    assert bucket.reserve() == pytest.approx(10)
+    bucket.throttle()
+    bucket.throttle()
+    assert bucket.rate == 1  # never below min_rate
+    bucket.record_success()
+    assert bucket.rate == pytest.approx(1.2)
+
+
+def test_circuit_opens_after_threshold_and_half_opens_after_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker("host", failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now += 30
+    breaker.check()  # the single trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+def test_failed_trial_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.check()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_at == clock.now + 30
+
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0
+
+
+def test_backoff_delay_respects_retry_after_and_cap():
+    assert backoff_delay(0, base=1.0, retry_after=3, cap=5) == 3
+    assert backoff_delay(10, base=1.0, cap=5) == 5
+    assert 0.5 <= backoff_delay(0, base=1.0, cap=5) <= 1.0
+
+
+def test_long_retry_after_opens_the_circuit_instead_of_waiting():
+    guard = UpstreamGuard("host", rate=10, burst=10, max_wait=5)
+
+    async def throttled():
+        raise UpstreamError("slow down", status=429, retry_after=60)
+
+    async def main():
+        with pytest.raises(UpstreamError):
+            await guard.call(throttled)
+        with pytest.raises(CircuitOpenError):
+            await guard.call(throttled)
+
+    asyncio.run(main())
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert guard.limiter.throttled == 1
+
+
+def test_client_errors_do_not_open_the_circuit():
+    guard = UpstreamGuard("host")
+    guard.breaker.failure_threshold = 1
+
+    async def bad_request():
+        raise UpstreamError("bad indicator", status=400)
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(UpstreamError):
+                await guard.call(bad_request)
+
+    asyncio.run(main())
+    assert guard.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,112 @@
+"""
+Tests for incremental SDMX-JSON parsing: which values iter_sdmx picks out at
+which nesting depth, and read_sdmx_response on both sides of the threshold.
+"""
+import asyncio
+import json
+
+import pytest
+
+from src.utils.sdmx_stream import SDMXData, iter_sdmx, read_sdmx_response
+
+pytest.importorskip("ijson")
+
+
+class ChunkedStream:
+    """Byte stream handing out a body in small chunks, like aiohttp's response.content."""
+
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.position = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        n = self.chunk_size if n < 0 else min(n, self.chunk_size)
+        chunk = self.body[self.position:self.position + n]
+        self.position += len(chunk)
+        return chunk
+
+    async def readexactly(self, n: int) -> bytes:
+        chunk = self.body[self.position:self.position + n]
+        self.position += len(chunk)
+        if len(chunk) < n:
+            raise asyncio.IncompleteReadError(chunk, n)
+        return chunk
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.content = ChunkedStream(body)
+
+
+STRUCTURE = {
+    "name": "Test",
+    "dimensions": {"series": [], "observation": [{"id": "TIME_PERIOD", "values": [{"id": "2000"}, {"id": "2001"}]}]},
+    "attributes": {"series": [{"id": "UNIT_MULT", "values": [{"id": "0"}, {"id": "3"}]}]},
+}
+
+DOCUMENT = {
+    "header": {"id": "test", "nested": [[[[[[[[["deeper than the tracked keys"]]]]]]]]]},
+    "dataSets": [{
+        "annotations": [[[[[[{"observations": {"0": [99.0]}}]]]]]],
+        "series": {
+            "0:0": {
+                "attributes": [1, None],
+                "observations": {
+                    # Only the first element of an observation is its value
+                    "0": [1.5, 0, [7.0, {"structure": {}}]],
+                    "1": [None, 0],
+                },
+            },
+            "0:1": {
+                "observations": {"1": [2.5]},
+                "annotations": {"structure": {"name": "not the message structure"}},
+            },
+        },
+    }],
+    "structure": STRUCTURE,
+}
+
+
+async def _collect(document):
+    return [item async for item in iter_sdmx(ChunkedStream(json.dumps(document).encode()))]
+
+
+def test_iter_sdmx_yields_observations_attributes_and_structure():
+    items = asyncio.run(_collect(DOCUMENT))
+
+    assert [item for kind, item in items if kind == "observation"] == [("0:0", 0, 1.5), ("0:1", 1, 2.5)]
+    assert [item for kind, item in items if kind == "series_attributes"] == [("0:0", [1, None])]
+    assert [item for kind, item in items if kind == "structure"] == [STRUCTURE]
+
+
+def test_iter_sdmx_reads_structure_before_data_sets():
+    document = {"structure": STRUCTURE, "dataSets": DOCUMENT["dataSets"]}
+
+    items = asyncio.run(_collect(document))
+
+    assert items[0] == ("structure", STRUCTURE)
+    assert len([kind for kind, _ in items if kind == "observation"]) == 2
+
+
+def test_from_stream_matches_from_json():
+    streamed = asyncio.run(SDMXData.from_stream(ChunkedStream(json.dumps(DOCUMENT).encode())))
+    parsed = SDMXData.from_json(DOCUMENT)
+
+    for data in (streamed, parsed):
+        assert data.series_keys == ["0:0", "0:1"]
+        assert data.series_attributes[0] == [1, None]
+        assert list(data.observation_values) == [1.5, 2.5]
+        assert list(data.observation_time) == [0, 1]
+        assert data.structure == STRUCTURE
+
+
+@pytest.mark.parametrize("threshold", [10, 1 << 20])
+def test_read_sdmx_response_on_both_sides_of_the_threshold(threshold):
+    body = json.dumps(DOCUMENT).encode()
+
+    data = asyncio.run(read_sdmx_response(FakeResponse(body), threshold=threshold))
+
+    assert list(data.observation_values) == [1.5, 2.5]
+    assert data.series_keys == ["0:0", "0:1"]
+    assert data.structure == STRUCTURE
@@ -0,0 +1,60 @@
+"""
+Tests for SeriesFrame merging, splitting and serialization.
+"""
+import numpy as np
+
+from src.schemas.series_frame import SeriesFrame
+
+
+def _frame(years, values, countries, **info):
+    return SeriesFrame.from_columns(years, values, countries, [f"{code} name" for code in countries], info=info)
+
+
+def _points(frame):
+    return sorted(zip(frame.country_codes.tolist(), frame.years.tolist(), frame.values.tolist()))
+
+
+def test_merge_takes_each_country_year_from_the_first_frame_that_has_it():
+    primary = _frame([2000, 2001], [1.0, 2.0], ["USA", "USA"], indicator_id="WB")
+    secondary = _frame([2001, 2002, 2001], [20.0, 30.0, 5.0], ["USA", "USA", "IND"], indicator_id="IMF")
+
+    merged = SeriesFrame.merge([primary, secondary])
+
+    assert _points(merged) == [
+        ("IND", 2001, 5.0), ("USA", 2000, 1.0), ("USA", 2001, 2.0), ("USA", 2002, 30.0)
+    ]
+    # Info that differs between the frames is kept per point
+    sources = {(point.country_code, point.year): point.additional_info["indicator_id"] for point in merged.to_data_points()}
+    assert sources == {("IND", 2001): "IMF", ("USA", 2000): "WB", ("USA", 2001): "WB", ("USA", 2002): "IMF"}
+
+
+def test_merge_keeps_shared_info_series_level():
+    merged = SeriesFrame.merge([
+        _frame([2000], [1.0], ["USA"], indicator_name="GDP", indicator_id="WB"),
+        _frame([2001], [2.0], ["USA"], indicator_name="GDP", indicator_id="IMF"),
+    ])
+
+    assert merged.info == {"indicator_name": "GDP"}
+    assert list(merged.extras) == ["indicator_id"]
+
+
+def test_split_by_country_keeps_each_countrys_points():
+    frame = _frame([2000, 2000, 2001], [1.0, 2.0, 3.0], ["USA", "IND", "USA"])
+
+    parts = frame.split_by_country()
+
+    assert list(parts) == ["USA", "IND"]
+    assert _points(parts["USA"]) == [("USA", 2000, 1.0), ("USA", 2001, 3.0)]
+    assert _points(parts["IND"]) == [("IND", 2000, 2.0)]
+
+
+def test_to_records_matches_dumped_data_points():
+    frame = SeriesFrame.merge([
+        _frame([2000, 2001], [1.0, np.nan], ["USA", "USA"], indicator_id="WB"),
+        _frame([2002], [3.0], ["USA"], indicator_id="IMF"),
+    ])
+
+    records = frame.to_records()
+
+    assert records == [point.model_dump() for point in frame.to_data_points()]
+    assert records[1]["value"] is None
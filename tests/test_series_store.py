@@ -0,0 +1,89 @@
+"""
+Tests for writing fetched datasets through to the series store and the
+coverage and age checks applied when reading them back.
+"""
+import time
+from datetime import datetime
+
+import pytest
+
+from src.schemas.data_schema import DataSource, Metadata
+from src.schemas.series_frame import SeriesFrame
+from src.utils.series_store import SeriesStore
+
+
+def _dataset(points, scale_factor=1.0):
+    """DataSet from (country, year, value) tuples."""
+    countries, years, values = zip(*points)
+    return SeriesFrame.from_columns(years, values, countries, [f"{code} name" for code in countries]).to_dataset(
+        Metadata(
+            source=DataSource.IMF,
+            indicator_code="NGDPD",
+            indicator_name="GDP",
+            last_updated=datetime.now(),
+            frequency="yearly",
+            unit="billions" if scale_factor != 1.0 else "units",
+            scale_factor=scale_factor
+        ),
+        materialize=False
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SeriesStore(str(tmp_path))
+
+
+def test_reads_back_the_written_years_in_base_units(store):
+    fetched = _dataset([("USA", year, float(year - 2000)) for year in range(2010, 2016)], scale_factor=1e9)
+
+    assert store.write_dataset("imf", "NGDPD", fetched, ["USA"], 2010, 2015) is True
+
+    frame = store.read("imf", "NGDPD", ["USA"], 2011, 2013)
+    assert frame.years.tolist() == [2011, 2012, 2013]
+    assert frame.values.tolist() == [11e9, 12e9, 13e9]
+    assert store.entry("imf", "NGDPD")["snapshot"] is False
+
+
+def test_read_misses_outside_the_covered_years(store):
+    store.write_dataset("imf", "NGDPD", _dataset([("USA", year, 1.0) for year in range(2010, 2016)]), ["USA"], 2010, 2015)
+
+    assert store.read("imf", "NGDPD", ["USA"], 2009, 2015) is None
+    assert store.read("imf", "NGDPD", ["USA"], 2010, 2016) is None
+    assert store.read("imf", "NGDPD", ["USA", "IND"], 2010, 2015) is None
+
+
+def test_coverage_is_limited_to_the_years_received(store):
+    # Asked for 2010-2020, but the source only had values up to 2015
+    fetched = _dataset([("USA", year, 1.0) for year in range(2010, 2016)])
+    store.write_dataset("imf", "NGDPD", fetched, ["USA"], 2010, 2020)
+
+    assert store.read("imf", "NGDPD", ["USA"], 2010, 2020) is None
+    assert store.read("imf", "NGDPD", ["USA"], 2010, 2015) is not None
+
+
+def test_nothing_is_written_when_no_points_were_received(store):
+    fetched = _dataset([("IND", 2010, 1.0)])
+
+    assert store.write_dataset("imf", "NGDPD", fetched, ["USA"], 2010, 2015) is False
+    assert store.entry("imf", "NGDPD") is None
+
+
+def test_rows_expire_after_max_age(store, monkeypatch):
+    store.write_dataset("imf", "NGDPD", _dataset([("USA", 2010, 1.0)]), ["USA"], 2010, 2010)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 100)
+
+    assert store.read("imf", "NGDPD", ["USA"], 2010, 2010, max_age=200) is not None
+    assert store.read("imf", "NGDPD", ["USA"], 2010, 2010, max_age=50) is None
+
+
+def test_appended_countries_and_updates_are_visible_to_other_instances(store, tmp_path):
+    other = SeriesStore(str(tmp_path))
+    store.write_dataset("imf", "NGDPD", _dataset([("USA", 2010, 1.0)]), ["USA"], 2010, 2010)
+    assert other.read("imf", "NGDPD", ["USA"], 2010, 2010).values.tolist() == [1.0]
+
+    store.write_dataset("imf", "NGDPD", _dataset([("USA", 2010, 2.0), ("IND", 2010, 3.0)]), ["USA", "IND"], 2010, 2010)
+
+    frame = other.read("imf", "NGDPD", ["USA", "IND"], 2010, 2010)
+    assert sorted(zip(frame.country_codes.tolist(), frame.values.tolist())) == [("IND", 3.0), ("USA", 2.0)]
@@ -0,0 +1,105 @@
+"""
+Tests for bulk snapshot ingestion and the series store, using the small
+WDI and WEO files in benchmarks/fixtures.
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.schemas.data_schema import DataSource, Metadata
+from src.schemas.series_frame import SeriesFrame
+from src.utils.series_store import SeriesStore
+from src.utils.snapshot_ingest import ingest, open_bulk_file, read_wdi_csv, read_weo_file
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+WDI_FILE = os.path.join(FIXTURES, "wdi_sample.csv")
+WEO_FILE = os.path.join(FIXTURES, "weo_sample.xls")
+
+
+def _by_code(series):
+    return {item["indicator_code"]: item for item in series}
+
+
+def _row(item, country):
+    return item["block"][item["countries"].index(country)]
+
+
+def test_read_wdi_csv_skips_notes_and_builds_one_block_per_indicator():
+    with open_bulk_file(WDI_FILE) as handle:
+        series = _by_code(read_wdi_csv(handle))
+
+    gdp = series["NY.GDP.MKTP.CD"]
+    assert gdp["indicator_name"] == "GDP (current US$)"
+    assert gdp["first_year"] == 2018
+    assert gdp["block"].shape == (len(gdp["countries"]), 5)
+    assert "IND" in gdp["countries"] and "USA" in gdp["countries"]
+    assert _row(gdp, "USA")[0] == 20533057000000
+    assert _row(series["SP.POP.TOTL"], "IND")[4] == 1417173173
+
+
+def test_read_wdi_csv_keeps_only_the_requested_indicators():
+    with open_bulk_file(WDI_FILE) as handle:
+        series = read_wdi_csv(handle, ["SP.POP.TOTL"])
+
+    assert [item["indicator_code"] for item in series] == ["SP.POP.TOTL"]
+
+
+def test_read_weo_file_applies_scale_and_missing_values():
+    with open_bulk_file(WEO_FILE) as handle:
+        series = _by_code(read_weo_file(handle))
+
+    gdp = series["NGDPD"]
+    # "Billions" rows are stored in base units; thousands separators are dropped
+    assert _row(gdp, "IND")[0] == pytest.approx(2702.930e9)
+    assert _row(gdp, "USA")[4] == pytest.approx(25439.700e9)
+    assert gdp["unit"] == "units" and gdp["scale_factor"] == 1.0
+
+    growth = series["NGDP_RPCH"]
+    # Rows without a Scale are left as they are, and "n/a" becomes NaN
+    assert _row(growth, "IND")[0] == pytest.approx(6.454)
+    assert np.isnan(_row(growth, "USA")[4])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    ingest(store, "wdi", WDI_FILE)
+    ingest(store, "weo", WEO_FILE)
+    return store
+
+
+def test_store_reads_ingested_snapshot(store):
+    frame = store.read("imf", "NGDPD", ["USA", "IND"], 2019, 2020)
+
+    assert frame is not None
+    assert sorted(zip(frame.country_codes.tolist(), frame.years.tolist())) == [
+        ("IND", 2019), ("IND", 2020), ("USA", 2019), ("USA", 2020)
+    ]
+
+
+def test_store_read_misses_when_a_country_is_not_in_the_snapshot(store):
+    assert store.read("world_bank", "NY.GDP.MKTP.CD", ["USA", "XXX"], 2018, 2022) is None
+    assert store.read("world_bank", "NOT.AN.INDICATOR", ["USA"], 2018, 2022) is None
+    assert store.misses == 2
+
+
+def test_write_dataset_leaves_snapshot_blocks_alone(store):
+    before = store.read("world_bank", "NY.GDP.MKTP.CD", ["USA"], 2018, 2022)
+    fetched = SeriesFrame.from_columns([2018, 2019], [1.0, 2.0], ["USA", "USA"], ["United States"] * 2).to_dataset(
+        Metadata(
+            source=DataSource.WORLD_BANK,
+            indicator_code="NY.GDP.MKTP.CD",
+            indicator_name="GDP (current US$)",
+            last_updated=datetime.now(),
+            frequency="yearly",
+            unit="units"
+        )
+    )
+
+    assert store.write_dataset("world_bank", "NY.GDP.MKTP.CD", fetched, ["USA"], 2018, 2019) is False
+
+    after = store.read("world_bank", "NY.GDP.MKTP.CD", ["USA"], 2018, 2022)
+    assert after.values.tolist() == before.values.tolist()
+    assert store.entry("world_bank", "NY.GDP.MKTP.CD")["snapshot"] is True